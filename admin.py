@@ -4,9 +4,18 @@
 # This file contains all admin functions for managing tickets and viewing data
 # ============================================================================
 
-import csv
-from file_handler import load_ticket_objects, load_ticket_data, load_purchases
-from ticket_classes import Ticket, Category, Purchase
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta
+import metrics
+from file_handler import load_purchases
+from ticket_classes import Ticket, Purchase
+from catalog_ingest import ID_PATTERN, MAX_PRICE_PENCE, new_category_id
+from ticket_views import ORDER_LETTERS, ORDER_NAMES, END_DATE
+from purchase_index import purchases_between
+import live_stats
+from log_stats import collect_stats, print_stats
+from bulk_changes import change_prices, remove_expired, apply_price_list
 
 
 # ============================================================================
@@ -23,7 +32,11 @@ def display_admin_menu():
     print("4. Delete Ticket")
     print("5. View All Purchases")
     print("6. View System Statistics")
-    print("7. Back to Main Menu")
+    print("7. Purchase Reports")
+    print("8. Purchases by Time Range")
+    print("9. Live Sales Dashboard")
+    print("10. Bulk Changes")
+    print("11. Back to Main Menu")
     print("="*40)
 
 
@@ -37,19 +50,44 @@ def view_all_tickets(categories):
     print("   ALL TICKETS IN SYSTEM")
     print("="*50)
     
+    # Catalog order (grouped by category), or one sorted list of everything
+    order_input = input("Order (Enter for catalog order, p for cheapest first, "
+                        "e for expiring soonest): ").strip().lower()
+    order = ORDER_LETTERS.get(order_input)
+    
     total_tickets = 0
     
-    # Go through each category
-    for category_name, category_obj in categories.items():
-        print(f"\n--- {category_name} ---")
-        tickets = category_obj.get_all_tickets()
+    if order:
+        limit_input = input("How many tickets? (Enter for all): ").strip()
+        limit = int(limit_input) if limit_input.isdigit() else None
         
-        # Show each ticket in this category
-        for number, ticket in enumerate(tickets, 1):
-            print(f"  {number}. {ticket.topup_type}")
+        # The catalog keeps this order up to date, so nothing is sorted here
+        print(f"\n--- All tickets, {ORDER_NAMES[order]} ---")
+        for number, ticket in enumerate(categories.sorted_tickets(order, limit), 1):
+            print(f"  {number}. {ticket.topup_type} ({ticket.category})")
             print(f"     Price: £{ticket.price:.2f}")
+            if order == END_DATE and ticket.end_date not in ('', 'N/A'):
+                print(f"     Valid until: {ticket.end_date[:10]}")
             print(f"     ID: {ticket.topup_id[:8]}...")
             total_tickets += 1
+        
+        print("\n" + "="*50)
+        print(f"Tickets shown: {total_tickets}")
+        print("="*50)
+        return
+    
+    # Go through each category (read-locked so edits wait until we finish)
+    with categories.read_locked():
+        for category_name, category_obj in categories.items():
+            print(f"\n--- {category_name} ---")
+            tickets = category_obj.get_all_tickets()
+            
+            # Show each ticket in this category
+            for number, ticket in enumerate(tickets, 1):
+                print(f"  {number}. {ticket.topup_type}")
+                print(f"     Price: £{ticket.price:.2f}")
+                print(f"     ID: {ticket.topup_id[:8]}...")
+                total_tickets += 1
     
     print("\n" + "="*50)
     print(f"Total tickets in system: {total_tickets}")
@@ -59,6 +97,7 @@ def view_all_tickets(categories):
 # ============================================================================
 # FUNCTION 2: ADD NEW TICKET
 # ============================================================================
+@metrics.timed('admin_add')
 def add_new_ticket(categories):
     """Add a new ticket to the system"""
     
@@ -87,6 +126,9 @@ def add_new_ticket(categories):
             if price_pounds < 0:
                 print("Price cannot be negative!")
                 return
+            if round(price_pounds * 100) > MAX_PRICE_PENCE:
+                print(f"Price cannot be over £{MAX_PRICE_PENCE // 100:,}!")
+                return
             # Convert to pence for storage
             price_pence = int(price_pounds * 100)
         except ValueError:
@@ -96,13 +138,20 @@ def add_new_ticket(categories):
         description = input("Description (optional): ").strip()
         passenger_class = input("Passenger class (e.g., Adult, Student): ").strip() or "Adult"
         
+        # Keep the id of an existing category; make one for a new category
+        with categories.read_locked():
+            existing = categories.get(category_name)
+            category_id = existing.tickets[0].category_id if existing and existing.tickets else ''
+        if not ID_PATTERN.match(category_id):
+            category_id = new_category_id(category_name)
+        
         # Create ticket data dictionary
         new_ticket_data = {
             'category_title': category_name,
-            'category_id': 'new-' + category_name.lower().replace(' ', '-'),
+            'category_id': category_id,
             'category_description': f'Tickets for {category_name}',
             'topup_title': ticket_type,
-            'topup_id': 'new-' + ticket_type.lower().replace(' ', '-'),
+            'topup_id': str(uuid.uuid4()),
             'topup_description': description or f'{ticket_type} ticket',
             'topup_price_in_pence': str(price_pence),
             'topup_entitlement_type': 'fixed',
@@ -114,11 +163,8 @@ def add_new_ticket(categories):
         # Create Ticket object
         new_ticket = Ticket(new_ticket_data)
         
-        # Add to category
-        if category_name not in categories:
-            categories[category_name] = Category(category_name)
-        
-        categories[category_name].add_ticket(new_ticket)
+        # Add to category (creates the category if it's new)
+        categories.add_ticket(new_ticket)
         
         print(f"\n✓ Ticket '{ticket_type}' added successfully!")
         print(f"  Category: {category_name}")
@@ -131,6 +177,7 @@ def add_new_ticket(categories):
 # ============================================================================
 # FUNCTION 3: EDIT TICKET PRICE
 # ============================================================================
+@metrics.timed('admin_edit')
 def edit_ticket_price(categories):
     """Edit the price of an existing ticket"""
     
@@ -139,7 +186,8 @@ def edit_ticket_price(categories):
     print("="*40)
     
     # Show all categories
-    category_list = list(categories.items())
+    with categories.read_locked():
+        category_list = list(categories.items())
     
     print("\nSelect category:")
     for number, (cat_name, cat_obj) in enumerate(category_list, 1):
@@ -154,7 +202,8 @@ def edit_ticket_price(categories):
             return
         
         selected_category_name, selected_category = category_list[cat_choice]
-        tickets = selected_category.get_all_tickets()
+        with categories.read_locked():
+            tickets = list(selected_category.get_all_tickets())
         
         # Show tickets in category
         print(f"\nTickets in {selected_category_name}:")
@@ -180,9 +229,12 @@ def edit_ticket_price(categories):
             if new_price < 0:
                 print("Price cannot be negative!")
                 return
+            if round(new_price * 100) > MAX_PRICE_PENCE:
+                print(f"Price cannot be over £{MAX_PRICE_PENCE // 100:,}!")
+                return
             
-            # Update the price
-            selected_ticket.price = new_price
+            # Update the price (waits for any readers to finish)
+            categories.set_ticket_price(selected_ticket, new_price)
             
             print(f"\n✓ Price updated successfully!")
             print(f"  New price: £{new_price:.2f}")
@@ -199,6 +251,7 @@ def edit_ticket_price(categories):
 # ============================================================================
 # FUNCTION 4: DELETE TICKET
 # ============================================================================
+@metrics.timed('admin_delete')
 def delete_ticket(categories):
     """Delete a ticket from the system"""
     
@@ -207,7 +260,8 @@ def delete_ticket(categories):
     print("="*40)
     
     # Show all categories
-    category_list = list(categories.items())
+    with categories.read_locked():
+        category_list = list(categories.items())
     
     print("\nSelect category:")
     for number, (cat_name, cat_obj) in enumerate(category_list, 1):
@@ -222,7 +276,8 @@ def delete_ticket(categories):
             return
         
         selected_category_name, selected_category = category_list[cat_choice]
-        tickets = selected_category.get_all_tickets()
+        with categories.read_locked():
+            tickets = list(selected_category.get_all_tickets())
         
         # Show tickets in category
         print(f"\nTickets in {selected_category_name}:")
@@ -243,9 +298,11 @@ def delete_ticket(categories):
         confirm = input("Are you sure? (yes/no): ").lower()
         
         if confirm in ['yes', 'y']:
-            # Remove ticket from category
-            selected_category.tickets.remove(ticket_to_delete)
-            print(f"\n✓ Ticket '{ticket_to_delete.topup_type}' deleted successfully!")
+            # Remove ticket from category (waits for any readers to finish)
+            if categories.remove_ticket(ticket_to_delete):
+                print(f"\n✓ Ticket '{ticket_to_delete.topup_type}' deleted successfully!")
+            else:
+                print("\n✗ Ticket was already deleted.")
         else:
             print("Deletion cancelled.")
             
@@ -282,6 +339,7 @@ def view_all_purchases():
             
             print(f"\nPurchase #{purchase_number}:")
             print(f"  Date: {purchase_info['timestamp']}")
+            print(f"  Customer: {purchase_info['customer_id'] or '(unknown)'}")
             print(f"  Category: {purchase_info['category']}")
             print(f"  Ticket: {purchase_info['topup_type']}")
             print(f"  Quantity: {purchase_info['quantity']}")
@@ -304,6 +362,7 @@ def view_all_purchases():
 # ============================================================================
 # FUNCTION 6: VIEW SYSTEM STATISTICS
 # ============================================================================
+@metrics.timed('admin_stats')
 def view_system_statistics(categories):
     """Show comprehensive system statistics"""
     
@@ -311,50 +370,348 @@ def view_system_statistics(categories):
     print("   SYSTEM STATISTICS")
     print("="*50)
     
-    # Count tickets
-    total_tickets = 0
-    total_categories = len(categories)
-    
-    for category_obj in categories.values():
-        total_tickets += len(category_obj.get_all_tickets())
+    # Read the counts each category keeps up to date (read-locked so
+    # they are consistent)
+    with categories.read_locked():
+        total_categories = len(categories)
+        total_tickets = 0
+        total_value = 0.0
+        passenger_class_counts = Counter()
+        entitlement_type_counts = Counter()
+        
+        for category_obj in categories.values():
+            ticket_count = category_obj.get_ticket_count()
+            total_tickets += ticket_count
+            if ticket_count:
+                total_value += category_obj.get_mean_price() * ticket_count
+            passenger_class_counts.update(category_obj.get_passenger_class_counts())
+            entitlement_type_counts.update(category_obj.get_entitlement_type_counts())
+        
+        print(f"\nTICKET INFORMATION:")
+        print(f"  Total categories: {total_categories}")
+        print(f"  Total tickets: {total_tickets}")
+        if total_tickets:
+            lowest = min(c.get_min_price() for c in categories.values() if c.get_ticket_count())
+            highest = max(c.get_max_price() for c in categories.values() if c.get_ticket_count())
+            print(f"  Prices: £{lowest:.2f} - £{highest:.2f} (average £{total_value / total_tickets:.2f})")
+        
+        # Show tickets per category
+        print(f"\nTICKETS BY CATEGORY:")
+        for category_name, category_obj in categories.items():
+            ticket_count = category_obj.get_ticket_count()
+            if ticket_count:
+                print(f"  {category_name}: {ticket_count} tickets, "
+                      f"£{category_obj.get_min_price():.2f} - £{category_obj.get_max_price():.2f} "
+                      f"(average £{category_obj.get_mean_price():.2f})")
+            else:
+                print(f"  {category_name}: 0 tickets")
     
-    print(f"\nTICKET INFORMATION:")
-    print(f"  Total categories: {total_categories}")
-    print(f"  Total tickets: {total_tickets}")
+    print(f"\nTICKETS BY PASSENGER CLASS:")
+    for passenger_class, count in passenger_class_counts.most_common():
+        print(f"  {passenger_class}: {count}")
     
-    # Show tickets per category
-    print(f"\nTICKETS BY CATEGORY:")
-    for category_name, category_obj in categories.items():
-        ticket_count = len(category_obj.get_all_tickets())
-        print(f"  {category_name}: {ticket_count} tickets")
+    print(f"\nTICKETS BY ENTITLEMENT TYPE:")
+    for entitlement_type, count in entitlement_type_counts.most_common():
+        print(f"  {entitlement_type}: {count}")
     
-    # Load purchase statistics
-    all_purchases = load_purchases()
+    # Purchase totals, summed over the log in parallel once it is big
+    try:
+        purchase_stats = collect_stats('data/purchases.txt')
+    except FileNotFoundError:
+        purchase_stats = None
     
-    if all_purchases:
-        total_purchases = len(all_purchases)
-        total_revenue = 0.0
-        
-        for purchase_data in all_purchases:
-            try:
-                purchase_info = Purchase.from_file_format(purchase_data)
-                total_revenue += float(purchase_info['total'])
-            except Exception:
-                continue
-        
-        print(f"\nPURCHASE INFORMATION:")
-        print(f"  Total purchases: {total_purchases}")
-        print(f"  Total revenue: £{total_revenue:.2f}")
-        if total_purchases > 0:
-            avg_purchase = total_revenue / total_purchases
-            print(f"  Average purchase: £{avg_purchase:.2f}")
+    print(f"\nPURCHASE INFORMATION:")
+    if purchase_stats and purchase_stats.purchases:
+        print_stats(purchase_stats)
     else:
-        print(f"\nPURCHASE INFORMATION:")
         print(f"  No purchases yet")
     
     print("\n" + "="*50)
 
 
+# ============================================================================
+# FUNCTION 7: PURCHASE REPORTS
+# ============================================================================
+@metrics.timed('admin_reports')
+def view_purchase_reports():
+    """Show revenue and sales reports built from the purchase log"""
+    
+    # Imported here so the admin panel still works without NumPy
+    import reports
+    
+    if not reports.numpy_available():
+        print("\nPurchase reports need NumPy. Install it with: pip install numpy")
+        return
+    
+    print("\n" + "="*50)
+    print("   PURCHASE REPORTS")
+    print("="*50)
+    
+    arrays = reports.load_purchase_arrays()
+    
+    if len(arrays) == 0:
+        print("\nNo purchase data to analyze.")
+        return
+    
+    # Revenue by category
+    print("\nREVENUE BY CATEGORY:")
+    for category_name, purchase_count, revenue in reports.revenue_by_category(arrays):
+        print(f"  {category_name:30} {purchase_count:>8} purchases  £{revenue / 100:,.2f}")
+    
+    # Revenue by hour of day (only hours with sales)
+    print("\nREVENUE BY HOUR:")
+    for hour, revenue in enumerate(reports.revenue_by_hour(arrays)):
+        if revenue:
+            print(f"  {hour:02d}:00  £{revenue / 100:,.2f}")
+    
+    # Revenue by day (most recent 14 days with sales)
+    print("\nREVENUE BY DAY (last 14 days with sales):")
+    days, day_revenue = reports.revenue_by_day(arrays)
+    for day, revenue in zip(days[-14:], day_revenue[-14:]):
+        print(f"  {day}  £{revenue / 100:,.2f}")
+    
+    # Quantity percentiles
+    print("\nTICKETS PER PURCHASE:")
+    for percentile, quantity in reports.quantity_percentiles(arrays).items():
+        print(f"  p{percentile}: {quantity:g}")
+    
+    # Top tickets
+    print("\nTOP 10 TICKETS:")
+    for number, (ticket_name, sold, revenue) in enumerate(reports.top_tickets(arrays), 1):
+        print(f"  {number:2}. {ticket_name:40} {sold:>8} sold  £{revenue / 100:,.2f}")
+    
+    print("\n" + "="*50)
+
+
+# ============================================================================
+# FUNCTION 8: PURCHASES BY TIME RANGE
+# ============================================================================
+def parse_time_input(text):
+    """Turn 'YYYY-MM-DD HH:MM', 'today HH:MM' or 'yesterday HH:MM' into a datetime"""
+    
+    text = text.strip().lower()
+    
+    # Allow 'today' and 'yesterday' in place of the date
+    for word, days_back in (("today", 0), ("yesterday", 1)):
+        if text.startswith(word):
+            day = datetime.now().date() - timedelta(days=days_back)
+            text = day.isoformat() + text[len(word):]
+            break
+    
+    # Accept a date with or without a time
+    for time_format in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text.strip(), time_format)
+        except ValueError:
+            continue
+    
+    raise ValueError(f"Unrecognised time '{text}'")
+
+
+@metrics.timed('admin_time_range')
+def view_purchases_by_time():
+    """Show purchases made between two times"""
+    
+    print("\n" + "="*50)
+    print("   PURCHASES BY TIME RANGE")
+    print("="*50)
+    print("Enter times as YYYY-MM-DD HH:MM, 'today HH:MM' or 'yesterday HH:MM'")
+    
+    try:
+        start = parse_time_input(input("\nFrom: "))
+        end = parse_time_input(input("To: "))
+    except ValueError as e:
+        print(f"Invalid time! {e}")
+        return
+    
+    if end <= start:
+        print("End time must be after start time!")
+        return
+    
+    total_revenue = 0.0
+    purchase_count = 0
+    
+    # Records are streamed from the log, so large ranges are fine
+    for purchase_info in purchases_between(start, end):
+        try:
+            purchase_count += 1
+            print(f"\n{purchase_count}. {purchase_info['timestamp'][:19]}")
+            print(f"   {purchase_info['category']} - {purchase_info['topup_type']}")
+            print(f"   Quantity: {purchase_info['quantity']}  Total: £{purchase_info['total']}")
+            total_revenue += float(purchase_info['total'])
+        except Exception as e:
+            print(f"Error reading purchase: {e}")
+    
+    print("\n" + "="*50)
+    if purchase_count == 0:
+        print(f"No purchases between {start:%Y-%m-%d %H:%M} and {end:%Y-%m-%d %H:%M}")
+    else:
+        print(f"Purchases: {purchase_count}")
+        print(f"Revenue: £{total_revenue:.2f}")
+    print("="*50)
+
+
+# ============================================================================
+# FUNCTION 9: LIVE SALES DASHBOARD
+# ============================================================================
+# Bar heights for the revenue-per-minute line, lowest to highest
+SPARK_BARS = "▁▂▃▄▅▆▇█"
+
+
+@metrics.timed('admin_live')
+def view_live_dashboard():
+    """Show sales in the last few minutes and revenue per minute for the last hour"""
+    
+    tracker = live_stats.tracker
+    
+    print("\n" + "="*50)
+    print("   LIVE SALES DASHBOARD")
+    print("="*50)
+    print("(purchases saved since the program started)")
+    
+    # Recent totals
+    print("\nRECENT SALES:")
+    for label, seconds in (("Last minute", 60), ("Last 5 minutes", 300),
+                           ("Last 15 minutes", 900), ("Last hour", 3600)):
+        totals = tracker.window(seconds)
+        print(f"  {label:16} {totals['purchases']:>6} purchases {totals['tickets']:>7} tickets  "
+              f"£{totals['revenue']:,.2f}")
+    
+    # Purchases by category in the last 5 minutes
+    print("\nPURCHASES BY CATEGORY (last 5 minutes):")
+    by_category = tracker.window(300)['by_category']
+    if not by_category:
+        print("  No purchases")
+    for category_name, count in by_category.most_common(10):
+        print(f"  {category_name:30} {count:>6}")
+    
+    # Revenue per minute in the last hour, one bar per minute
+    minutes = tracker.revenue_per_minute(60)
+    revenues = [revenue for _, _, revenue in minutes]
+    peak = max(revenues)
+    print("\nREVENUE PER MINUTE (last hour, oldest first):")
+    if peak == 0:
+        print("  No revenue")
+        return
+    print("  " + "".join(SPARK_BARS[round(revenue / peak * (len(SPARK_BARS) - 1))] if revenue else " "
+                         for revenue in revenues))
+    busiest_start, _, _ = max(minutes, key=lambda minute: minute[2])
+    print(f"  Average: £{sum(revenues) / len(revenues):,.2f}/min   "
+          f"Peak: £{peak:,.2f} at {datetime.fromtimestamp(busiest_start):%H:%M}")
+
+
+# ============================================================================
+# FUNCTION 10: BULK CHANGES
+# ============================================================================
+# Each change is applied to every matching ticket as one batch (see
+# bulk_changes.py), instead of one menu round-trip per ticket
+# ============================================================================
+@metrics.timed('admin_bulk')
+def bulk_changes_menu(categories):
+    """Change many tickets at once: price rise, expired tickets or a price list"""
+    
+    print("\n" + "="*40)
+    print("   BULK CHANGES")
+    print("="*40)
+    print("1. Change prices by a percentage")
+    print("2. Delete tickets that have expired")
+    print("3. Import a price list file")
+    
+    choice = input("\nEnter your choice (1-3): ").strip()
+    try:
+        if choice == "1":
+            bulk_price_change(categories)
+        elif choice == "2":
+            bulk_delete_expired(categories)
+        elif choice == "3":
+            bulk_import_price_list(categories)
+        else:
+            print("Invalid choice!")
+    except ValueError as e:
+        print(f"Invalid input! {e}")
+    except OSError as e:
+        print(f"Error: {e}")
+
+
+def bulk_price_change(categories):
+    """Raise or cut prices in a category and/or passenger class by a percentage"""
+    
+    with categories.read_locked():
+        category_list = list(categories.items())
+        class_counts = Counter()
+        for _, category_obj in category_list:
+            class_counts.update(category_obj.get_passenger_class_counts())
+    
+    # Which tickets
+    print("\nCategories:")
+    for number, (cat_name, _) in enumerate(category_list, 1):
+        print(f"{number}. {cat_name}")
+    cat_input = input("Category number (Enter for all): ").strip()
+    category_name = None
+    if cat_input:
+        cat_choice = int(cat_input) - 1
+        if cat_choice < 0 or cat_choice >= len(category_list):
+            print("Invalid category!")
+            return
+        category_name, category_obj = category_list[cat_choice]
+        class_counts = Counter(category_obj.get_passenger_class_counts())
+    
+    print(f"\nPassenger classes: {', '.join(sorted(class_counts))}")
+    passenger_class = input("Passenger class (Enter for all): ").strip() or None
+    if passenger_class:
+        matching = sum(count for name, count in class_counts.items()
+                       if name.lower() == passenger_class.lower())
+    else:
+        matching = sum(class_counts.values())
+    if not matching:
+        print("No tickets match!")
+        return
+    
+    # By how much
+    percent = float(input("Change in percent (e.g. 4.5 for a rise, -10 for a cut): ").strip())
+    round_input = input("Round to nearest pence (Enter for 1p, e.g. 5 or 10): ").strip()
+    round_to = int(round_input) if round_input else 1
+    
+    confirm = input(f"\nChange the price of up to {matching} tickets by {percent:+g}%? (yes/no): ").lower()
+    if confirm not in ['yes', 'y']:
+        print("No prices changed.")
+        return
+    
+    changed = change_prices(categories, percent, category_name, passenger_class, round_to)
+    print(f"\n✓ {changed} prices changed!")
+
+
+def bulk_delete_expired(categories):
+    """Delete every ticket whose entitlement ended before a date"""
+    
+    before_input = input("\nDelete tickets that ended before (YYYY-MM-DD, Enter for today): ").strip()
+    before = date.fromisoformat(before_input) if before_input else date.today()
+    
+    confirm = input(f"Delete every ticket that ended before {before}? (yes/no): ").lower()
+    if confirm not in ['yes', 'y']:
+        print("No tickets deleted.")
+        return
+    
+    deleted = remove_expired(categories, before)
+    print(f"\n✓ {deleted} expired tickets deleted!")
+
+
+def bulk_import_price_list(categories):
+    """Set prices from a CSV price list (topup_id and price)"""
+    
+    print("\nThe file needs a topup_id column and a price column (price in pounds")
+    print("or topup_price_in_pence). An optional category_title column limits a")
+    print("row to one category.")
+    filename = input("Price list file: ").strip()
+    if not filename:
+        print("No file given!")
+        return
+    
+    report, changed = apply_price_list(categories, filename)
+    report.print()
+    print(f"\n✓ {changed} prices changed!")
+
+
 # ============================================================================
 # ADMIN LOGIN (Simple password check)
 # ============================================================================
@@ -393,7 +750,7 @@ def admin_panel(categories):
         display_admin_menu()
         
         try:
-            choice = input("\nEnter your choice (1-7): ")
+            choice = input("\nEnter your choice (1-11): ")
             
             if choice == "1":
                 view_all_tickets(categories)
@@ -408,10 +765,18 @@ def admin_panel(categories):
             elif choice == "6":
                 view_system_statistics(categories)
             elif choice == "7":
+                view_purchase_reports()
+            elif choice == "8":
+                view_purchases_by_time()
+            elif choice == "9":
+                view_live_dashboard()
+            elif choice == "10":
+                bulk_changes_menu(categories)
+            elif choice == "11":
                 print("Returning to main menu...")
                 break
             else:
-                print("Invalid choice! Please enter 1-7.")
+                print("Invalid choice! Please enter 1-11.")
                 
         except KeyboardInterrupt:
             print("\nExiting admin panel...")
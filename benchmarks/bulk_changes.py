@@ -0,0 +1,92 @@
+# ============================================================================
+# BULK CHANGES BENCHMARK - BUS TICKET SYSTEM
+# ============================================================================
+# Compares a bulk price change (bulk_changes.change_prices) with making the
+# same change one ticket at a time through Catalog.set_ticket_price (what
+# the Edit Ticket Price menu option does for each ticket).
+#
+# A catalog is generated and loaded, the sorted views are built (as they
+# would be after anyone browses by price), and every price is raised by
+# --percent. The report shows:
+#   per ticket  - set_ticket_price() for each ticket; only --sample tickets
+#                 are timed and the time is scaled up to the whole catalog
+#   bulk        - change_prices() on a second copy of the catalog
+# and checks that the bulk change gave every ticket the expected price.
+#
+# Run: python benchmarks/bulk_changes.py --rows 100000 --percent 4.5
+# ============================================================================
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Make the project modules importable when run from the benchmarks folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import generate_data
+from bulk_changes import change_prices
+from file_handler import load_ticket_objects
+from ticket_views import END_DATE, PRICE
+
+
+def build_views(categories):
+    """Build the catalog-wide and per-category sorted views"""
+    for order in (PRICE, END_DATE):
+        categories.sorted_tickets(order)
+        for category in categories.values():
+            category.get_sorted_tickets(order)
+
+
+def main():
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description="Benchmark bulk price changes against per-ticket edits")
+    parser.add_argument('--rows', type=int, default=100000, help="catalog rows")
+    parser.add_argument('--percent', type=float, default=4.5, help="price change in percent")
+    parser.add_argument('--sample', type=int, default=500, help="tickets timed one at a time")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bus-bulk-')
+    try:
+        feed = os.path.join(workdir, 'tickets.csv')
+        generate_data.write_catalog(feed, args.rows)
+        factor = 1 + args.percent / 100
+
+        categories = load_ticket_objects(feed, quiet=True)
+        build_views(categories)
+        tickets = [ticket for category in categories.values() for ticket in category.tickets]
+        sample = tickets[::max(1, len(tickets) // args.sample)][:args.sample]
+        start = time.perf_counter()
+        for ticket in sample:
+            categories.set_ticket_price(ticket, round(round(ticket.price * 100) * factor) / 100)
+        per_ticket_seconds = (time.perf_counter() - start) / len(sample) * len(tickets)
+
+        categories = load_ticket_objects(feed, quiet=True)
+        build_views(categories)
+        def listing(ticket):
+            return ticket.category, ticket.topup_id, ticket.passenger_class, ticket.topup_type
+
+        expected = {listing(ticket): round(round(ticket.price * 100) * factor)
+                    for category in categories.values() for ticket in category.tickets}
+        start = time.perf_counter()
+        changed = change_prices(categories, args.percent)
+        bulk_seconds = time.perf_counter() - start
+
+        correct = all(round(ticket.price * 100) == expected[listing(ticket)]
+                      for category in categories.values() for ticket in category.tickets)
+        view = categories.sorted_tickets(PRICE)
+        correct = correct and all(a.price <= b.price for a, b in zip(view, view[1:]))
+
+        print(f"{len(tickets):,} tickets, every price {args.percent:+g}% ({changed:,} changed), "
+              f"sorted views kept up to date\n")
+        print(f"per ticket:  {per_ticket_seconds * 1000:10.0f} ms  (from {len(sample)} timed tickets)")
+        print(f"bulk:        {bulk_seconds * 1000:10.0f} ms  ({per_ticket_seconds / bulk_seconds:.0f}x faster)")
+        print(f"\nEvery price and the price view correct after the bulk change: {'yes' if correct else 'NO'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
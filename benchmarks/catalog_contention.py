@@ -0,0 +1,98 @@
+# ============================================================================
+# CATALOG LOCK CONTENTION BENCHMARK - BUS TICKET SYSTEM
+# ============================================================================
+# Measures catalog read throughput (searches) from several reader threads,
+# first with no writer and then while a writer thread keeps editing prices
+# and adding/deleting tickets through the Catalog's write lock.
+#
+# Run: python benchmarks/catalog_contention.py --readers 8 --seconds 3
+# ============================================================================
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+# Make the project modules importable when run from the benchmarks folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from catalog import find_tickets
+from file_handler import load_ticket_objects
+from ticket_classes import Ticket
+
+SEARCH_WORDS = ['adult', 'day', 'student', 'single', 'network', 'zzz']
+
+
+def reader(categories, stop, counts, slot):
+    """Search the catalog in a loop until told to stop"""
+    done = 0
+    while not stop.is_set():
+        find_tickets(categories, SEARCH_WORDS[done % len(SEARCH_WORDS)])
+        done += 1
+    counts[slot] = done
+
+
+def writer(categories, stop, counts, pause):
+    """Edit prices and add/delete a ticket in a loop until told to stop"""
+    done = 0
+    topup_ids = [ticket.topup_id for category in categories.values()
+                 for ticket in category.get_all_tickets()]
+    while not stop.is_set():
+        ticket = categories.get_ticket(topup_ids[done % len(topup_ids)])
+        categories.set_ticket_price(ticket, ticket.get_price())
+        extra = Ticket({'category_title': ticket.category, 'topup_title': 'Benchmark',
+                        'topup_id': f'bench-{done}', 'topup_price_in_pence': '100'})
+        categories.add_ticket(extra)
+        categories.remove_ticket(extra)
+        done += 3
+        if pause:
+            time.sleep(pause)
+    counts['writes'] = done
+
+
+def run(categories, readers, seconds, with_writer, pause):
+    """Run one timed round and return (reads per second, writes per second)"""
+    stop = threading.Event()
+    counts = {}
+    threads = [threading.Thread(target=reader, args=(categories, stop, counts, i))
+               for i in range(readers)]
+    if with_writer:
+        threads.append(threading.Thread(target=writer, args=(categories, stop, counts, pause)))
+
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    reads = sum(count for key, count in counts.items() if key != 'writes')
+    return reads / seconds, counts.get('writes', 0) / seconds
+
+
+def main():
+    """Run the benchmark with and without a concurrent writer"""
+    parser = argparse.ArgumentParser(description="Catalog lock contention benchmark")
+    parser.add_argument('--csv', default='data/bus_tickets.csv')
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--write-pause', type=float, default=0.001,
+                        help="seconds the writer sleeps between edits (0 = flat out)")
+    args = parser.parse_args()
+
+    categories = load_ticket_objects(args.csv)
+    if not categories:
+        return
+
+    reads_alone, _ = run(categories, args.readers, args.seconds, False, 0)
+    reads_mixed, writes = run(categories, args.readers, args.seconds, True, args.write_pause)
+
+    print(f"Readers: {args.readers}")
+    print(f"Reads/s, no writer:    {reads_alone:,.0f}")
+    print(f"Reads/s, with writer:  {reads_mixed:,.0f}  ({reads_mixed / reads_alone:.0%} of no-writer rate)")
+    print(f"Writes/s during mixed: {writes:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# ============================================================================
+# CUSTOMER HISTORY BENCHMARK - BUS TICKET SYSTEM
+# ============================================================================
+# Shows that fetching one customer's purchases through the customer index
+# (customer_index.py) costs time in proportion to their own purchases, not
+# the size of the log.
+#
+# Logs of growing size are generated with about --per-customer purchases
+# per customer. For each log the report shows:
+#   build    - indexing the whole log the first time (done once)
+#   index    - median time to fetch one customer's history
+#   scan     - reading the whole log and keeping that customer's records
+#              (what View My Purchases would have to do without the index)
+# and checks that both found the same purchases.
+#
+# Run: python benchmarks/customer_history.py --rows 100000 --steps 3
+# ============================================================================
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# Make the project modules importable when run from the benchmarks folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import generate_data
+from customer_index import CustomerIndex, purchases_for_customer
+from file_handler import load_purchases
+from ticket_classes import Purchase
+
+
+def scan_for_customer(customer_id, filename):
+    """Read the whole log and keep one customer's purchases (the way without an index)"""
+    return [purchase_info for purchase_info in map(Purchase.from_file_format, load_purchases(filename))
+            if purchase_info['customer_id'] == customer_id]
+
+
+def main():
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description="Benchmark per-customer purchase history")
+    parser.add_argument('--rows', type=int, default=100000, help="purchases in the smallest log")
+    parser.add_argument('--steps', type=int, default=3, help="log sizes to try (each 4x the last)")
+    parser.add_argument('--per-customer', type=int, default=20, help="average purchases per customer")
+    parser.add_argument('--lookups', type=int, default=50, help="customers fetched per log")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bus-customers-')
+    try:
+        catalog = os.path.join(workdir, 'tickets.csv')
+        generate_data.write_catalog(catalog, 2000)
+        products = generate_data.read_catalog_products(catalog)
+
+        print(f"{'purchases':>10} {'customers':>10} {'build':>10} {'index':>10} {'scan':>10}")
+        same = True
+        rows = args.rows
+        for step in range(args.steps):
+            filename = os.path.join(workdir, f'purchases-{step}.txt')
+            customers = max(1, rows // args.per_customer)
+            generate_data.write_purchase_log(filename, products, rows, customers=customers)
+
+            start = time.perf_counter()
+            index = CustomerIndex(filename)
+            index.update()
+            index.close()
+            build_seconds = time.perf_counter() - start
+
+            rng = random.Random(step)
+            chosen = [f'c{rng.randrange(customers) + 1:07d}' for _ in range(args.lookups)]
+            times = []
+            for customer_id in chosen:
+                start = time.perf_counter()
+                history = purchases_for_customer(customer_id, filename)
+                times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            scanned = scan_for_customer(chosen[-1], filename)
+            scan_seconds = time.perf_counter() - start
+            same = same and scanned == history
+
+            print(f"{rows:>10,} {customers:>10,} {build_seconds * 1000:8.0f} ms "
+                  f"{statistics.median(times) * 1000:7.2f} ms {scan_seconds * 1000:8.0f} ms")
+            rows *= 4
+
+        print(f"\nSame purchases from the index and the scan: {'yes' if same else 'NO'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
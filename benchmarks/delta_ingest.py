@@ -0,0 +1,134 @@
+# ============================================================================
+# DELTA INGEST BENCHMARK - BUS TICKET SYSTEM
+# ============================================================================
+# Compares applying a daily change file (catalog_delta.py) with reloading
+# the whole feed that includes the same changes.
+#
+# A catalog is generated and loaded, then a delta touching --percent of
+# its rows is made (price changes, new tickets and deletes) along with the
+# full feed after those changes. The report shows:
+#   full reload  - load_ticket_objects() on the changed feed
+#   delta        - apply_delta() on the already loaded catalog
+# and checks that both end with exactly the same tickets and prices.
+#
+# Run: python benchmarks/delta_ingest.py --rows 200000 --percent 1
+# ============================================================================
+
+import argparse
+import csv
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Make the project modules importable when run from the benchmarks folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import generate_data
+from catalog_delta import apply_delta, DELETE, UPSERT
+from file_handler import load_ticket_objects
+from ticket_classes import TICKET_CSV_COLUMNS
+
+
+def make_delta(rows, percent, seed=0):
+    """
+    Pick changes for a catalog.
+
+    Args:
+        rows (list): Ticket rows (dicts) of the catalog
+        percent (float): Share of rows to change
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        tuple: (changed feed rows, delta rows) as lists of dicts
+    """
+    rng = random.Random(seed)
+    count = max(3, int(len(rows) * percent / 100))
+    chosen = rng.sample(range(len(rows)), count)
+    new_rows = list(rows)
+    delta = []
+    deleted = set()
+
+    for number, position in enumerate(chosen):
+        row = rows[position]
+        kind = number % 5
+        if kind < 3:
+            # Price change (60%)
+            changed = dict(row, topup_price_in_pence=str(int(row['topup_price_in_pence']) + 10 + kind))
+            new_rows[position] = changed
+            delta.append(dict(changed, op=UPSERT))
+        elif kind == 3:
+            # New ticket (20%), a copy of this one with a new id
+            added = dict(row, topup_id=f"{row['topup_id'][:-6]}{number:06d}",
+                         topup_title=row['topup_title'] + ' (new)')
+            new_rows.append(added)
+            delta.append(dict(added, op=UPSERT))
+        else:
+            # Delete (20%), every listing of this product
+            deleted.add(row['topup_id'])
+            delta.append({'op': DELETE, 'topup_id': row['topup_id']})
+
+    new_rows = [row for row in new_rows if row['topup_id'] not in deleted]
+    return new_rows, delta
+
+
+def catalog_contents(categories):
+    """Sorted (category, topup_id, title, pence) of every ticket, to compare catalogs"""
+    return sorted((ticket.category, ticket.topup_id, ticket.topup_type, round(ticket.price * 100))
+                  for category in categories.values() for ticket in category.tickets)
+
+
+def main():
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description="Benchmark delta ingest against a full reload")
+    parser.add_argument('--rows', type=int, default=200000, help="catalog rows")
+    parser.add_argument('--percent', type=float, default=1.0, help="share of rows changed")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bus-delta-')
+    try:
+        feed = os.path.join(workdir, 'tickets.csv')
+        changed_feed = os.path.join(workdir, 'tickets-changed.csv')
+        delta_file = os.path.join(workdir, 'delta.csv')
+        generate_data.write_catalog(feed, args.rows)
+
+        with open(feed, newline='') as file:
+            rows = list(csv.DictReader(file))
+        new_rows, delta = make_delta(rows, args.percent)
+        with open(changed_feed, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=TICKET_CSV_COLUMNS)
+            writer.writeheader()
+            writer.writerows(new_rows)
+        with open(delta_file, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=['op'] + TICKET_CSV_COLUMNS, restval='')
+            writer.writeheader()
+            writer.writerows(delta)
+
+        categories = load_ticket_objects(feed, quiet=True)
+        start = time.perf_counter()
+        categories.build_ticket_index()
+        index_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        report, (added, updated, deleted) = apply_delta(categories, delta_file)
+        delta_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reloaded = load_ticket_objects(changed_feed, quiet=True)
+        reload_seconds = time.perf_counter() - start
+
+        same = catalog_contents(categories) == catalog_contents(reloaded)
+        print(f"{args.rows:,} rows, delta of {len(delta):,} changes ({args.percent:g}%): "
+              f"{added:,} added, {updated:,} updated, {deleted:,} deleted, {report.rejected} rejected\n")
+        print(f"full reload:        {reload_seconds * 1000:10.1f} ms")
+        print(f"delta:              {delta_seconds * 1000:10.1f} ms  ({reload_seconds / delta_seconds:.0f}x faster)")
+        print(f"(topup_id index, built once before the first delta: {index_seconds * 1000:.1f} ms)")
+        print(f"\nSame catalog after both: {'yes' if same else 'NO'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# ============================================================================
+# LOG STATISTICS SCALING BENCHMARK - BUS TICKET SYSTEM
+# ============================================================================
+# Measures how log_stats.collect_stats() scales with worker processes.
+#
+# A set of archived purchase logs is generated (one per month), then the
+# totals are computed inline and with 2, 4 ... --max-workers workers,
+# splitting the work two ways:
+#   by file   - one task per log
+#   by range  - each log cut into --split-mb ranges
+# The report shows the median time of --repeat runs and the speedup over
+# the inline run (one process), and checks every run gave exactly the
+# same totals.
+#
+# The speedup is limited by the CPUs on the machine (shown in the report);
+# with a single CPU the workers only add overhead.
+#
+# Run: python benchmarks/log_stats_scaling.py --rows 2000000 --files 6
+# ============================================================================
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Make the project modules importable when run from the benchmarks folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import generate_data
+from log_stats import collect_stats
+from purchase_log import get_verified_log
+
+
+def time_run(filenames, workers, split_bytes, repeat):
+    """
+    Time collect_stats() on the logs.
+
+    Args:
+        filenames (list): Paths to the logs
+        workers (int): Worker processes (0 for inline)
+        split_bytes (int): Target size of a range
+        repeat (int): Number of runs
+
+    Returns:
+        tuple: (median seconds, totals as a dict from the last run)
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stats = collect_stats(filenames, workers, split_bytes)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), stats.to_dict()
+
+
+def main():
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description="Benchmark parallel purchase log statistics")
+    parser.add_argument('--rows', type=int, default=2000000, help="purchases across all logs")
+    parser.add_argument('--files', type=int, default=6, help="number of logs (one per month)")
+    parser.add_argument('--max-workers', type=int, default=8, help="largest worker count to try")
+    parser.add_argument('--split-mb', type=float, default=8, help="range size for the by-range split")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per setting (median is shown)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bus-logstats-')
+    try:
+        catalog = os.path.join(workdir, 'tickets.csv')
+        generate_data.write_catalog(catalog, 2000)
+        products = generate_data.read_catalog_products(catalog)
+
+        filenames = []
+        for number in range(args.files):
+            filename = os.path.join(workdir, f'purchases-{number + 1:02d}.txt')
+            generate_data.write_purchase_log(filename, products, args.rows // args.files, seed=number,
+                                             start=datetime(2025, number % 12 + 1, 1), days=28)
+            get_verified_log(filename)  # Checked once up front, as a live log would be
+            filenames.append(filename)
+        total_bytes = sum(os.path.getsize(filename) for filename in filenames)
+
+        print(f"{args.files} logs, {args.rows:,} purchases, {total_bytes / 1024 / 1024:.0f} MB, "
+              f"{os.cpu_count()} CPU(s), median of {args.repeat}\n")
+
+        splits = [('by file', total_bytes + 1), ('by range', int(args.split_mb * 1024 * 1024))]
+        worker_counts = [0]
+        workers = 2
+        while workers <= args.max_workers:
+            worker_counts.append(workers)
+            workers *= 2
+
+        print(f"{'split':10} {'workers':>8} {'time':>10} {'speedup':>9}")
+        baseline = None
+        expected = None
+        same = True
+        for split_name, split_bytes in splits:
+            for workers in worker_counts:
+                seconds, totals = time_run(filenames, workers, split_bytes, args.repeat)
+                if baseline is None:
+                    baseline, expected = seconds, totals
+                same = same and totals == expected
+                label = 'inline' if workers == 0 else str(workers)
+                print(f"{split_name:10} {label:>8} {seconds * 1000:8.0f} ms {baseline / seconds:8.2f}x")
+
+        print(f"\nSame totals in every run: {'yes' if same else 'NO'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
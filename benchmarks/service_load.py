@@ -0,0 +1,95 @@
+# ============================================================================
+# SERVICE LOAD TEST - BUS TICKET SYSTEM
+# ============================================================================
+# Opens many concurrent keep-alive connections to a running service.py and
+# reports throughput and latency. Everything runs locally and offline.
+#
+# Run: python service.py --purchases /tmp/load.txt   (in one terminal)
+#      python benchmarks/service_load.py --clients 2000 --requests 20
+# ============================================================================
+
+import argparse
+import asyncio
+import json
+import time
+
+
+async def run_client(host, port, paths, requests, latencies, purchase_body):
+    """Send requests over one keep-alive connection, recording latencies"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for number in range(requests):
+            path = paths[number % len(paths)]
+            if path == '/purchase':
+                request = (f"POST /purchase HTTP/1.1\r\nHost: {host}\r\n"
+                           f"Content-Length: {len(purchase_body)}\r\n\r\n").encode() + purchase_body
+            else:
+                request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+
+            # Read status line and headers, then the body
+            await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':')[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def fetch_json(host, port, path):
+    """Fetch one JSON document from the service"""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+
+async def main():
+    """Run the load test and print a summary"""
+    parser = argparse.ArgumentParser(description="Load test for service.py")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--clients', type=int, default=1000, help="concurrent connections")
+    parser.add_argument('--requests', type=int, default=20, help="requests per connection")
+    parser.add_argument('--purchase-every', type=int, default=10,
+                        help="make every Nth request a purchase (0 for none)")
+    args = parser.parse_args()
+
+    # Pick a real ticket to buy so purchases succeed
+    category = await fetch_json(args.host, args.port, '/categories/1')
+    topup_id = category['tickets'][0]['topup_id']
+    purchase_body = json.dumps({'items': [{'topup_id': topup_id, 'quantity': 1}]}).encode()
+
+    paths = ['/categories', '/search?q=day', '/categories/2', '/stats']
+    if args.purchase_every:
+        paths = (paths * args.purchase_every)[:args.purchase_every - 1] + ['/purchase']
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(args.host, args.port, paths, args.requests,
+                                      latencies, purchase_body)
+                           for _ in range(args.clients)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000
+
+    print(f"Clients: {args.clients}  Requests: {len(latencies)}  Time: {elapsed:.2f}s")
+    print(f"Throughput: {len(latencies) / elapsed:,.0f} requests/s")
+    print(f"Latency p50 {percentile(50):.1f}ms  p95 {percentile(95):.1f}ms  p99 {percentile(99):.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+# ============================================================================
+# SHARDED CATALOG BENCHMARK - BUS TICKET SYSTEM
+# ============================================================================
+# Generates one fare feed per operator and measures:
+#   load     - loading the feeds one after another vs ShardedCatalog.load()
+#   scoped   - search latency for queries scoped to the first operator, as
+#              more operators are added (it should stay flat)
+#   fan-out  - search latency across every operator, next to the sum of
+#              the operators' own scoped latencies (the cost of fanning out
+#              is the difference)
+#
+# Run: python benchmarks/sharded_catalog.py --operators 4 --rows 50000
+# ============================================================================
+
+import argparse
+import gc
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# Make the project modules importable when run from the benchmarks folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import generate_data
+from sharded_catalog import CatalogShard, ShardedCatalog
+
+SEARCH_WORDS = ['adult', 'day', 'student', 'single', 'network', 'zzz']
+
+
+def search_latency(sharded, operator, repeats):
+    """Median search time in milliseconds (operator None = every operator)"""
+    timings = []
+    for number in range(repeats):
+        start = time.perf_counter()
+        sharded.search(SEARCH_WORDS[number % len(SEARCH_WORDS)], operator)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description="Benchmark the sharded multi-operator catalog")
+    parser.add_argument('--operators', type=int, default=4, help="number of operator feeds")
+    parser.add_argument('--rows', type=int, default=50000, help="ticket rows per feed")
+    parser.add_argument('--repeats', type=int, default=30, help="searches per measurement")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bus-shards-')
+    try:
+        feeds = []
+        for number in range(args.operators):
+            filename = os.path.join(workdir, f'operator{number + 1}.csv')
+            generate_data.write_catalog(filename, args.rows, seed=number)
+            feeds.append((f'operator{number + 1}', filename))
+        print(f"{args.operators} feeds of {args.rows:,} rows\n")
+
+        # Load one after another, then in parallel
+        start = time.perf_counter()
+        for operator, filename in feeds:
+            CatalogShard(operator, filename).load()
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sharded = ShardedCatalog.load(feeds)
+        parallel = time.perf_counter() - start
+        print(f"load one by one:    {serial:8.2f} s")
+        print(f"load in parallel:   {parallel:8.2f} s  ({serial / parallel:.2f}x)\n")
+
+        # Scoped queries while operators are added one at a time
+        first_operator, first_file = feeds[0]
+        growing = ShardedCatalog()
+        growing.add_operator(first_operator, first_file)
+        print(f"{'operators':>9}{'scoped ms':>12}{'fan-out ms':>12}{'sum scoped ms':>15}")
+        for count in range(1, args.operators + 1):
+            if count > 1:
+                growing.add_operator(*feeds[count - 1])
+            # As sharded_catalog.py does after loading: keep the garbage
+            # collector from walking every loaded ticket during searches
+            gc.collect()
+            gc.freeze()
+            scoped = search_latency(growing, first_operator, args.repeats)
+            fan_out = search_latency(growing, None, args.repeats)
+            each = sum(search_latency(growing, operator, args.repeats) for operator in growing.operators())
+            print(f"{count:>9}{scoped:>12.2f}{fan_out:>12.2f}{each:>15.2f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
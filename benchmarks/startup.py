@@ -0,0 +1,138 @@
+# ============================================================================
+# STARTUP BENCHMARK - BUS TICKET SYSTEM
+# ============================================================================
+# Checks that the console program starts quickly:
+#   import  - time to 'import main' in a fresh interpreter
+#   menu    - time from starting 'python main.py' until the first menu
+#             prompt appears (the catalog loads in the background)
+#   exit    - time until the program exits after choosing Exit
+# and that the admin panel, reports and purchase index are not imported
+# until they are used.
+#
+# Each time is the median of several runs and is checked against a budget;
+# the run exits with status 1 if any budget is exceeded.
+#
+# Run: python benchmarks/startup.py
+#      python benchmarks/startup.py --rows 1000000   (large generated catalog)
+# ============================================================================
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, PROJECT_DIR)
+
+# Modules that must not be imported until their feature is used
+LAZY_MODULES = ['admin', 'reports', 'purchase_index', 'customer_index', 'sqlite3', 'numpy']
+
+PROMPT = b'Enter your choice'
+
+
+def time_import(env, runs):
+    """Median time to import main in a fresh interpreter, in milliseconds"""
+    code = ("import time; start = time.perf_counter(); import main; "
+            "print((time.perf_counter() - start) * 1000)")
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', code], env=env, check=True,
+                                capture_output=True, text=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def eager_modules(env):
+    """Return the LAZY_MODULES that are loaded just by importing main"""
+    code = f"import sys, main; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, '-c', code], env=env, check=True,
+                            capture_output=True, text=True).stdout.strip()
+    return [name for name in output.split(',') if name]
+
+
+def time_first_menu(workdir, env, runs):
+    """
+    Median times until the first menu prompt and until exit, in milliseconds.
+
+    Starts 'python main.py', waits for the first prompt, chooses Exit and
+    waits for the process to end.
+    """
+    to_menu = []
+    to_exit = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, os.path.join(PROJECT_DIR, 'main.py')],
+                                   cwd=workdir, env=env, stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        seen = b''
+        while PROMPT not in seen:
+            chunk = os.read(process.stdout.fileno(), 65536)
+            if not chunk:
+                raise RuntimeError("main.py exited before showing the menu")
+            seen += chunk
+        to_menu.append((time.perf_counter() - start) * 1000)
+
+        process.communicate(b'8\n')
+        to_exit.append((time.perf_counter() - start) * 1000)
+    return statistics.median(to_menu), statistics.median(to_exit)
+
+
+def main():
+    """Run the startup benchmark from the command line"""
+    parser = argparse.ArgumentParser(description="Check startup time budgets")
+    parser.add_argument('--runs', type=int, default=5, help="runs per measurement")
+    parser.add_argument('--rows', type=int, default=0,
+                        help="use a generated catalog with this many rows (default: the real one)")
+    parser.add_argument('--import-budget', type=float, default=150.0, help="budget for importing main (ms)")
+    parser.add_argument('--menu-budget', type=float, default=250.0, help="budget until the first menu (ms)")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=PROJECT_DIR)
+    env.pop('BUS_METRICS', None)
+    env.pop('BUS_PROFILE', None)
+
+    workdir = tempfile.mkdtemp(prefix='bus-startup-')
+    os.makedirs(os.path.join(workdir, 'data'))
+    catalog_file = os.path.join(workdir, 'data', 'bus_tickets.csv')
+    if args.rows:
+        import generate_data
+        generate_data.write_catalog(catalog_file, args.rows)
+    else:
+        shutil.copyfile(os.path.join(PROJECT_DIR, 'data', 'bus_tickets.csv'), catalog_file)
+
+    try:
+        import_ms = time_import(env, args.runs)
+        eager = eager_modules(env)
+        menu_ms, exit_ms = time_first_menu(workdir, env, args.runs)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    failures = []
+    if import_ms > args.import_budget:
+        failures.append(f"import main took {import_ms:.1f} ms (budget {args.import_budget:.0f} ms)")
+    if menu_ms > args.menu_budget:
+        failures.append(f"first menu took {menu_ms:.1f} ms (budget {args.menu_budget:.0f} ms)")
+    if eager:
+        failures.append(f"imported at startup but should be lazy: {', '.join(eager)}")
+
+    print(f"Catalog: {args.rows or 'real'} rows, median of {args.runs} runs")
+    print(f"import main:        {import_ms:8.1f} ms  (budget {args.import_budget:.0f} ms)")
+    print(f"first menu shown:   {menu_ms:8.1f} ms  (budget {args.menu_budget:.0f} ms)")
+    print(f"start to exit:      {exit_ms:8.1f} ms")
+    print(f"lazy modules:       {'ok' if not eager else 'FAILED'}")
+
+    if failures:
+        print("\nOVER BUDGET:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print("\nAll startup budgets met.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
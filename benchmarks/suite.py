@@ -0,0 +1,274 @@
+# ============================================================================
+# BENCHMARK SUITE - BUS TICKET SYSTEM
+# ============================================================================
+# Times the hot paths of the program over catalogs and purchase logs of
+# growing size (10^2 rows upwards):
+#   load    - load_ticket_objects() on a catalog CSV
+#   search  - find_tickets() (what the Search menu option runs)
+#   save    - save_purchase() appending one purchase to the log
+#   stats   - the Purchase Statistics menu option over the whole log
+#   reports - the NumPy purchase reports (only if NumPy is installed)
+#
+# Every case reports p50/p95/p99 latency and peak memory (tracemalloc).
+# Results can be saved as a JSON baseline and later runs compared with it;
+# any case whose p50 got slower by more than --threshold is flagged and the
+# run exits with status 1.
+#
+# Run: python benchmarks/suite.py --max-exp 5 --save-baseline baseline.json
+#      python benchmarks/suite.py --max-exp 5 --compare baseline.json
+# ============================================================================
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Make the project modules importable when run from the benchmarks folder
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, PROJECT_DIR)
+
+import main as menu
+import reports
+from catalog import find_tickets
+import generate_data
+from file_handler import load_ticket_objects, save_purchase
+from ticket_classes import Purchase
+
+SEARCH_WORDS = ['adult', 'day', 'student', 'single', 'network', 'zzz']
+
+ALL_CASES = ['load', 'search', 'save', 'stats', 'reports']
+
+
+# ============================================================================
+# MEASURING
+# ============================================================================
+def percentile(sorted_values, fraction):
+    """
+    Return a percentile of already sorted values (nearest rank).
+
+    Args:
+        sorted_values (list): Values in ascending order
+        fraction (float): Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        float: The value at that percentile
+    """
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def measure(operation, repeats):
+    """
+    Time an operation several times and measure its peak memory once.
+
+    Args:
+        operation: Function to time (called with no arguments)
+        repeats (int): Number of timed calls
+
+    Returns:
+        dict: p50/p95/p99/mean in milliseconds, peak memory in bytes, repeats
+    """
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        operation()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    # Separate run for memory - tracemalloc slows everything down
+    tracemalloc.start()
+    try:
+        operation()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'repeats': repeats,
+        'mean_ms': sum(timings) / len(timings),
+        'p50_ms': percentile(timings, 0.50),
+        'p95_ms': percentile(timings, 0.95),
+        'p99_ms': percentile(timings, 0.99),
+        'peak_bytes': peak,
+    }
+
+
+def repeats_for(size, base):
+    """Fewer repeats for bigger inputs so every size finishes in reasonable time"""
+    return max(3, min(base, (base * 1000) // max(size, 1)))
+
+
+# ============================================================================
+# CASES
+# ============================================================================
+def bench_size(size, cases, repeats, workdir, seed):
+    """
+    Run the chosen cases at one catalog/log size.
+
+    Args:
+        size (int): Rows in the catalog and records in the purchase log
+        cases (list): Names of the cases to run
+        repeats (int): Base number of timed calls per case
+        workdir (str): Scratch folder (holds data/ like the real program)
+        seed (int): Seed for the generated catalog and log
+
+    Returns:
+        dict: Case name -> measurement
+    """
+    results = {}
+    catalog_file = os.path.join(workdir, 'data', 'bus_tickets.csv')
+    log_file = os.path.join(workdir, 'data', 'purchases.txt')
+
+    generate_data.write_catalog(catalog_file, size, seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        categories = load_ticket_objects(catalog_file)
+    tickets = [ticket for category in categories.values() for ticket in category.get_all_tickets()]
+
+    if 'load' in cases:
+        def load():
+            with contextlib.redirect_stdout(io.StringIO()):
+                load_ticket_objects(catalog_file)
+        results['load'] = measure(load, repeats_for(size, repeats))
+
+    if 'search' in cases:
+        searches = [0]
+        def search():
+            searches[0] += 1
+            find_tickets(categories, SEARCH_WORDS[searches[0] % len(SEARCH_WORDS)])
+        results['search'] = measure(search, repeats_for(size, repeats * 10))
+
+    if any(case in cases for case in ('save', 'stats', 'reports')):
+        products = generate_data.read_catalog_products(catalog_file)
+        generate_data.write_purchase_log(log_file, products, size, seed)
+
+    if 'save' in cases:
+        line = Purchase(tickets[0], 2).to_file_format()
+        def save():
+            save_purchase(line, log_file)
+        results['save'] = measure(save, repeats * 10)
+
+    if 'stats' in cases:
+        def stats():
+            with contextlib.redirect_stdout(io.StringIO()):
+                menu.view_purchase_stats()
+        results['stats'] = measure(stats, repeats_for(size, repeats))
+
+    if 'reports' in cases and reports.numpy_available():
+        def report():
+            arrays = reports.load_purchase_arrays(log_file, use_cache=False)
+            reports.revenue_by_category(arrays)
+            reports.revenue_by_hour(arrays)
+            reports.revenue_by_day(arrays)
+            reports.quantity_percentiles(arrays)
+            reports.top_tickets(arrays)
+        results['reports'] = measure(report, repeats_for(size, repeats))
+
+    return results
+
+
+# ============================================================================
+# BASELINES
+# ============================================================================
+def compare(results, baseline, threshold):
+    """
+    Find cases that got slower than the baseline.
+
+    Args:
+        results (dict): 'case:size' -> measurement for this run
+        baseline (dict): 'case:size' -> measurement from the baseline
+        threshold (float): Allowed slowdown, e.g. 0.2 for 20%
+
+    Returns:
+        list: (key, baseline p50, new p50) for each regression
+    """
+    regressions = []
+    for key, result in results.items():
+        old = baseline.get(key)
+        if old and result['p50_ms'] > old['p50_ms'] * (1 + threshold):
+            regressions.append((key, old['p50_ms'], result['p50_ms']))
+    return regressions
+
+
+def print_results(results, baseline):
+    """Print one line per case and size, with the change from the baseline"""
+    print(f"\n{'case':<10}{'size':>10}{'runs':>6}{'p50 ms':>11}{'p95 ms':>11}"
+          f"{'p99 ms':>11}{'peak MB':>10}{'vs base':>10}")
+    for key, result in results.items():
+        case, size = key.split(':')
+        change = ''
+        old = baseline.get(key)
+        if old and old['p50_ms']:
+            change = f"{(result['p50_ms'] / old['p50_ms'] - 1) * 100:+.0f}%"
+        print(f"{case:<10}{int(size):>10}{result['repeats']:>6}{result['p50_ms']:>11.3f}"
+              f"{result['p95_ms']:>11.3f}{result['p99_ms']:>11.3f}"
+              f"{result['peak_bytes'] / 1e6:>10.1f}{change:>10}")
+
+
+def main():
+    """Run the suite from the command line"""
+    parser = argparse.ArgumentParser(description="Benchmark the main code paths")
+    parser.add_argument('--min-exp', type=int, default=2, help="smallest size as a power of 10")
+    parser.add_argument('--max-exp', type=int, default=5, help="largest size as a power of 10 (up to 7)")
+    parser.add_argument('--cases', default=','.join(ALL_CASES), help="comma-separated cases to run")
+    parser.add_argument('--repeats', type=int, default=20, help="timed calls per case at small sizes")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the generated test data")
+    parser.add_argument('--save-baseline', help="save the results as a baseline JSON file")
+    parser.add_argument('--compare', help="baseline JSON file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed p50 slowdown (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    cases = [case.strip() for case in args.cases.split(',') if case.strip()]
+    baseline = {}
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file).get('results', {})
+
+    workdir = tempfile.mkdtemp(prefix='bus-bench-')
+    os.makedirs(os.path.join(workdir, 'data'))
+    start_dir = os.getcwd()
+    os.chdir(workdir)  # The menu functions use the default data/ paths
+
+    results = {}
+    try:
+        for exponent in range(args.min_exp, args.max_exp + 1):
+            size = 10 ** exponent
+            print(f"Running size {size:,}...", flush=True)
+            for case, result in bench_size(size, cases, args.repeats, workdir, args.seed).items():
+                results[f'{case}:{size}'] = result
+    finally:
+        os.chdir(start_dir)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as file:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'results': results,
+            }, file, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.compare:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nREGRESSIONS (p50 more than {args.threshold:.0%} slower than baseline):")
+            for key, old, new in regressions:
+                print(f"  {key}: {old:.3f} ms -> {new:.3f} ms")
+            return 1
+        print("\nNo regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
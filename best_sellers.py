@@ -0,0 +1,618 @@
+# ============================================================================
+# BEST-SELLER SKETCHES - BUS TICKET SYSTEM
+# ============================================================================
+# "Top N tickets" overall and per day, over purchase logs far too big for
+# an exact Counter of every ticket.
+#
+# Each view is a Space-Saving sketch: it keeps at most 'capacity' tickets
+# with a count and an error for each. When a ticket that isn't kept turns
+# up and the sketch is full, it takes over the slot of the smallest count
+# and inherits that count as its error. That gives, for every ticket:
+#
+#   count - error <= true count <= count
+#
+# and no error is bigger than the smallest kept count, which is at most
+# (purchases / capacity). Any ticket bought more often than that is
+# certainly in the sketch.
+#
+# Sketches can be merged (e.g. several log files, or a range of days) and
+# keep the same guarantee. They are saved next to the log (the same way
+# as the timestamp index in purchase_index.py), so only purchases appended
+# since the last update are ever read.
+#
+# Run: python best_sellers.py data/purchases.txt archive/purchases-2025.txt --top 10
+# ============================================================================
+
+import argparse
+import heapq
+import json
+import os
+import tempfile
+import threading
+
+from file_handler import add_purchase_listener
+from purchase_log import RECOVERY_TAIL_BYTES, check_record
+
+# Tickets kept in the all-time sketch and in each day's sketch
+TICKET_CAPACITY = 1000
+DAY_CAPACITY = 200
+
+# Days kept in the per-day sketches (older days only count towards all-time)
+KEEP_DAYS = 90
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter sketch over a stream of keys.
+
+    Attributes:
+        capacity (int): Most keys kept
+        total (int): Sum of every count added
+    """
+
+    def __init__(self, capacity):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            capacity (int): Most keys kept
+        """
+        self.capacity = capacity
+        self.total = 0
+        self._counts = {}
+        self._errors = {}
+        self._heap = []  # (count, key), with stale entries skipped lazily
+        self._floor = 0  # Most an unkept key can have, when not full (after a merge)
+
+    def __len__(self):
+        return len(self._counts)
+
+    def _smallest(self):
+        """Return (count, key) of the smallest kept count, dropping stale heap entries"""
+        while self._heap:
+            count, key = self._heap[0]
+            if self._counts.get(key) == count:
+                return count, key
+            heapq.heappop(self._heap)
+        return None
+
+    def _push(self, key):
+        """Record a key's new count in the heap (rebuilt when stale entries pile up)"""
+        heapq.heappush(self._heap, (self._counts[key], key))
+        if len(self._heap) > 4 * self.capacity + 16:
+            self._heap = [(count, key) for key, count in self._counts.items()]
+            heapq.heapify(self._heap)
+
+    def add(self, key, count=1):
+        """
+        Count a key.
+
+        Args:
+            key (str): The key, e.g. a ticket name
+            count (int, optional): How many to add. Defaults to 1.
+
+        Returns:
+            None
+        """
+        self.total += count
+        if key in self._counts:
+            self._counts[key] += count
+        elif len(self._counts) < self.capacity:
+            self._counts[key] = self._floor + count
+            self._errors[key] = self._floor
+        else:
+            smallest, evicted = self._smallest()
+            heapq.heappop(self._heap)
+            del self._counts[evicted]
+            del self._errors[evicted]
+            self._counts[key] = smallest + count
+            self._errors[key] = smallest
+        self._push(key)
+
+    def min_count(self):
+        """
+        Return the most a key that isn't kept can have been counted.
+
+        Returns:
+            int: The smallest kept count if the sketch is full, otherwise 0
+                 (every key seen is kept, so the counts are exact) unless
+                 the sketch came from merging full ones
+        """
+        if len(self._counts) < self.capacity:
+            return self._floor
+        return max(self._floor, self._smallest()[0])
+
+    def estimate(self, key):
+        """
+        Return the estimated count of a key.
+
+        Args:
+            key (str): The key
+
+        Returns:
+            tuple: (count, error) - the true count is between count - error and count
+        """
+        if key in self._counts:
+            return self._counts[key], self._errors[key]
+        smallest = self.min_count()
+        return smallest, smallest
+
+    def top(self, count=10):
+        """
+        Return the keys with the highest counts.
+
+        A key is 'guaranteed' when even its lowest possible count beats the
+        highest possible count of every key below it, so it is certainly in
+        the true top N.
+
+        Args:
+            count (int, optional): How many keys to return. Defaults to 10.
+
+        Returns:
+            list: (key, count, error, guaranteed) tuples, highest count first
+        """
+        ranked = sorted(self._counts.items(), key=lambda item: (-item[1], item[0]))
+        if len(ranked) > count:
+            next_count = ranked[count][1]
+        else:
+            next_count = self.min_count()
+        return [(key, key_count, self._errors[key], key_count - self._errors[key] >= next_count)
+                for key, key_count in ranked[:count]]
+
+    def merge(self, other):
+        """
+        Combine two sketches into a new one, as if it had seen both streams.
+
+        A key missing from a full sketch may have been counted up to that
+        sketch's min_count(), so that is added to both its count and error.
+        The result keeps the larger capacity.
+
+        Args:
+            other (SpaceSaving): The other sketch
+
+        Returns:
+            SpaceSaving: The merged sketch
+        """
+        merged = SpaceSaving(max(self.capacity, other.capacity))
+        merged.total = self.total + other.total
+        own_min = self.min_count()
+        other_min = other.min_count()
+        merged._floor = own_min + other_min
+
+        combined = []
+        for key in self._counts.keys() | other._counts.keys():
+            combined.append((self._counts.get(key, own_min) + other._counts.get(key, other_min),
+                             self._errors.get(key, own_min) + other._errors.get(key, other_min),
+                             key))
+        for key_count, error, key in heapq.nlargest(merged.capacity, combined):
+            merged._counts[key] = key_count
+            merged._errors[key] = error
+        merged._heap = [(key_count, key) for key, key_count in merged._counts.items()]
+        heapq.heapify(merged._heap)
+        return merged
+
+    def to_dict(self):
+        """
+        Convert the sketch to a JSON-friendly dictionary.
+
+        Returns:
+            dict: Capacity, total and [key, count, error] items
+        """
+        return {'capacity': self.capacity, 'total': self.total, 'floor': self._floor,
+                'items': [[key, count, self._errors[key]] for key, count in self._counts.items()]}
+
+    @staticmethod
+    def from_dict(data):
+        """
+        Create a sketch from a dictionary made by to_dict().
+
+        Args:
+            data (dict): Saved sketch
+
+        Returns:
+            SpaceSaving: The sketch
+        """
+        sketch = SpaceSaving(data['capacity'])
+        sketch.total = data['total']
+        sketch._floor = data.get('floor', 0)
+        for key, count, error in data['items']:
+            sketch._counts[key] = count
+            sketch._errors[key] = error
+        sketch._heap = [(count, key) for key, count in sketch._counts.items()]
+        heapq.heapify(sketch._heap)
+        return sketch
+
+
+class BestSellers:
+    """
+    All-time and per-day best-seller sketches for one purchase log.
+
+    Purchases are counted per ticket (topup_type), one per purchase
+    record, the same way view_purchase_stats counts categories.
+
+    Attributes:
+        filename (str): Path to the purchase log
+        tickets (SpaceSaving): Every purchase in the log
+        days (dict): Day ('YYYY-MM-DD') -> SpaceSaving for that day
+        scanned_offset (int): How far into the log has been counted
+        gap (tuple): (start, end) offsets of records before scanned_offset
+                     not counted yet (see skip_to_end), or None
+    """
+
+    def __init__(self, filename, capacity=TICKET_CAPACITY, day_capacity=DAY_CAPACITY,
+                 keep_days=KEEP_DAYS):
+        """
+        Initialize empty sketches for a purchase log.
+
+        Args:
+            filename (str): Path to the purchase log
+            capacity (int, optional): Tickets kept all-time. Defaults to TICKET_CAPACITY.
+            day_capacity (int, optional): Tickets kept per day. Defaults to DAY_CAPACITY.
+            keep_days (int, optional): Days kept. Defaults to KEEP_DAYS.
+        """
+        self.filename = filename
+        self.capacity = capacity
+        self.day_capacity = day_capacity
+        self.keep_days = keep_days
+        self.tickets = SpaceSaving(capacity)
+        self.days = {}
+        self.scanned_offset = 0
+        self.gap = None
+        self.unsaved = False
+        self.lock = threading.Lock()
+
+    def sketch_filename(self):
+        """
+        Return the path of the saved sketches.
+
+        Returns:
+            str: The log filename with '.topn' appended
+        """
+        return self.filename + '.topn'
+
+    def load(self):
+        """
+        Load previously saved sketches, if there are any.
+
+        Saved sketches with different capacities, or for a log that has
+        shrunk since, are discarded.
+
+        Returns:
+            None
+        """
+        try:
+            with open(self.sketch_filename(), 'r') as file:
+                saved = json.load(file)
+        except (OSError, ValueError):
+            return
+
+        try:
+            log_size = os.path.getsize(self.filename)
+        except OSError:
+            log_size = 0
+
+        if (saved.get('capacity') != self.capacity or saved.get('day_capacity') != self.day_capacity
+                or saved.get('scanned_offset', 0) > log_size):
+            return  # Stale sketches - they will be rebuilt
+
+        self.tickets = SpaceSaving.from_dict(saved['tickets'])
+        self.days = {day: SpaceSaving.from_dict(sketch) for day, sketch in saved['days'].items()}
+        self.scanned_offset = saved['scanned_offset']
+
+    def save(self):
+        """
+        Save the sketches next to the purchase log.
+
+        Nothing is saved while there is a gap: the counts would be missing
+        the gap's records but claim everything up to scanned_offset.
+
+        The counts are copied under the lock, so they always match the
+        saved offset, and each save writes its own temporary file, so
+        several threads can save at once.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            if self.gap is not None:
+                return
+            saved = {
+                'capacity': self.capacity,
+                'day_capacity': self.day_capacity,
+                'scanned_offset': self.scanned_offset,
+                'tickets': self.tickets.to_dict(),
+                'days': {day: sketch.to_dict() for day, sketch in self.days.items()}
+            }
+            self.unsaved = False
+
+        directory, name = os.path.split(self.sketch_filename())
+        try:
+            handle, temp_name = tempfile.mkstemp(prefix=name + '.', suffix='.tmp', dir=directory or '.')
+            try:
+                with os.fdopen(handle, 'w') as file:
+                    json.dump(saved, file)
+                os.replace(temp_name, self.sketch_filename())
+            except BaseException:
+                os.remove(temp_name)
+                raise
+        except OSError as e:
+            self.unsaved = True
+            print(f"Warning: could not save best-seller sketches: {e}")
+
+    def add_record(self, timestamp, ticket):
+        """
+        Count one purchase.
+
+        Args:
+            timestamp (str): Purchase timestamp ('YYYY-MM-DD HH:MM:SS...')
+            ticket (str): Ticket name (topup_type)
+
+        Returns:
+            None
+        """
+        self.tickets.add(ticket)
+        day = timestamp[:10]
+        sketch = self.days.get(day)
+        if sketch is None:
+            sketch = self.days[day] = SpaceSaving(self.day_capacity)
+            if len(self.days) > self.keep_days:
+                del self.days[min(self.days)]
+        sketch.add(ticket)
+
+    def _count_lines(self, file, start, stop=None):
+        """
+        Count the complete records from one offset to another (caller holds self.lock).
+
+        Args:
+            file: The log, open for reading in binary mode
+            start (int): Offset of the first record
+            stop (int, optional): Offset to stop at. Defaults to the end of the log.
+
+        Returns:
+            tuple: (offset after the last complete record read,
+                    True if any records were counted)
+        """
+        file.seek(start)
+        offset = start
+        changed = False
+        for raw_line in file:
+            if stop is not None and offset >= stop:
+                break
+            if not raw_line.endswith(b'\n'):
+                break  # Incomplete record - wait until it is finished
+            offset += len(raw_line)
+            if not check_record(raw_line):
+                continue  # Skip damaged purchases
+            parts = raw_line.decode('utf-8', 'replace').split('|', 3)
+            if len(parts) < 4:
+                continue  # Skip invalid purchases
+            self.add_record(parts[0].strip(), parts[2])
+            changed = True
+        return offset, changed
+
+    def update(self, catch_up=True):
+        """
+        Count any records appended to the log since the last update.
+
+        Only the part of the log after scanned_offset is read (and the
+        gap, if catch_up is set). A torn last line (no newline yet) is
+        left for the next update, and damaged records are skipped, as in
+        every other reader of the log.
+
+        Args:
+            catch_up (bool, optional): Also count the gap left by
+                                       skip_to_end(). Defaults to True.
+
+        Returns:
+            bool: True if new records were counted, False otherwise
+        """
+        try:
+            file = open(self.filename, 'rb')
+        except FileNotFoundError:
+            return False
+
+        changed = False
+        with self.lock, file:
+            if catch_up and self.gap is not None:
+                changed = self._count_lines(file, *self.gap)[1]
+                self.gap = None
+            self.scanned_offset, appended = self._count_lines(file, self.scanned_offset)
+            changed = changed or appended
+            if changed:
+                self.unsaved = True
+
+        return changed
+
+    def skip_to_end(self):
+        """
+        Count only records appended from now on, leaving the rest as a gap.
+
+        The records between scanned_offset and the end of the log (every
+        purchase since the sketches were last saved, or the whole log if
+        they never were) are left for update() to count later, so the
+        first purchase saved doesn't have to wait for them.
+
+        Returns:
+            None
+        """
+        try:
+            file = open(self.filename, 'rb')
+        except FileNotFoundError:
+            return
+
+        with self.lock, file:
+            if self.gap is not None:
+                return
+            file.seek(0, os.SEEK_END)
+            tail_start = max(self.scanned_offset, file.tell() - RECOVERY_TAIL_BYTES)
+            file.seek(tail_start)
+            newline = file.read().rfind(b'\n')
+            if newline == -1:
+                return  # No complete record to skip
+            end = tail_start + newline + 1
+            if end > self.scanned_offset:
+                self.gap = (self.scanned_offset, end)
+                self.scanned_offset = end
+
+    def merge(self, other):
+        """
+        Combine the sketches of another log (e.g. an archived segment) into new sketches.
+
+        Args:
+            other (BestSellers): Sketches of the other log
+
+        Returns:
+            BestSellers: Merged sketches (not tied to either file for saving)
+        """
+        merged = BestSellers(self.filename, self.capacity, self.day_capacity, self.keep_days)
+        merged.tickets = self.tickets.merge(other.tickets)
+        for day in self.days.keys() | other.days.keys():
+            if day in self.days and day in other.days:
+                merged.days[day] = self.days[day].merge(other.days[day])
+            else:
+                merged.days[day] = self.days[day] if day in self.days else other.days[day]
+        for day in sorted(merged.days)[:-self.keep_days]:
+            del merged.days[day]
+        return merged
+
+    def top_tickets(self, count=10):
+        """
+        Return the best-selling tickets of all time.
+
+        Args:
+            count (int, optional): How many tickets. Defaults to 10.
+
+        Returns:
+            tuple: (top list as in SpaceSaving.top(), number of purchases,
+                    largest possible error for a ticket not listed)
+        """
+        with self.lock:
+            return self.tickets.top(count), self.tickets.total, self.tickets.min_count()
+
+    def top_tickets_for_days(self, first_day, last_day, count=10):
+        """
+        Return the best-selling tickets over a range of days.
+
+        The sketches of the days in the range are merged, so the error of
+        each count is at most the sum of the days' errors.
+
+        Args:
+            first_day (str): First day, 'YYYY-MM-DD'
+            last_day (str): Last day (inclusive), 'YYYY-MM-DD'
+            count (int, optional): How many tickets. Defaults to 10.
+
+        Returns:
+            tuple: (top list as in SpaceSaving.top(), number of purchases,
+                    largest possible error for a ticket not listed)
+        """
+        with self.lock:
+            combined = SpaceSaving(self.day_capacity)
+            for day, sketch in self.days.items():
+                if first_day <= day <= last_day:
+                    combined = combined.merge(sketch)
+            return combined.top(count), combined.total, combined.min_count()
+
+
+# Sketches already loaded in this process, by log filename
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def get_best_sellers(filename='data/purchases.txt'):
+    """
+    Load the best-seller sketches for a log and bring them up to date.
+
+    Args:
+        filename (str, optional): Path to the purchases file. Defaults to 'data/purchases.txt'.
+
+    Returns:
+        BestSellers: Sketches covering every complete record in the log
+    """
+    with _loaded_lock:
+        best_sellers = _loaded.get(filename)
+        if best_sellers is None:
+            best_sellers = _loaded[filename] = BestSellers(filename)
+            best_sellers.load()
+    best_sellers.update()
+    if best_sellers.unsaved:
+        best_sellers.save()
+    return best_sellers
+
+
+def track_purchases(filename='data/purchases.txt'):
+    """
+    Keep the sketches for a log up to date every time purchases are saved.
+
+    Only the newly appended records are read after each save. Records
+    from before tracking started that the saved sketches don't cover are
+    counted (and the sketches written to disk) the next time
+    get_best_sellers() is used, not during a purchase.
+
+    Args:
+        filename (str, optional): Path to the purchases file. Defaults to 'data/purchases.txt'.
+
+    Returns:
+        None
+    """
+    with _loaded_lock:
+        if filename in _loaded:
+            return
+        best_sellers = _loaded[filename] = BestSellers(filename)
+        best_sellers.load()
+        best_sellers.skip_to_end()
+    add_purchase_listener(lambda purchase_lines: best_sellers.update(catch_up=False))
+
+
+def print_top(rows, total, unlisted_error):
+    """
+    Print a top-N list with its error bounds.
+
+    Args:
+        rows (list): (ticket, purchases, error, guaranteed) as in SpaceSaving.top()
+        total (int): Purchases the list was counted from
+        unlisted_error (int): Most purchases a ticket not in the sketch can have
+
+    Returns:
+        None
+    """
+    if not rows:
+        print("    No purchases")
+        return
+    for rank, (ticket, purchases, error, guaranteed) in enumerate(rows, 1):
+        marker = "*" if guaranteed else " "
+        bounds = f"(±{error})" if error else ""
+        print(f"{rank:>3}.{marker} {ticket[:45]:45} {purchases:>9} {bounds}")
+    if unlisted_error == 0 and not any(error for _, _, error, _ in rows):
+        print(f"    {total:,} purchases (exact counts)")
+    else:
+        print(f"    {total:,} purchases. Counts may be high by at most the ± shown;")
+        print(f"    * = certainly in the top {len(rows)}; a ticket not kept has at most {unlisted_error}.")
+
+
+def main():
+    """Show the best sellers of one or more purchase logs from the command line"""
+    parser = argparse.ArgumentParser(description="Approximate best-selling tickets")
+    parser.add_argument('logs', nargs='*', default=['data/purchases.txt'], help="purchase log files")
+    parser.add_argument('--top', type=int, default=10, help="number of tickets to show")
+    parser.add_argument('--day', help="also show one day (YYYY-MM-DD)")
+    parser.add_argument('--days', type=int, default=1, help="number of days from --day")
+    args = parser.parse_args()
+
+    # Each log keeps its own saved sketches; they are merged here
+    combined = None
+    for filename in args.logs:
+        best_sellers = get_best_sellers(filename)
+        combined = best_sellers if combined is None else combined.merge(best_sellers)
+
+    print(f"TOP {args.top} TICKETS ({len(args.logs)} log file(s))")
+    print_top(*combined.top_tickets(args.top))
+
+    if args.day:
+        days = sorted(day for day in combined.days if day >= args.day)[:args.days]
+        last_day = days[-1] if days else args.day
+        print(f"\nTOP {args.top} TICKETS {args.day} to {last_day}")
+        print_top(*combined.top_tickets_for_days(args.day, last_day, args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+# ============================================================================
+# BULK ADMIN CHANGES - BUS TICKET SYSTEM
+# ============================================================================
+# Changes many tickets at once instead of one menu round-trip per ticket:
+#
+#   change_prices()   - raise (or cut) every price in a category and/or
+#                       passenger class by a percentage, e.g. the annual
+#                       fare rise
+#   remove_expired()  - delete every ticket whose entitlement ended before
+#                       a date
+#   apply_price_list() - set prices from a CSV file of topup_id and price
+#
+# Each one is a single batch (Catalog.update_where): the tickets are picked
+# and changed under one write lock, the whole batch is journaled in one
+# write, and each category, its aggregates and each sorted view is rebuilt
+# once for the batch rather than once per ticket.
+#
+# Run: python bulk_changes.py prices --percent 4.5 --passenger-class Adult
+#      python bulk_changes.py expired --before 2026-01-01
+#      python bulk_changes.py price-list prices.csv
+# ============================================================================
+
+import argparse
+import csv
+import os
+import time
+from datetime import date, datetime
+
+from catalog_ingest import IngestReport, MAX_PRICE_PENCE, default_reject_file
+from ticket_views import end_date_key
+
+# Columns a price list may use for the price (pence is used if both are given)
+PRICE_LIST_PENCE = 'topup_price_in_pence'
+PRICE_LIST_POUNDS = 'price'
+
+
+def change_prices(categories, percent, category_name=None, passenger_class=None, round_to=1):
+    """
+    Change the price of many tickets by a percentage, as one batch.
+
+    Args:
+        categories (Catalog): The catalog to change
+        percent (float): Change in percent (e.g. 4.5 for a 4.5% rise, -10 for a cut)
+        category_name (str, optional): Only this category. Defaults to every category.
+        passenger_class (str, optional): Only this passenger class (any case).
+                                         Defaults to every class.
+        round_to (int, optional): Round new prices to this many pence. Defaults to 1.
+
+    Returns:
+        int: Number of tickets whose price changed
+
+    Raises:
+        ValueError: If the change would make prices negative or put a price
+                    over MAX_PRICE_PENCE (nothing is changed), or round_to
+                    isn't positive
+    """
+    if percent <= -100:
+        raise ValueError("Prices can't be cut by 100% or more")
+    if round_to < 1:
+        raise ValueError("Prices must be rounded to at least 1p")
+    factor = 1 + percent / 100
+    wanted_class = passenger_class.strip().lower() if passenger_class else None
+
+    def change(ticket):
+        if wanted_class and ticket.passenger_class.strip().lower() != wanted_class:
+            return ticket
+        pence = round(ticket.price * 100)
+        new_pence = int(round(pence * factor / round_to)) * round_to
+        if new_pence == pence:
+            return ticket
+        if new_pence > MAX_PRICE_PENCE:
+            # Raised before the batch is applied, so no price is changed
+            raise ValueError(f"{ticket.topup_type} would cost £{new_pence / 100:,.2f}, "
+                             f"over the £{MAX_PRICE_PENCE // 100:,} limit")
+        return ticket.with_price(new_pence / 100)
+
+    updated, _ = categories.update_where(change, category_name)
+    return updated
+
+
+def remove_expired(categories, before):
+    """
+    Delete every ticket whose entitlement ended before a date, as one batch.
+
+    Tickets without an end date are kept.
+
+    Args:
+        categories (Catalog): The catalog to change
+        before (date or datetime): Tickets that ended before this are deleted
+                                   (a date means the start of that day)
+
+    Returns:
+        int: Number of tickets deleted
+    """
+    if not isinstance(before, datetime):
+        before = datetime(before.year, before.month, before.day)
+    cutoff = before.timestamp()
+
+    def change(ticket):
+        no_end_date, ends = end_date_key(ticket)
+        return None if not no_end_date and ends < cutoff else ticket
+
+    _, deleted = categories.update_where(change)
+    return deleted
+
+
+def read_price_list(categories, filename, reject_file=None):
+    """
+    Read and check a price list.
+
+    A price list is a CSV file with a topup_id column and a price, either
+    in pence (topup_price_in_pence) or in pounds (price). An optional
+    category_title column limits a row to that category's listing;
+    otherwise every listing of the topup_id gets the price. Bad rows and
+    rows for tickets that aren't in the catalog go to the reject file.
+
+    Args:
+        categories (Catalog): The catalog the prices are for
+        filename (str): Path to the price list
+        reject_file (str, optional): Where to write bad rows. Defaults to
+                                     default_reject_file(filename).
+
+    Returns:
+        tuple: (new prices as {(topup_id, category or None): pence},
+                IngestReport with rows and rejects counted)
+
+    Raises:
+        FileNotFoundError: If the price list doesn't exist
+        ValueError: If the file has no topup_id or price column
+    """
+    report = IngestReport(filename)
+    report.size = os.path.getsize(filename)
+    reject_file = reject_file or default_reject_file(filename)
+    prices = {}
+    reject_handle = None
+
+    with open(filename, 'r', encoding='utf-8', errors='replace', newline='') as file:
+        reader = csv.reader(file)
+        header = [name.strip() for name in next(reader, [])]
+        if 'topup_id' not in header or not {PRICE_LIST_PENCE, PRICE_LIST_POUNDS} & set(header):
+            raise ValueError(f"{filename} needs a topup_id column and a "
+                             f"{PRICE_LIST_PENCE} or {PRICE_LIST_POUNDS} column")
+
+        try:
+            for fields in reader:
+                if not fields:
+                    continue
+                report.rows += 1
+                row = dict(zip(header, (field.strip() for field in fields)))
+                reasons, pence = _check_price_row(categories, row, len(fields) == len(header))
+                if not reasons:
+                    prices[(row['topup_id'], row.get('category_title') or None)] = pence
+                    continue
+
+                if reject_handle is None:
+                    reject_handle = open(reject_file, 'w', encoding='utf-8', newline='')
+                    rejects = csv.writer(reject_handle)
+                    rejects.writerow(['line', 'reasons'] + header)
+                rejects.writerow([reader.line_num, '; '.join(reasons)] + fields)
+                report.rejected += 1
+                report.reasons.update(set(reason.split(':', 1)[0] for reason in reasons))
+        finally:
+            if reject_handle is not None:
+                reject_handle.close()
+
+    if reject_handle is not None:
+        report.reject_file = reject_file
+    elif os.path.exists(reject_file):
+        os.remove(reject_file)  # Left over from an earlier bad price list
+    return prices, report
+
+
+def _check_price_row(categories, row, complete):
+    """
+    Check one row of a price list.
+
+    Args:
+        categories (Catalog): The catalog the prices are for
+        row (dict): Column name -> stripped value
+        complete (bool): Whether the row had as many fields as the header
+
+    Returns:
+        tuple: (list of reasons the row is bad, price in pence or None)
+    """
+    if not complete:
+        return ["wrong number of fields"], None
+
+    topup_id = row.get('topup_id', '')
+    category_name = row.get('category_title') or None
+    if not topup_id:
+        return ["missing topup_id"], None
+    if categories.get_ticket(topup_id, category_name) is None:
+        where = f" in {category_name[:40]!r}" if category_name else ""
+        return [f"unknown topup_id: {topup_id[:40]!r}{where}"], None
+
+    try:
+        if row.get(PRICE_LIST_PENCE):
+            pence = int(row[PRICE_LIST_PENCE])
+        else:
+            pence = round(float(row.get(PRICE_LIST_POUNDS) or '') * 100)
+    except ValueError:
+        return ["bad price: not a number"], None
+    if not 0 <= pence <= MAX_PRICE_PENCE:
+        return [f"bad price: {pence}p is outside 0-{MAX_PRICE_PENCE}p"], None
+    return [], pence
+
+
+def apply_price_list(categories, filename, reject_file=None):
+    """
+    Check a price list and apply its good rows to the catalog as one batch.
+
+    Args:
+        categories (Catalog): The catalog to change
+        filename (str): Path to the price list
+        reject_file (str, optional): Where to write bad rows. Defaults to
+                                     default_reject_file(filename).
+
+    Returns:
+        tuple: (IngestReport, number of tickets whose price changed)
+
+    Raises:
+        FileNotFoundError: If the price list doesn't exist
+        ValueError: If the file has no topup_id or price column
+    """
+    started = time.perf_counter()
+    prices, report = read_price_list(categories, filename, reject_file)
+
+    def change(ticket):
+        pence = prices.get((ticket.topup_id, ticket.category))
+        if pence is None:
+            pence = prices.get((ticket.topup_id, None))
+        if pence is None or pence == round(ticket.price * 100):
+            return ticket
+        return ticket.with_price(pence / 100)
+
+    updated = 0
+    if prices:
+        updated, _ = categories.update_where(change)
+    report.loaded = report.rows - report.rejected
+    report.seconds = time.perf_counter() - started
+    return report, updated
+
+
+def main():
+    """Apply a bulk change to the saved catalog from the command line"""
+    from catalog_journal import open_catalog
+
+    parser = argparse.ArgumentParser(description="Bulk changes to the ticket catalog")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    prices_parser = commands.add_parser('prices', help="change prices by a percentage")
+    prices_parser.add_argument('--percent', type=float, required=True, help="e.g. 4.5 or -10")
+    prices_parser.add_argument('--category', help="only this category")
+    prices_parser.add_argument('--passenger-class', help="only this passenger class, e.g. Adult")
+    prices_parser.add_argument('--round-to', type=int, default=1, help="round to this many pence")
+
+    expired_parser = commands.add_parser('expired', help="delete tickets that ended before a date")
+    expired_parser.add_argument('--before', required=True, help="date, e.g. 2026-01-01")
+
+    list_parser = commands.add_parser('price-list', help="set prices from a CSV file")
+    list_parser.add_argument('price_list', help="CSV with topup_id and price or topup_price_in_pence")
+    list_parser.add_argument('--rejects', help="reject file (default: <price list>.rejects.csv)")
+
+    args = parser.parse_args()
+    categories = open_catalog()
+    if not categories:
+        print("Cannot make changes without ticket data.")
+        return
+
+    started = time.perf_counter()
+    try:
+        if args.command == 'prices':
+            changed = change_prices(categories, args.percent, args.category,
+                                    args.passenger_class, args.round_to)
+            print(f"Changed {changed:,} prices by {args.percent:+g}%")
+        elif args.command == 'expired':
+            deleted = remove_expired(categories, date.fromisoformat(args.before))
+            print(f"Deleted {deleted:,} tickets that ended before {args.before}")
+        else:
+            report, changed = apply_price_list(categories, args.price_list, args.rejects)
+            report.print()
+            print(f"  Prices changed: {changed:,}")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return
+    print(f"Done in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
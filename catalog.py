@@ -0,0 +1,781 @@
+# ============================================================================
+# CATALOG - BUS TICKET SYSTEM
+# ============================================================================
+# This file holds the in-memory catalog (the category map) and the catalog
+# operations shared by the console menus and the HTTP service, so both
+# front ends search, look up and change tickets in exactly the same way.
+#
+# The catalog is protected by a reader-writer lock: any number of readers
+# (browse, search, purchase listings) can run at the same time, while admin
+# changes (add, edit price, delete) wait for the readers to finish and then
+# run one at a time.
+#
+# Every change also produces a new catalog version. A purchase pins the
+# version it started with (a CatalogSnapshot) so an admin price change
+# half-way through a purchase can't change what the customer pays.
+# ============================================================================
+
+import threading
+from contextlib import contextmanager
+from types import MappingProxyType
+
+import metrics
+from ticket_classes import Category
+from ticket_views import SORT_KEYS, SortedTicketView
+
+
+class ReadWriteLock:
+    """
+    Lock that allows many readers or a single writer.
+
+    Writers are preferred: once a writer is waiting, new readers wait too,
+    so a steady stream of readers cannot keep an admin change out forever.
+    The lock is not re-entrant - a thread holding the read lock must not
+    ask for it again.
+    """
+
+    def __init__(self):
+        """
+        Initialize an unlocked lock.
+        """
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        """
+        Wait until no writer holds or is waiting for the lock, then read-lock it.
+
+        Returns:
+            None
+        """
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+        """
+        Release a read lock.
+
+        Returns:
+            None
+        """
+        with self._condition:
+            self._readers -= 1
+            if self._readers == 0:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        """
+        Wait until there are no readers or writers, then write-lock it.
+
+        Returns:
+            None
+        """
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writer or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+
+    def release_write(self):
+        """
+        Release the write lock.
+
+        Returns:
+            None
+        """
+        with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+    @contextmanager
+    def read_locked(self):
+        """
+        Context manager holding the read lock for the 'with' block.
+        """
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+        """
+        Context manager holding the write lock for the 'with' block.
+        """
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class CatalogSnapshot:
+    """
+    Read-only view of the catalog at one version.
+
+    A snapshot maps category names to tuples of tickets. Tickets are never
+    changed after they are published (a price edit creates a new Ticket),
+    so a snapshot keeps showing the same tickets and prices forever.
+    Snapshots share the tuples of every category that didn't change
+    between versions, so making a new version only copies the categories
+    that were edited.
+
+    Sorted listings are copied from the category's sorted views when
+    they have been built, and otherwise sorted once the first time the
+    snapshot is asked for them.
+
+    Attributes:
+        version (int): The catalog version this snapshot shows
+    """
+
+    def __init__(self, version, category_tickets, sorted_tickets=None):
+        """
+        Initialize a snapshot.
+
+        Args:
+            version (int): The catalog version
+            category_tickets (dict): Category name to tuple of tickets
+            sorted_tickets (dict, optional): (category name, order) to tuple
+                                             of tickets in that order. Defaults to none.
+        """
+        self.version = version
+        self._category_tickets = MappingProxyType(category_tickets)
+        self._sorted_tickets = sorted_tickets or {}
+
+    def category_names(self):
+        """
+        Return the category names in catalog order.
+
+        Returns:
+            list: Category names (str)
+        """
+        return list(self._category_tickets)
+
+    def get_tickets(self, category_name, order=None):
+        """
+        Return the tickets in one category.
+
+        Args:
+            category_name (str): The category name
+            order (str, optional): 'price' (cheapest first) or 'end_date'
+                                   (expiring soonest). Defaults to catalog order.
+
+        Returns:
+            tuple: Ticket objects (empty if there is no such category)
+        """
+        tickets = self._category_tickets.get(category_name, ())
+        if order is None:
+            return tickets
+        ordered = self._sorted_tickets.get((category_name, order))
+        if ordered is None:
+            ordered = tuple(sorted(tickets, key=SORT_KEYS[order]))
+            self._sorted_tickets[(category_name, order)] = ordered
+        return ordered
+
+    def items(self):
+        """
+        Return (category name, tickets) pairs in catalog order.
+
+        Returns:
+            list: (str, tuple of Ticket) pairs
+        """
+        return list(self._category_tickets.items())
+
+    def next_version(self, version, category_names, changed_categories):
+        """
+        Build the snapshot for a later version, sharing unchanged categories.
+
+        Args:
+            version (int): The new version number
+            category_names (iterable): All category names, in catalog order
+            changed_categories (dict): Category name to Category object,
+                                       for categories that changed
+
+        Returns:
+            CatalogSnapshot: The new snapshot
+        """
+        category_tickets = {}
+        sorted_tickets = {}
+        for name in category_names:
+            category = changed_categories.get(name)
+            if category is not None:
+                category_tickets[name] = tuple(category.get_all_tickets())
+                for order in category.sorted_orders():
+                    sorted_tickets[(name, order)] = tuple(category.get_sorted_tickets(order))
+            else:
+                category_tickets[name] = self._category_tickets[name]
+        for (name, order), tickets in list(self._sorted_tickets.items()):
+            if name in category_tickets and name not in changed_categories:
+                sorted_tickets[(name, order)] = tickets
+        return CatalogSnapshot(version, category_tickets, sorted_tickets)
+
+
+class Catalog(dict):
+    """
+    The category map: a dictionary of category names to Category objects.
+
+    Behaves exactly like the plain dictionary the rest of the program has
+    always used, but adds a reader-writer lock, a topup_id lookup table and
+    methods that make every change under the write lock. All changes to
+    the catalog should go through these methods. The lookup table is only
+    built the first time a ticket is looked up by id, so loading stays
+    fast for the console menus, which never need it.
+
+    Sorted views across the whole catalog (cheapest first, expiring
+    soonest) are also built on first use and then kept in order by every
+    change, like the ones each Category keeps for its own tickets.
+
+    Each change increases the version number. Snapshots of a version are
+    built only when someone asks for one, and only the categories changed
+    since the previous snapshot are copied. Pinned snapshots are kept
+    until their last reader unpins them; after that the catalog drops its
+    reference so they can be freed.
+
+    If a journal is attached (see catalog_journal.py) every change is
+    written to it before it is applied, so admin changes survive a restart.
+
+    Attributes:
+        lock (ReadWriteLock): Lock shared by all readers and writers
+        version (int): Current catalog version (increases on every change)
+        journal (CatalogJournal): Write-ahead journal, or None
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty catalog.
+        """
+        super().__init__()
+        self.lock = ReadWriteLock()
+        self.version = 0
+        self.journal = None
+        self._ticket_index = None  # topup_id -> list of tickets, built on first use
+        self._index_lock = threading.Lock()
+        self._views = {}  # order -> SortedTicketView of every ticket, built on first use
+        self._views_lock = threading.Lock()
+        self._snapshot = CatalogSnapshot(0, {})
+        self._changed_categories = set()
+        self._pins = {}  # version -> [snapshot, number of readers]
+        self._snapshot_lock = threading.Lock()
+
+    def read_locked(self):
+        """
+        Context manager holding the catalog's read lock.
+
+        Returns:
+            contextmanager: Use as 'with catalog.read_locked():'
+        """
+        return self.lock.read_locked()
+
+    def _mark_changed(self, category_name):
+        """
+        Record a change to a category (caller holds the write lock).
+
+        Args:
+            category_name (str): The category that changed
+
+        Returns:
+            None
+        """
+        self.version += 1
+        self._changed_categories.add(category_name)
+
+    def snapshot(self):
+        """
+        Return a snapshot of the current version.
+
+        Returns:
+            CatalogSnapshot: Read-only view of the catalog right now
+        """
+        with self.lock.read_locked(), self._snapshot_lock:
+            if self._snapshot.version != self.version:
+                changed = {name: self[name]
+                           for name in self._changed_categories if name in self}
+                self._snapshot = self._snapshot.next_version(self.version, self.keys(), changed)
+                self._changed_categories = set()
+            return self._snapshot
+
+    def pin(self):
+        """
+        Pin the current version for a reader.
+
+        The snapshot is kept alive until unpin() is called for it as many
+        times as it was pinned.
+
+        Returns:
+            CatalogSnapshot: The pinned snapshot
+        """
+        snapshot = self.snapshot()
+        with self._snapshot_lock:
+            entry = self._pins.setdefault(snapshot.version, [snapshot, 0])
+            entry[1] += 1
+        return snapshot
+
+    def unpin(self, snapshot):
+        """
+        Release a snapshot returned by pin().
+
+        Args:
+            snapshot (CatalogSnapshot): The snapshot to release
+
+        Returns:
+            None
+        """
+        with self._snapshot_lock:
+            entry = self._pins.get(snapshot.version)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self._pins[snapshot.version]
+
+    @contextmanager
+    def pinned(self):
+        """
+        Context manager that pins the current version for the 'with' block.
+
+        Yields:
+            CatalogSnapshot: The pinned snapshot
+        """
+        snapshot = self.pin()
+        try:
+            yield snapshot
+        finally:
+            self.unpin(snapshot)
+
+    def pinned_versions(self):
+        """
+        Return the versions that still have readers.
+
+        Returns:
+            list: Sorted version numbers (int)
+        """
+        with self._snapshot_lock:
+            return sorted(self._pins)
+
+    def get_ticket(self, topup_id, category_name=None):
+        """
+        Look up a ticket by its topup_id.
+
+        The same product (same topup_id) can be listed in more than one
+        category, so a category name can be given to pick one listing.
+
+        Args:
+            topup_id (str): The ticket's topup_id
+            category_name (str, optional): Only match tickets in this category
+
+        Returns:
+            Ticket: The first matching ticket, or None if there is none
+        """
+        index = self._ticket_index
+        if index is None:
+            index = self.build_ticket_index()
+        for ticket in index.get(topup_id, ()):
+            if category_name is None or ticket.category == category_name:
+                return ticket
+        return None
+
+    def build_ticket_index(self):
+        """
+        Build the topup_id lookup table if it hasn't been built yet.
+
+        Called automatically by the first get_ticket(). Call it directly
+        to build the table up front (e.g. before forking workers, so they
+        all share one copy).
+
+        Returns:
+            dict: The lookup table (topup_id -> list of tickets)
+        """
+        with self._index_lock:
+            if self._ticket_index is None:
+                index = {}
+                with self.lock.read_locked():
+                    for category in self.values():
+                        for ticket in category.tickets:
+                            index.setdefault(ticket.topup_id, []).append(ticket)
+                    self._ticket_index = index
+            return self._ticket_index
+
+    def _index_replace(self, old_ticket, new_ticket):
+        """
+        Replace (or with new_ticket None, remove) a ticket in the topup_id index.
+
+        Args:
+            old_ticket (Ticket): The indexed ticket
+            new_ticket (Ticket): Its replacement, or None to remove it
+
+        Returns:
+            None
+        """
+        if self._ticket_index is None:
+            return  # Not built yet - it will include the change when it is
+        listings = self._ticket_index.get(old_ticket.topup_id, [])
+        for position, ticket in enumerate(listings):
+            if ticket is old_ticket:
+                if new_ticket is None:
+                    del listings[position]
+                else:
+                    listings[position] = new_ticket
+                break
+        if not listings:
+            self._ticket_index.pop(old_ticket.topup_id, None)
+
+    def sorted_tickets(self, order, limit=None):
+        """
+        Return tickets from every category in a sorted order.
+
+        The first call for an order sorts the whole catalog once; after
+        that every change keeps the order up to date, so asking for the
+        first N (e.g. the 10 cheapest tickets) doesn't sort anything.
+
+        Args:
+            order (str): 'price' (cheapest first) or 'end_date' (expiring soonest)
+            limit (int, optional): Only return the first this many. Defaults to all.
+
+        Returns:
+            list: Ticket objects in that order
+        """
+        with self.lock.read_locked():
+            view = self._views.get(order)
+            if view is None:
+                with self._views_lock:
+                    view = self._views.get(order)
+                    if view is None:
+                        tickets = (ticket for category in self.values() for ticket in category.tickets)
+                        view = self._views[order] = SortedTicketView(order, tickets)
+            return view.tickets(limit)
+
+    def _views_replace(self, old_ticket, new_ticket):
+        """
+        Update the catalog-wide sorted views (caller holds the write lock).
+
+        Args:
+            old_ticket (Ticket): The ticket being replaced, or None for an add
+            new_ticket (Ticket): Its replacement, or None for a delete
+
+        Returns:
+            None
+        """
+        for view in self._views.values():
+            if old_ticket is None:
+                view.add(new_ticket)
+            elif new_ticket is None:
+                view.remove(old_ticket)
+            else:
+                view.replace(old_ticket, new_ticket)
+
+    def _apply_category_changes(self, changes):
+        """
+        Apply a batch of replacements and removals (caller holds the write lock).
+
+        Each category is rebuilt once (Category.update_tickets) and each
+        catalog-wide sorted view once for the whole batch.
+
+        Args:
+            changes (dict): Category name -> {id(old ticket): new Ticket
+                            (in the same category) or None to remove it}
+
+        Returns:
+            None
+        """
+        applied = []
+        for category_name, category_changes in changes.items():
+            if not category_changes:
+                continue
+            category_applied = self[category_name].update_tickets(category_changes)
+            for old_ticket, new_ticket in category_applied:
+                self._index_replace(old_ticket, new_ticket)
+            applied += category_applied
+            self._mark_changed(category_name)
+        for view in self._views.values():
+            view.update_many(applied)
+
+    def add_ticket(self, ticket):
+        """
+        Add a ticket, creating its category if needed.
+
+        Args:
+            ticket (Ticket): The ticket to add
+
+        Returns:
+            None
+        """
+        with self.lock.write_locked():
+            if self.journal is not None:
+                self.journal.record_add(ticket)
+            self._add_ticket_unlocked(ticket)
+        self._after_change()
+
+    def add_tickets(self, tickets):
+        """
+        Add many tickets at once, taking the write lock only once.
+
+        Much faster than calling add_ticket() for every row when loading a
+        whole file.
+
+        Args:
+            tickets (iterable): Ticket objects to add
+
+        Returns:
+            None
+        """
+        with self.lock.write_locked():
+            for ticket in tickets:
+                if self.journal is not None:
+                    self.journal.record_add(ticket)
+                self._add_ticket_unlocked(ticket)
+        self._after_change()
+
+    def apply_changes(self, upserts=(), deletes=()):
+        """
+        Apply a batch of upserts and deletes keyed by topup_id.
+
+        Deletes are applied first. An upsert replaces the listing with the
+        same topup_id and category, or is added if there is none. The whole
+        batch is journaled in one write and applied under one write lock;
+        each category touched and each sorted view is rebuilt once, and
+        the topup_id index is updated ticket by ticket, so the cost grows
+        with the batch and the categories it touches. (A big batch rebuilds
+        the catalog-wide sorted views, see SortedTicketView.update_many.)
+
+        Args:
+            upserts (iterable): Ticket objects (the last one wins if a
+                                topup_id and category appear twice)
+            deletes (iterable): (topup_id, category name) pairs; a category
+                                of None deletes every listing of the topup_id
+
+        Returns:
+            tuple: Number of tickets (added, updated, deleted)
+        """
+        self.build_ticket_index()
+        latest = {}
+        for ticket in upserts:
+            latest[(ticket.topup_id, ticket.category)] = ticket
+
+        with self.lock.write_locked():
+            changes = {}  # category name -> {id(old ticket): new ticket or None}
+            deleted = []
+            for topup_id, category_name in deletes:
+                for ticket in self._ticket_index.get(topup_id, ()):
+                    category_changes = changes.setdefault(ticket.category, {})
+                    if category_name in (None, ticket.category) and id(ticket) not in category_changes:
+                        category_changes[id(ticket)] = None
+                        deleted.append(ticket)
+
+            added = []
+            updated = []
+            for (topup_id, category_name), ticket in latest.items():
+                category_changes = changes.setdefault(category_name, {})
+                existing = None
+                for listing in self._ticket_index.get(topup_id, ()):
+                    if listing.category == category_name and id(listing) not in category_changes:
+                        existing = listing
+                        break
+                if existing is None:
+                    added.append(ticket)
+                else:
+                    category_changes[id(existing)] = ticket
+                    updated.append(ticket)
+
+            if self.journal is not None:
+                self.journal.record_batch(deleted, updated + added)
+
+            self._apply_category_changes(changes)
+            for ticket in added:
+                self._add_ticket_unlocked(ticket)
+        self._after_change()
+        return len(added), len(updated), len(deleted)
+
+    def update_where(self, change, category_name=None):
+        """
+        Replace or remove every ticket a function picks, as one batch.
+
+        change() is called for each ticket under one write lock, so it sees
+        the current prices and no other edit can slip in between reading a
+        ticket and replacing it. The batch is journaled in one write and
+        applied like apply_changes().
+
+        Args:
+            change (callable): change(ticket) returns the ticket itself to
+                               keep it, a new Ticket in the same category
+                               to replace it, or None to remove it
+            category_name (str, optional): Only look at this category.
+                                           Defaults to every category.
+
+        Returns:
+            tuple: Number of tickets (updated, deleted)
+        """
+        if category_name is not None and category_name not in self:
+            return 0, 0
+
+        with self.lock.write_locked():
+            names = [category_name] if category_name is not None else list(self)
+            changes = {}  # category name -> {id(old ticket): new ticket or None}
+            updated = []
+            deleted = []
+            for name in names:
+                category_changes = changes[name] = {}
+                for ticket in self[name].tickets:
+                    new_ticket = change(ticket)
+                    if new_ticket is ticket:
+                        continue
+                    category_changes[id(ticket)] = new_ticket
+                    if new_ticket is None:
+                        deleted.append(ticket)
+                    else:
+                        updated.append(new_ticket)
+
+            if not updated and not deleted:
+                return 0, 0
+            if self.journal is not None:
+                self.journal.record_batch(deleted, updated)
+            self._apply_category_changes(changes)
+        self._after_change()
+        return len(updated), len(deleted)
+
+    def _after_change(self):
+        """
+        Give the journal a chance to compact (called without any lock held).
+
+        Returns:
+            None
+        """
+        if self.journal is not None:
+            self.journal.maybe_compact(self)
+
+    def _add_ticket_unlocked(self, ticket):
+        """
+        Add a ticket without taking the lock (caller holds the write lock).
+
+        Args:
+            ticket (Ticket): The ticket to add
+
+        Returns:
+            None
+        """
+        cat_name = ticket.category
+        if cat_name not in self:
+            self[cat_name] = Category(cat_name)
+        self[cat_name].add_ticket(ticket)
+        if self._ticket_index is not None:
+            self._ticket_index.setdefault(ticket.topup_id, []).append(ticket)
+        self._views_replace(None, ticket)
+        self._mark_changed(cat_name)
+
+    def set_ticket_price(self, ticket, new_price):
+        """
+        Change the price of a ticket.
+
+        The ticket itself is not changed. A copy with the new price takes
+        its place, so pinned snapshots (and purchases in progress) keep
+        the old price.
+
+        Args:
+            ticket (Ticket): The ticket to change
+            new_price (float): The new price in pounds
+
+        Returns:
+            Ticket: The new Ticket object, or None if ticket wasn't in the catalog
+        """
+        with self.lock.write_locked():
+            category = self.get(ticket.category)
+            if category is None or ticket not in category.tickets:
+                return None
+            if self.journal is not None:
+                self.journal.record_price(ticket, new_price)
+            new_ticket = ticket.with_price(new_price)
+            category.replace_ticket(ticket, new_ticket)
+            self._index_replace(ticket, new_ticket)
+            self._views_replace(ticket, new_ticket)
+            self._mark_changed(ticket.category)
+        self._after_change()
+        return new_ticket
+
+    def remove_ticket(self, ticket):
+        """
+        Remove a ticket from its category.
+
+        Args:
+            ticket (Ticket): The ticket to remove
+
+        Returns:
+            bool: True if the ticket was removed, False if it wasn't in the catalog
+        """
+        with self.lock.write_locked():
+            category = self.get(ticket.category)
+            if category is None or ticket not in category.tickets:
+                return False
+            if self.journal is not None:
+                self.journal.record_delete(ticket)
+            category.remove_ticket(ticket)
+            self._index_replace(ticket, None)
+            self._views_replace(ticket, None)
+            self._mark_changed(ticket.category)
+        self._after_change()
+        return True
+
+
+@metrics.timed('find_tickets')
+def find_tickets(categories, search_word):
+    """
+    Find tickets whose name or category contains a search word.
+
+    The search is case-insensitive and matches anywhere in the ticket
+    type or the category name.
+
+    Args:
+        categories (Catalog): The category map
+        search_word (str): The text to look for
+
+    Returns:
+        list: (category_name, Ticket) tuples for every match, in catalog order
+    """
+    search_word = search_word.lower()
+    matching_tickets = []
+
+    with categories.read_locked():
+        for category in categories.values():
+            # A category-name match means every ticket in it matches
+            category_matches = search_word in category.name.lower()
+
+            for ticket in category.get_all_tickets():
+                if (category_matches or search_word in ticket.topup_type.lower()
+                        or search_word in ticket.category.lower()):
+                    matching_tickets.append((category.name, ticket))
+
+    return matching_tickets
+
+
+def ticket_to_dict(ticket):
+    """
+    Convert a ticket to a JSON-friendly dictionary.
+
+    Args:
+        ticket (Ticket): The ticket to convert
+
+    Returns:
+        dict: The ticket's public fields, with price in pounds and pence
+    """
+    return {
+        'topup_id': ticket.topup_id,
+        'category': ticket.category,
+        'category_id': ticket.category_id,
+        'topup_type': ticket.topup_type,
+        'description': ticket.topup_description,
+        'price': round(ticket.get_price(), 2),
+        'price_in_pence': round(ticket.get_price() * 100),
+        'entitlement_type': ticket.entitlement_type,
+        'entitlement_unit': ticket.entitlement_unit,
+        'entitlement_value': ticket.entitlement_value,
+        'entitlement_quantity': ticket.entitlement_quantity,
+        'start_date': ticket.start_date,
+        'end_date': ticket.end_date,
+        'passenger_class': ticket.passenger_class
+    }
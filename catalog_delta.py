@@ -0,0 +1,178 @@
+# ============================================================================
+# DELTA FEEDS - BUS TICKET SYSTEM
+# ============================================================================
+# Applies a daily change file to the catalog instead of reloading the whole
+# feed. A change file is a ticket CSV with an extra 'op' column:
+#
+#   op=upsert  a full ticket row; it replaces the listing with the same
+#              topup_id and category_title, or is added if there is none
+#   op=delete  only topup_id is needed; with a category_title only that
+#              listing goes, otherwise every listing of the topup_id
+#
+# Rows are checked like a full feed (see catalog_ingest.py) and bad ones
+# go to '<name>.rejects.csv'. The good changes are applied as one batch
+# (Catalog.apply_changes), which updates the topup_id index, the sorted
+# views and the category aggregates as it goes and records the batch in
+# the catalog journal, so it survives a restart. Applying a delta costs
+# time in proportion to the delta (and the categories it touches), not
+# the catalog.
+#
+# Run: python catalog_delta.py changes.csv
+# ============================================================================
+
+import argparse
+import csv
+import os
+import time
+
+from catalog_ingest import IngestReport, ID_PATTERN, check_row, default_reject_file
+from ticket_classes import Ticket
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+
+
+def read_delta(filename, reject_file=None):
+    """
+    Read and check a change file.
+
+    Args:
+        filename (str): Path to the change file
+        reject_file (str, optional): Where to write bad rows. Defaults to
+                                     default_reject_file(filename).
+
+    Returns:
+        tuple: (upserts (list of Ticket), deletes (list of (topup_id, category
+                or None)), IngestReport with rows and rejects counted)
+
+    Raises:
+        FileNotFoundError: If the change file doesn't exist
+        ValueError: If the file has no 'op' or 'topup_id' column
+    """
+    report = IngestReport(filename)
+    report.size = os.path.getsize(filename)
+    reject_file = reject_file or default_reject_file(filename)
+    upserts = []
+    deletes = []
+    reject_handle = None
+
+    with open(filename, 'r', encoding='utf-8', errors='replace', newline='') as file:
+        reader = csv.reader(file)
+        header = [name.strip() for name in next(reader, [])]
+        if 'op' not in header or 'topup_id' not in header:
+            raise ValueError(f"{filename} needs 'op' and 'topup_id' columns")
+        columns = {name: position for position, name in enumerate(header)}
+
+        try:
+            for fields in reader:
+                if not fields:
+                    continue
+                report.rows += 1
+                reasons = _check_change(fields, header, columns)
+                if not reasons:
+                    row = dict(zip(header, fields))
+                    if row['op'].strip().lower() == DELETE:
+                        category = row.get('category_title', '').strip() or None
+                        deletes.append((row['topup_id'].strip(), category))
+                    else:
+                        upserts.append(Ticket(row))
+                    continue
+
+                if reject_handle is None:
+                    reject_handle = open(reject_file, 'w', encoding='utf-8', newline='')
+                    rejects = csv.writer(reject_handle)
+                    rejects.writerow(['line', 'reasons'] + header)
+                rejects.writerow([reader.line_num, '; '.join(reasons)] + fields)
+                report.rejected += 1
+                report.reasons.update(set(reason.split(':', 1)[0] for reason in reasons))
+        finally:
+            if reject_handle is not None:
+                reject_handle.close()
+
+    if reject_handle is not None:
+        report.reject_file = reject_file
+    elif os.path.exists(reject_file):
+        os.remove(reject_file)  # Left over from an earlier bad change file
+    return upserts, deletes, report
+
+
+def _check_change(fields, header, columns):
+    """
+    Check one row of a change file.
+
+    Args:
+        fields (list): The row's fields
+        header (list): Column names of the change file
+        columns (dict): Column name -> position in the row
+
+    Returns:
+        list: Reasons the row is bad, empty if it is good
+    """
+    if len(fields) != len(header):
+        return [f"wrong number of fields: expected {len(header)}, found {len(fields)}"]
+    op = fields[columns['op']].strip().lower()
+    if op == UPSERT:
+        missing = [name for name in ('category_id', 'category_title', 'topup_title',
+                                     'topup_price_in_pence') if name not in columns]
+        if missing:
+            return [f"missing {name}" for name in missing]
+        return check_row(fields, header, columns)
+    if op == DELETE:
+        topup_id = fields[columns['topup_id']].strip()
+        if not topup_id:
+            return ["missing topup_id"]
+        if not ID_PATTERN.match(topup_id):
+            return [f"bad topup_id: {topup_id[:40]!r}"]
+        return []
+    return [f"bad op: {op[:20]!r} (expected {UPSERT} or {DELETE})"]
+
+
+def apply_delta(categories, filename, reject_file=None):
+    """
+    Check a change file and apply its good rows to the catalog as one batch.
+
+    Args:
+        categories (Catalog): The catalog to change
+        filename (str): Path to the change file
+        reject_file (str, optional): Where to write bad rows. Defaults to
+                                     default_reject_file(filename).
+
+    Returns:
+        tuple: (IngestReport, (added, updated, deleted) counts)
+
+    Raises:
+        FileNotFoundError: If the change file doesn't exist
+        ValueError: If the file has no 'op' or 'topup_id' column
+    """
+    started = time.perf_counter()
+    upserts, deletes, report = read_delta(filename, reject_file)
+    counts = categories.apply_changes(upserts, deletes)
+    report.loaded = report.rows - report.rejected
+    report.seconds = time.perf_counter() - started
+    return report, counts
+
+
+def main():
+    """Apply a change file to the saved catalog from the command line"""
+    from catalog_journal import open_catalog
+
+    parser = argparse.ArgumentParser(description="Apply a delta feed (upserts and deletes by topup_id)")
+    parser.add_argument('changes', help="change file (ticket CSV with an 'op' column)")
+    parser.add_argument('--rejects', help="reject file (default: <changes>.rejects.csv)")
+    args = parser.parse_args()
+
+    categories = open_catalog()
+    if not categories:
+        print("Cannot apply changes without ticket data.")
+        return
+    try:
+        report, (added, updated, deleted) = apply_delta(categories, args.changes, args.rejects)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return
+    report.print()
+    print(f"  Added: {added:,}  Updated: {updated:,}  Deleted: {deleted:,}")
+
+
+if __name__ == "__main__":
+    main()
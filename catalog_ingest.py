@@ -0,0 +1,423 @@
+# ============================================================================
+# CATALOG INGEST - BUS TICKET SYSTEM
+# ============================================================================
+# Loads a ticket feed (CSV) while checking every row, instead of trusting
+# it: a bad price used to become £0.00 without a word, and one unreadable
+# row used to stop the whole load.
+#
+# In one streaming pass each row is checked for:
+#   - the right number of fields and the required columns filled in
+#   - a price in whole pence (not negative, not absurdly large)
+#   - category and top-up ids made of id characters only
+#   - start and end dates that are ISO 8601 (or blank), in order
+# Good rows are loaded as usual. Bad rows are written to a reject file
+# (next to the feed, '<name>.rejects.csv') with their line number and the
+# reasons, and loading carries on.
+#
+# Big feeds are cut into chunks at record boundaries and the checks run
+# in worker processes while this process builds the tickets for the rows
+# that passed, so checking costs little extra time.
+#
+# Run: python catalog_ingest.py data/big_tickets.csv --workers 4
+# ============================================================================
+
+import argparse
+import csv
+import io
+import os
+import re
+import time
+import unicodedata
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from ticket_classes import Ticket
+from catalog import Catalog
+
+# Columns a row can't be loaded without
+REQUIRED_COLUMNS = ['category_id', 'category_title', 'topup_id', 'topup_title',
+                    'topup_price_in_pence']
+
+# Ids are uuids in the NOW feed, and 'new-<category>' for admin-added
+# categories (see new_category_id)
+ID_PATTERN = re.compile(r'[A-Za-z0-9][A-Za-z0-9._:-]{0,63}\Z')
+ID_COLUMNS = ['category_id', 'topup_id']
+
+DATE_COLUMNS = ['topup_entitlement_start_date', 'topup_entitlement_end_date']
+NO_DATE = ('', 'N/A')
+
+# Highest believable price (£10,000) - catches prices typed in pounds*100 twice
+MAX_PRICE_PENCE = 1000000
+
+# Feeds at least this big are checked by worker processes, in chunks of CHUNK_BYTES
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+CHUNK_BYTES = 4 * 1024 * 1024
+
+
+class IngestReport:
+    """
+    Outcome of loading one feed.
+
+    Attributes:
+        filename (str): The feed
+        reject_file (str): Where bad rows were written (None if there were none)
+        rows (int): Data rows read
+        loaded (int): Rows loaded as tickets
+        rejected (int): Rows written to the reject file
+        reasons (Counter): Number of rejected rows per kind of problem
+        seconds (float): Time taken
+        size (int): Size of the feed in bytes
+        workers (int): Worker processes used (0 = checked in this process)
+    """
+
+    def __init__(self, filename):
+        """
+        Initialize an empty report.
+
+        Args:
+            filename (str): The feed
+        """
+        self.filename = filename
+        self.reject_file = None
+        self.rows = 0
+        self.loaded = 0
+        self.rejected = 0
+        self.reasons = Counter()
+        self.seconds = 0.0
+        self.size = 0
+        self.workers = 0
+
+    def print(self):
+        """
+        Print the report.
+
+        Returns:
+            None
+        """
+        rate = self.rows / self.seconds if self.seconds else 0.0
+        megabytes = self.size / (1024 * 1024)
+        print(f"Ingested {self.filename}: {self.rows:,} rows in {self.seconds:.2f}s "
+              f"({rate:,.0f} rows/s, {megabytes / self.seconds if self.seconds else 0:.1f} MB/s, "
+              f"{self.workers or 'no'} worker processes)")
+        print(f"  Loaded: {self.loaded:,}  Rejected: {self.rejected:,}")
+        for reason, count in self.reasons.most_common():
+            print(f"    {reason}: {count:,}")
+        if self.reject_file:
+            print(f"  Rejected rows written to {self.reject_file}")
+
+
+def check_row(fields, header, columns, damaged=False):
+    """
+    Check one CSV row.
+
+    Args:
+        fields (list): The row's fields
+        header (list): Column names of the feed
+        columns (dict): Column name -> position in the row
+        damaged (bool, optional): The row had bytes that aren't UTF-8. Defaults to False.
+
+    Returns:
+        list: Reasons the row is bad ('kind: detail'), empty if it is good
+    """
+    if len(fields) != len(header):
+        return [f"wrong number of fields: expected {len(header)}, found {len(fields)}"]
+
+    reasons = []
+    for name in REQUIRED_COLUMNS:
+        if not fields[columns[name]].strip():
+            reasons.append(f"missing {name}")
+
+    price = fields[columns['topup_price_in_pence']].strip()
+    if price:
+        if not (price.isascii() and price.isdigit()):
+            reasons.append(f"bad price: {price!r} is not a whole number of pence")
+        elif int(price) > MAX_PRICE_PENCE:
+            reasons.append(f"bad price: {price} pence is over £{MAX_PRICE_PENCE // 100:,}")
+
+    for name in ID_COLUMNS:
+        value = fields[columns[name]].strip()
+        if value and not ID_PATTERN.match(value):
+            reasons.append(f"bad {name}: {value[:40]!r}")
+
+    dates = []
+    for name in DATE_COLUMNS:
+        position = columns.get(name)
+        value = fields[position].strip() if position is not None else ''
+        if value in NO_DATE:
+            continue
+        try:
+            dates.append(datetime.fromisoformat(value))
+        except ValueError:
+            reasons.append(f"bad date: {name} {value[:40]!r}")
+    if len(dates) == 2:
+        try:
+            if dates[1] < dates[0]:
+                reasons.append("bad date: end date before start date")
+        except TypeError:
+            reasons.append("bad date: one date has a time zone and the other doesn't")
+
+    if damaged:
+        reasons.append("not valid UTF-8")
+    return reasons
+
+
+def new_category_id(category_name):
+    """
+    Make an id for a category added by an admin.
+
+    The name is cut down to lower-case ASCII letters and digits joined by '-',
+    so the id always passes the same checks as the feed's own ids.
+
+    Args:
+        category_name (str): The category's name, e.g. 'Day & Night'
+
+    Returns:
+        str: e.g. 'new-day-night' (a uuid-based id if the name has no
+             letters or digits)
+    """
+    ascii_name = unicodedata.normalize('NFKD', category_name).encode('ascii', 'ignore').decode()
+    slug = re.sub(r'[^a-z0-9]+', '-', ascii_name.lower()).strip('-')[:50].rstrip('-')
+    return f"new-{slug or uuid.uuid4().hex[:12]}"
+
+
+def _reason_kind(reason):
+    """The part of a reason before any ':' (used to count reasons)"""
+    return reason.split(':', 1)[0]
+
+
+def read_header(filename):
+    """
+    Read and check the header of a feed.
+
+    Args:
+        filename (str): Path to the feed
+
+    Returns:
+        tuple: (header (list), header length in bytes)
+
+    Raises:
+        ValueError: If required columns are missing
+    """
+    with open(filename, 'rb') as file:
+        header_line = file.readline()
+    header = next(csv.reader([header_line.decode('utf-8', 'replace')]), [])
+    header = [name.strip() for name in header]
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise ValueError(f"{filename} is missing required columns: {', '.join(missing)}")
+    return header, len(header_line)
+
+
+def plan_chunks(filename, start, chunk_bytes=CHUNK_BYTES):
+    """
+    Cut a feed into chunks that each hold whole records.
+
+    A chunk ends at a newline with an even number of quote characters
+    before it (in the chunk), so a quoted field containing a newline is
+    never split.
+
+    Args:
+        filename (str): Path to the feed
+        start (int): Byte offset of the first record (after the header)
+        chunk_bytes (int, optional): Rough chunk size. Defaults to CHUNK_BYTES.
+
+    Returns:
+        list: (start offset, end offset, line number of the first record) per chunk
+    """
+    chunks = []
+    line = 2
+    chunk_start = start
+    carry = b''
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        while True:
+            block = file.read(chunk_bytes)
+            data = carry + block
+            if not block:
+                if data:
+                    chunks.append((chunk_start, chunk_start + len(data), line))
+                return chunks
+
+            cut = data.rfind(b'\n')
+            while cut != -1 and data.count(b'"', 0, cut) % 2:
+                cut = data.rfind(b'\n', 0, cut)
+            if cut == -1:
+                carry = data  # One record longer than a chunk - keep reading
+                continue
+
+            chunks.append((chunk_start, chunk_start + cut + 1, line))
+            line += data.count(b'\n', 0, cut + 1)
+            chunk_start += cut + 1
+            carry = data[cut + 1:]
+
+
+def _read_chunk(filename, start, end, first_line):
+    """Yield (line number, fields, damaged) for every record in a chunk"""
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode('utf-8', 'replace')
+    # Bytes that aren't UTF-8 become U+FFFD; only look for them row by row
+    # in the (rare) chunks that have any
+    suspect = '\ufffd' in text
+    reader = csv.reader(io.StringIO(text, newline=''))
+    for fields in reader:
+        if fields:
+            damaged = suspect and any('\ufffd' in field for field in fields)
+            yield first_line + reader.line_num - 1, fields, damaged
+
+
+def check_chunk(filename, start, end, first_line, header):
+    """
+    Check every record in a chunk (run in a worker process for big feeds).
+
+    Args:
+        filename (str): Path to the feed
+        start (int): Byte offset where the chunk starts
+        end (int): Byte offset where the chunk ends
+        first_line (int): Line number of the first record
+        header (list): Column names of the feed
+
+    Returns:
+        dict: Line number -> list of reasons, for the bad rows only
+    """
+    columns = {name: position for position, name in enumerate(header)}
+    bad_rows = {}
+    for line, fields, damaged in _read_chunk(filename, start, end, first_line):
+        reasons = check_row(fields, header, columns, damaged)
+        if reasons:
+            bad_rows[line] = reasons
+    return bad_rows
+
+
+def default_reject_file(filename):
+    """
+    Return where the bad rows of a feed are written by default.
+
+    Args:
+        filename (str): Path to the feed
+
+    Returns:
+        str: e.g. 'data/bus_tickets.rejects.csv' for 'data/bus_tickets.csv'
+    """
+    return os.path.splitext(filename)[0] + '.rejects.csv'
+
+
+def ingest_catalog(filename, reject_file=None, workers=None, chunk_bytes=CHUNK_BYTES,
+                   trusted=False, ticket_factory=Ticket):
+    """
+    Load a ticket feed, checking every row and setting bad rows aside.
+
+    A file this program wrote itself (the catalog snapshot) is loaded
+    with trusted=True: its rows hold whatever admins saved, and they must
+    all come back, so only rows that can't be read at all are set aside.
+
+    Args:
+        filename (str): Path to the feed (CSV)
+        reject_file (str, optional): Where to write bad rows. Defaults to
+                                     default_reject_file(filename).
+        workers (int, optional): Worker processes for the checks. Defaults
+                                 to one per CPU for feeds of at least
+                                 PARALLEL_MIN_BYTES, otherwise none.
+        chunk_bytes (int, optional): Rough chunk size. Defaults to CHUNK_BYTES.
+        trusted (bool, optional): Skip the value checks (prices, ids, dates).
+                                  Defaults to False.
+        ticket_factory (callable, optional): Makes a Ticket from a good row
+                                             (a dict). Defaults to Ticket.
+
+    Returns:
+        tuple: (Catalog of the good rows, IngestReport)
+
+    Raises:
+        FileNotFoundError: If the feed doesn't exist
+        ValueError: If the feed is missing required columns
+    """
+    started = time.perf_counter()
+    report = IngestReport(filename)
+    report.size = os.path.getsize(filename)
+    reject_file = reject_file or default_reject_file(filename)
+    header, header_bytes = read_header(filename)
+    chunks = plan_chunks(filename, header_bytes, chunk_bytes)
+
+    if trusted:
+        workers = 0  # Nothing worth handing to workers
+    elif workers is None:
+        workers = (os.cpu_count() or 1) if report.size >= PARALLEL_MIN_BYTES else 0
+    workers = min(workers, len(chunks))
+    report.workers = workers
+
+    pool = None
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=workers)
+
+    columns = {name: position for position, name in enumerate(header)}
+    categories = Catalog()
+    reject_handle = None
+    try:
+        # Every chunk's checks are queued up front; this process builds the
+        # tickets of each chunk in turn once that chunk's checks are back
+        if pool is not None:
+            pending = [pool.submit(check_chunk, filename, *chunk, header) for chunk in chunks]
+        for number, chunk in enumerate(chunks):
+            # Without workers the rows are checked here, in the same pass
+            bad_rows = pending[number].result() if pool is not None else None
+
+            good_tickets = []
+            for line, fields, damaged in _read_chunk(filename, *chunk):
+                report.rows += 1
+                if trusted:
+                    # Only a row with the wrong number of fields can't be built
+                    reasons = [] if len(fields) == len(header) else check_row(fields, header, columns)
+                elif bad_rows is None:
+                    reasons = check_row(fields, header, columns, damaged)
+                else:
+                    reasons = bad_rows.get(line)
+                if not reasons:
+                    good_tickets.append(ticket_factory(dict(zip(header, fields))))
+                    continue
+                if reject_handle is None:
+                    reject_handle = open(reject_file, 'w', encoding='utf-8', newline='')
+                    rejects = csv.writer(reject_handle)
+                    rejects.writerow(['line', 'reasons'] + header)
+                rejects.writerow([line, '; '.join(reasons)] + fields)
+                report.rejected += 1
+                report.reasons.update(set(_reason_kind(reason) for reason in reasons))
+
+            categories.add_tickets(good_tickets)
+            report.loaded += len(good_tickets)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if reject_handle is not None:
+            reject_handle.close()
+
+    if reject_handle is not None:
+        report.reject_file = reject_file
+    elif os.path.exists(reject_file):
+        os.remove(reject_file)  # Left over from an earlier load of a bad feed
+
+    report.seconds = time.perf_counter() - started
+    return categories, report
+
+
+def main():
+    """Load a feed from the command line and print the report"""
+    parser = argparse.ArgumentParser(description="Load a ticket feed with row checks")
+    parser.add_argument('feed', nargs='?', default='data/bus_tickets.csv', help="ticket CSV file")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes for the checks (default: one per CPU for big feeds)")
+    parser.add_argument('--rejects', help="reject file (default: <feed>.rejects.csv)")
+    args = parser.parse_args()
+
+    try:
+        categories, report = ingest_catalog(args.feed, args.rejects, args.workers)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return
+    report.print()
+    print(f"  Categories: {len(categories):,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+# ============================================================================
+# CATALOG JOURNAL - BUS TICKET SYSTEM
+# ============================================================================
+# Admin changes (add ticket, change price, delete ticket) used to live only
+# in memory and were lost on restart. This file keeps an append-only
+# journal of those changes: each change is one short JSON line keyed by
+# topup_id, so saving an edit costs the same however big the catalog is.
+#
+# At startup the journal is replayed on top of the base catalog. Every so
+# often the whole catalog is written out as a new base (a snapshot CSV) and
+# the journal is emptied, so replay never gets slow.
+# ============================================================================
+
+import csv
+import json
+import os
+import threading
+
+from catalog import Catalog
+from file_handler import load_ticket_objects
+from ticket_classes import Ticket, TICKET_CSV_COLUMNS
+
+# Compact once the journal holds this many changes
+COMPACT_EVERY = 1000
+
+
+class CatalogJournal:
+    """
+    Append-only write-ahead journal of catalog changes.
+
+    Each entry is one line of JSON with an 'op' ('add', 'price' or
+    'delete'), the ticket's 'topup_id' and its 'category' (the same
+    product can be listed in several categories). Entries are flushed to
+    disk before the change is applied to the in-memory catalog.
+
+    Attributes:
+        filename (str): Path to the journal file
+        snapshot_filename (str): Path of the CSV written by compaction
+        compact_every (int): Number of entries that triggers compaction
+        entry_count (int): Number of entries currently in the journal
+    """
+
+    def __init__(self, filename='data/catalog_journal.log',
+                 snapshot_filename='data/catalog_snapshot.csv',
+                 compact_every=COMPACT_EVERY):
+        """
+        Initialize the journal (the file is created on the first change).
+
+        Args:
+            filename (str, optional): Path to the journal file.
+                                      Defaults to 'data/catalog_journal.log'.
+            snapshot_filename (str, optional): Path of the compacted catalog.
+                                               Defaults to 'data/catalog_snapshot.csv'.
+            compact_every (int, optional): Entries before compaction. Defaults to COMPACT_EVERY.
+        """
+        self.filename = filename
+        self.snapshot_filename = snapshot_filename
+        self.compact_every = compact_every
+        self.entry_count = 0
+        # Only one thread compacts at a time (they share the snapshot's temp file)
+        self._compact_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Recording changes
+    # ------------------------------------------------------------------
+    def _append(self, entry):
+        """
+        Write one entry to the end of the journal and flush it to disk.
+
+        Args:
+            entry (dict): The change to record
+
+        Returns:
+            None
+
+        Raises:
+            OSError: If the entry could not be written (the change must
+                     then not be applied)
+        """
+        self._append_many([entry])
+
+    def _append_many(self, entries):
+        """
+        Write several entries to the end of the journal with one write and flush.
+
+        Args:
+            entries (list): The changes to record, in the order they are applied
+
+        Returns:
+            None
+
+        Raises:
+            OSError: If the entries could not be written
+        """
+        if not entries:
+            return
+        lines = ''.join(json.dumps(entry, separators=(',', ':')) + '\n' for entry in entries)
+        with open(self.filename, 'ab', buffering=0) as file:
+            file.write(lines.encode('utf-8'))
+            os.fsync(file.fileno())
+        self.entry_count += len(entries)
+
+    def record_add(self, ticket):
+        """
+        Record that a ticket was added.
+
+        Args:
+            ticket (Ticket): The new ticket
+
+        Returns:
+            None
+        """
+        self._append({'op': 'add', 'topup_id': ticket.topup_id,
+                      'category': ticket.category, 'row': ticket.to_row()})
+
+    def record_price(self, ticket, new_price):
+        """
+        Record a price change.
+
+        Args:
+            ticket (Ticket): The ticket whose price changed
+            new_price (float): The new price in pounds
+
+        Returns:
+            None
+        """
+        self._append({'op': 'price', 'topup_id': ticket.topup_id,
+                      'category': ticket.category,
+                      'price_in_pence': round(new_price * 100)})
+
+    def record_delete(self, ticket):
+        """
+        Record that a ticket was deleted.
+
+        Args:
+            ticket (Ticket): The deleted ticket
+
+        Returns:
+            None
+        """
+        self._append({'op': 'delete', 'topup_id': ticket.topup_id,
+                      'category': ticket.category})
+
+    def record_batch(self, deleted, added):
+        """
+        Record a batch of deletes followed by adds (see Catalog.apply_changes).
+
+        An 'add' of a ticket that already exists replaces it on replay, so
+        updates are recorded as adds.
+
+        Args:
+            deleted (list): Tickets deleted
+            added (list): Tickets added or replaced
+
+        Returns:
+            None
+        """
+        entries = [{'op': 'delete', 'topup_id': ticket.topup_id, 'category': ticket.category}
+                   for ticket in deleted]
+        entries += [{'op': 'add', 'topup_id': ticket.topup_id,
+                     'category': ticket.category, 'row': ticket.to_row()}
+                    for ticket in added]
+        self._append_many(entries)
+
+    # ------------------------------------------------------------------
+    # Replay and compaction
+    # ------------------------------------------------------------------
+    def read_entries(self):
+        """
+        Read every complete entry in the journal.
+
+        A torn last line (from a crash mid-write) is ignored.
+
+        Returns:
+            list: Journal entries (dict) in the order they were written
+        """
+        entries = []
+        try:
+            with open(self.filename, 'rb') as file:
+                for raw_line in file:
+                    if not raw_line.endswith(b'\n'):
+                        break  # Torn last entry - it was never applied
+                    try:
+                        entries.append(json.loads(raw_line))
+                    except ValueError:
+                        print("Warning: skipping unreadable journal entry")
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def replay(self, categories):
+        """
+        Apply the journal to a catalog that was loaded from the base.
+
+        Replay is idempotent: adding a ticket that already exists replaces
+        it, and changing or deleting a missing ticket is skipped. That
+        makes it safe to replay a journal onto a base that already
+        contains some of its changes (e.g. after a crash during compaction).
+
+        Args:
+            categories (Catalog): The catalog to update (must not have a
+                                  journal attached yet)
+
+        Returns:
+            int: Number of entries applied
+        """
+        entries = self.read_entries()
+        for entry in entries:
+            apply_entry(categories, entry)
+        self.entry_count = len(entries)
+        return len(entries)
+
+    def maybe_compact(self, categories):
+        """
+        Compact the journal if it has grown past compact_every entries.
+
+        Several writers can cross compact_every at once; the count is
+        checked again once this thread holds the compaction lock, so only
+        the first of them compacts.
+
+        Args:
+            categories (Catalog): The catalog the journal belongs to
+
+        Returns:
+            bool: True if the journal was compacted
+        """
+        if self.entry_count < self.compact_every:
+            return False
+        with self._compact_lock:
+            if self.entry_count < self.compact_every:
+                return False  # Another thread has just compacted
+            self._write_snapshot(categories)
+        return True
+
+    def compact(self, categories):
+        """
+        Write the whole catalog as a new base and empty the journal.
+
+        The catalog is read-locked so no change can be journaled while the
+        snapshot is being written. The snapshot is written to a temporary
+        file and renamed into place, so a crash leaves either the old or
+        the new base - never half of one. Only one thread compacts at a
+        time.
+
+        Args:
+            categories (Catalog): The catalog to save
+
+        Returns:
+            None
+        """
+        with self._compact_lock:
+            self._write_snapshot(categories)
+
+    def _write_snapshot(self, categories):
+        """
+        Write the snapshot and empty the journal (caller holds the compaction lock).
+
+        Args:
+            categories (Catalog): The catalog to save
+
+        Returns:
+            None
+        """
+        temp_name = self.snapshot_filename + '.tmp'
+        with categories.read_locked():
+            with open(temp_name, 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=TICKET_CSV_COLUMNS)
+                writer.writeheader()
+                for category in categories.values():
+                    for ticket in category.get_all_tickets():
+                        writer.writerow(ticket.to_row())
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_name, self.snapshot_filename)
+
+            # The snapshot now holds every change, so start a new journal
+            with open(self.filename, 'wb') as file:
+                os.fsync(file.fileno())
+            self.entry_count = 0
+
+
+def apply_entry(categories, entry):
+    """
+    Apply one journal entry to a catalog.
+
+    Args:
+        categories (Catalog): The catalog to change
+        entry (dict): A journal entry
+
+    Returns:
+        bool: True if the entry changed the catalog
+    """
+    op = entry.get('op')
+    existing = categories.get_ticket(entry.get('topup_id'), entry.get('category'))
+
+    if op == 'add':
+        if existing is not None:
+            categories.remove_ticket(existing)
+        categories.add_ticket(Ticket(entry['row']))
+        return True
+    if op == 'price' and existing is not None:
+        return categories.set_ticket_price(existing, entry['price_in_pence'] / 100.0) is not None
+    if op == 'delete' and existing is not None:
+        return categories.remove_ticket(existing)
+    return False
+
+
+def open_catalog(base_filename='data/bus_tickets.csv',
+                 journal_filename='data/catalog_journal.log',
+                 snapshot_filename='data/catalog_snapshot.csv',
+                 quiet=False):
+    """
+    Load the catalog with every saved admin change applied.
+
+    Loads the most recent base (the compacted snapshot, unless the ticket
+    feed CSV is newer), replays the journal on top, then attaches the
+    journal so further changes are recorded.
+
+    Args:
+        base_filename (str, optional): Ticket feed CSV. Defaults to 'data/bus_tickets.csv'.
+        journal_filename (str, optional): Journal file. Defaults to 'data/catalog_journal.log'.
+        snapshot_filename (str, optional): Compacted catalog. Defaults to 'data/catalog_snapshot.csv'.
+        quiet (bool, optional): Only print errors. Defaults to False.
+
+    Returns:
+        Catalog: The catalog (empty if the base couldn't be loaded)
+    """
+    journal = CatalogJournal(journal_filename, snapshot_filename)
+
+    # Use the snapshot unless a newer feed has been dropped in since
+    base = base_filename
+    if os.path.exists(snapshot_filename):
+        if (not os.path.exists(base_filename)
+                or os.path.getmtime(snapshot_filename) >= os.path.getmtime(base_filename)):
+            base = snapshot_filename
+
+    # The snapshot holds what admins saved, so none of it may be set aside
+    categories = load_ticket_objects(base, quiet, trusted=(base == snapshot_filename))
+    if not categories:
+        return categories
+
+    applied = journal.replay(categories)
+    if applied and not quiet:
+        print(f"Replayed {applied} saved admin changes")
+
+    categories.journal = journal
+    journal.maybe_compact(categories)
+    return categories
+
+
+class CatalogLoader:
+    """
+    Loads the catalog on a background thread.
+
+    Lets the console show its menu straight away; the first option that
+    needs the catalog calls result() and waits only if loading hasn't
+    finished yet.
+    """
+
+    def __init__(self, base_filename='data/bus_tickets.csv'):
+        """
+        Initialize a loader (call start() to begin loading).
+
+        Args:
+            base_filename (str, optional): Ticket feed CSV. Defaults to 'data/bus_tickets.csv'.
+        """
+        self.base_filename = base_filename
+        self._categories = None
+        self._thread = threading.Thread(target=self._load, name='catalog-load', daemon=True)
+
+    def start(self):
+        """
+        Start loading in the background.
+
+        Returns:
+            CatalogLoader: This loader
+        """
+        self._thread.start()
+        return self
+
+    def _load(self):
+        """Body of the loading thread"""
+        try:
+            self._categories = open_catalog(self.base_filename, quiet=True)
+        except Exception as e:
+            print(f"Error loading tickets: {e}")
+            self._categories = Catalog()
+
+    def done(self):
+        """
+        Check whether loading has finished.
+
+        Returns:
+            bool: True if result() won't have to wait
+        """
+        return not self._thread.is_alive()
+
+    def result(self):
+        """
+        Return the loaded catalog, waiting for it if necessary.
+
+        Returns:
+            Catalog: The catalog (empty if it couldn't be loaded)
+        """
+        if not self.done():
+            print("Loading ticket data...")
+        self._thread.join()
+        return self._categories
@@ -0,0 +1,306 @@
+# ============================================================================
+# CUSTOMER INDEX - BUS TICKET SYSTEM
+# ============================================================================
+# Finds one customer's purchases without reading the whole purchase log.
+#
+# Every purchase record ends with the customer id (see
+# Purchase.to_file_format). The index keeps the byte offset of each record
+# under its customer, so a customer's history is a lookup of their offsets
+# followed by one seek and read per purchase: the cost depends on how many
+# purchases they made, not on the size of the log.
+#
+# The index is saved next to the log ('.custidx') as a small SQLite
+# database rather than JSON, so a lookup reads only that customer's rows
+# instead of loading every customer's offsets. Like the timestamp index
+# it records how far into the log it has scanned, only newly appended
+# records are indexed, and it is rebuilt if the log is replaced.
+#
+# Logs written before customers were added have no customer ids, so
+# those purchases belong to nobody. migrate_log() rewrites such a log,
+# giving its purchases to one customer (e.g. whoever used this install).
+#
+# Run: python customer_index.py alice
+#      python customer_index.py --migrate alice
+# ============================================================================
+
+import argparse
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+from purchase_log import (OFFSET_SIDECAR_SUFFIXES, check_record, frame_record, head_checksum,
+                          recover_log, strip_frame)
+from ticket_classes import CUSTOMER_ID_PATTERN, Purchase
+
+# Files kept next to the log that are worked out from it; migrate_log()
+# removes them so they are rebuilt from the rewritten log
+DERIVED_SUFFIXES = OFFSET_SIDECAR_SUFFIXES + ['.verified', '.npz']
+
+
+def _record_customer(raw_line):
+    """
+    Extract the customer id from a raw log line.
+
+    Args:
+        raw_line (bytes): One line of the purchase log
+
+    Returns:
+        str: The customer id ('' for records without one)
+    """
+    parts = strip_frame(raw_line.decode('utf-8', 'replace')).split('|')
+    return parts[6].strip() if len(parts) > 6 else ''
+
+
+class CustomerIndex:
+    """
+    Byte offsets of each customer's records in a purchase log.
+
+    Attributes:
+        filename (str): Path to the purchase log
+        connection (sqlite3.Connection): The open index database
+    """
+
+    def __init__(self, filename):
+        """
+        Open (or create) the index for a purchase log.
+
+        Args:
+            filename (str): Path to the purchase log
+        """
+        self.filename = filename
+        self.connection = sqlite3.connect(self.index_filename(), timeout=30)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS records (customer TEXT, offset INTEGER)")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS records_by_customer ON records (customer, offset)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS scanned (log_offset INTEGER, head_checksum INTEGER)")
+
+    def index_filename(self):
+        """
+        Return the path of the saved index.
+
+        Returns:
+            str: The log filename with '.custidx' appended
+        """
+        return self.filename + '.custidx'
+
+    def close(self):
+        """
+        Close the index database.
+
+        Returns:
+            None
+        """
+        self.connection.close()
+
+    def update(self):
+        """
+        Index any records appended to the log since the last update.
+
+        Only the part of the log after the scanned offset is read, and a
+        torn last line (no newline yet) is left for the next update. The
+        update is one transaction, so several processes can share the
+        index. If the log has shrunk or been replaced, the index is
+        rebuilt.
+
+        Returns:
+            int: Number of records indexed
+        """
+        try:
+            log_size = os.path.getsize(self.filename)
+        except OSError:
+            return 0
+        row = self.connection.execute("SELECT log_offset, head_checksum FROM scanned").fetchone()
+        if row and row[0] == log_size and row[1] == head_checksum(self.filename, log_size):
+            return 0  # Nothing appended since the last update
+
+        try:
+            file = open(self.filename, 'rb')
+        except FileNotFoundError:
+            return 0
+
+        with file, self.connection:
+            # Take the write lock before reading how far the index goes
+            self.connection.execute("BEGIN IMMEDIATE")
+            row = self.connection.execute("SELECT log_offset, head_checksum FROM scanned").fetchone()
+            offset = row[0] if row else 0
+            file.seek(0, os.SEEK_END)
+            if offset > file.tell() or (row and row[1] != head_checksum(self.filename, offset)):
+                self.connection.execute("DELETE FROM records")  # Stale index - rebuild it
+                offset = 0
+
+            file.seek(offset)
+            entries = []
+            for raw_line in file:
+                if not raw_line.endswith(b'\n'):
+                    break  # Incomplete record - wait until it is finished
+                customer = _record_customer(raw_line)
+                if customer:
+                    entries.append((customer, offset))
+                offset += len(raw_line)
+
+            self.connection.executemany("INSERT INTO records VALUES (?, ?)", entries)
+            self.connection.execute("DELETE FROM scanned")
+            self.connection.execute("INSERT INTO scanned VALUES (?, ?)",
+                                    (offset, head_checksum(self.filename, offset)))
+        return len(entries)
+
+    def offsets_for(self, customer_id):
+        """
+        Return the byte offsets of a customer's records.
+
+        Args:
+            customer_id (str): The customer
+
+        Returns:
+            list: Offsets in log order
+        """
+        return [offset for (offset,) in self.connection.execute(
+            "SELECT offset FROM records WHERE customer = ? ORDER BY offset", (customer_id,))]
+
+    def purchases_for(self, customer_id):
+        """
+        Read a customer's purchases from the log.
+
+        Each record is checked as it is read, and damaged ones are skipped.
+
+        Args:
+            customer_id (str): The customer
+
+        Returns:
+            list: Purchase dictionaries as returned by Purchase.from_file_format,
+                  oldest first
+        """
+        purchases = []
+        try:
+            file = open(self.filename, 'rb')
+        except FileNotFoundError:
+            return purchases
+
+        with file:
+            for offset in self.offsets_for(customer_id):
+                file.seek(offset)
+                raw_line = file.readline()
+                if not check_record(raw_line):
+                    continue  # Skip damaged purchases
+                purchase_info = Purchase.from_file_format(raw_line.decode('utf-8'))
+                if purchase_info['customer_id'] == customer_id:
+                    purchases.append(purchase_info)
+        return purchases
+
+
+def get_customer_index(filename='data/purchases.txt'):
+    """
+    Open the customer index for a log and bring it up to date.
+
+    Args:
+        filename (str, optional): Path to the purchases file. Defaults to 'data/purchases.txt'.
+
+    Returns:
+        CustomerIndex: An open index covering every complete record (close it when done)
+    """
+    index = CustomerIndex(filename)
+    index.update()
+    return index
+
+
+def purchases_for_customer(customer_id, filename='data/purchases.txt'):
+    """
+    Return one customer's purchases.
+
+    Args:
+        customer_id (str): The customer
+        filename (str, optional): Path to the purchases file. Defaults to 'data/purchases.txt'.
+
+    Returns:
+        list: Purchase dictionaries as returned by Purchase.from_file_format, oldest first
+    """
+    with closing(get_customer_index(filename)) as index:
+        return index.purchases_for(customer_id)
+
+
+def migrate_log(filename, customer_id, backup_suffix='.pre-customers'):
+    """
+    Give every purchase without a customer id to one customer.
+
+    The log is rewritten (framed, see purchase_log.py) next to the old
+    one and swapped in, and the old log is kept with backup_suffix added.
+    Damaged records are copied unchanged. Files worked out from the log
+    (indexes, sketches, caches) are removed so they are rebuilt. Nothing
+    else should be writing the log while it is migrated.
+
+    Args:
+        filename (str): Path to the purchases file
+        customer_id (str): Customer to give the purchases to
+        backup_suffix (str, optional): Added to the old log's name. Defaults to '.pre-customers'.
+
+    Returns:
+        int: Number of purchases given to the customer
+
+    Raises:
+        ValueError: If customer_id isn't a valid customer id
+        FileNotFoundError: If the log doesn't exist
+    """
+    if not CUSTOMER_ID_PATTERN.match(customer_id):
+        raise ValueError(f"Invalid customer id: {customer_id!r}")
+    if not os.path.exists(filename):
+        raise FileNotFoundError(f"{filename} not found")
+    recover_log(filename)
+
+    migrated = 0
+    temp_name = filename + '.migrating'
+    with open(filename, 'rb') as source, open(temp_name, 'wb') as target:
+        for raw_line in source:
+            if not raw_line.strip() or not check_record(raw_line):
+                target.write(raw_line)
+                continue
+            parts = strip_frame(raw_line.decode('utf-8')).strip().split('|')
+            parts += [''] * (7 - len(parts))
+            if not parts[6]:
+                parts[6] = customer_id
+                migrated += 1
+            target.write((frame_record('|'.join(parts)) + '\n').encode('utf-8'))
+        target.flush()
+        os.fsync(target.fileno())
+
+    os.replace(filename, filename + backup_suffix)
+    os.replace(temp_name, filename)
+    for suffix in DERIVED_SUFFIXES:
+        if os.path.exists(filename + suffix):
+            os.remove(filename + suffix)
+    return migrated
+
+
+def main():
+    """Show a customer's purchases, or migrate a log, from the command line"""
+    parser = argparse.ArgumentParser(description="Per-customer purchase history")
+    parser.add_argument('customer', help="customer id")
+    parser.add_argument('--log', default='data/purchases.txt', help="purchase log")
+    parser.add_argument('--migrate', action='store_true',
+                        help="give every purchase without a customer id to this customer")
+    args = parser.parse_args()
+
+    if args.migrate:
+        try:
+            migrated = migrate_log(args.log, args.customer)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            return
+        print(f"Gave {migrated:,} purchases to {args.customer} "
+              f"(old log kept as {args.log}.pre-customers)")
+        return
+
+    start = time.perf_counter()
+    purchases = purchases_for_customer(args.customer, args.log)
+    seconds = time.perf_counter() - start
+    for purchase_info in purchases:
+        print(f"{purchase_info['timestamp'][:19]}  {purchase_info['quantity']}x "
+              f"{purchase_info['topup_type']}  £{float(purchase_info['total']):.2f}")
+    print(f"\n{len(purchases):,} purchases for {args.customer} in {seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,572 @@
+# ============================================================================
+# FARE OPTIMIZER - BUS TICKET SYSTEM
+# ============================================================================
+# Answers "I make 12 journeys over the next 3 weeks, what should I buy?".
+# Every ticket in the catalog is turned into one of four kinds of product,
+# using its price, entitlement fields, validity dates and passenger class:
+#   journey pack - N single journeys        (unit 'minutes', quantity N)
+#   day pack     - N separate travel days   (unit 'days', value 1, quantity N)
+#   pass         - L days in a row          (unit 'days', value L)
+#   fixed pass   - every day between two dates ('fixed_date' tickets)
+#
+# Products that can never be part of a cheapest plan (a longer pass costs
+# less, a bigger pack costs less, ...) are pruned first, so even a huge
+# catalog leaves only a handful of candidates. A dynamic programme then
+# walks the travel days, deciding for each one whether it is covered by a
+# pass or paid for with journey or day credits; the cheapest way to buy
+# a given number of credits is memoized.
+#
+# Assumptions: packs can be used on any day in the period, and all tickets
+# are valid on the rider's route (use the 'categories' filter to limit the
+# products, e.g. to City Zone tickets). Tickets only some riders can buy
+# (Job Seeker, one college or university, partner discounts) are left out
+# unless asked for.
+# ============================================================================
+
+import re
+from datetime import date, datetime, timedelta
+
+JOURNEY_PACK = 'journeys'
+DAY_PACK = 'days'
+PASS = 'pass'
+FIXED_PASS = 'fixed'
+
+# Tickets with these words in their name or category need proof of
+# eligibility (a discount card, a college, a partner code)
+RESTRICTED_WORDS = ('job seeker', 'ntu', 'uon', 'bilborough', 'nct partners')
+RESTRICTED_PATTERN = re.compile(r'\b(' + '|'.join(RESTRICTED_WORDS) + r')\b')
+
+
+class Product:
+    """
+    A ticket described by what it covers.
+
+    Attributes:
+        ticket (Ticket): The catalog ticket
+        kind (str): JOURNEY_PACK, DAY_PACK, PASS or FIXED_PASS
+        size (int): Journeys or days in a pack, or the length of a pass in days
+        price (float): Price in pounds
+        first_day (date): First day a fixed pass is valid (None otherwise)
+        last_day (date): Last day a fixed pass is valid (None otherwise)
+    """
+
+    def __init__(self, ticket, kind, size, first_day=None, last_day=None):
+        """
+        Initialize a product.
+
+        Args:
+            ticket (Ticket): The catalog ticket
+            kind (str): JOURNEY_PACK, DAY_PACK, PASS or FIXED_PASS
+            size (int): Journeys, days or pass length
+            first_day (date, optional): First valid day of a fixed pass. Defaults to None.
+            last_day (date, optional): Last valid day of a fixed pass. Defaults to None.
+        """
+        self.ticket = ticket
+        self.kind = kind
+        self.size = size
+        self.price = ticket.get_price()
+        self.first_day = first_day
+        self.last_day = last_day
+
+    def __repr__(self):
+        return f"Product({self.kind}, {self.size}, £{self.price:.2f}, {self.ticket.topup_type!r})"
+
+
+class FarePlan:
+    """
+    The cheapest set of tickets for a travel pattern.
+
+    Attributes:
+        total (float): Total cost in pounds
+        purchases (list): (Ticket, how many to buy) pairs
+        journeys (int): Journeys in the travel pattern
+        first_day (date): First day of the travel pattern
+        days (int): Number of days in the travel pattern
+    """
+
+    def __init__(self, total, purchases, journeys, first_day, days):
+        """
+        Initialize a plan.
+
+        Args:
+            total (float): Total cost in pounds
+            purchases (list): (Ticket, count) pairs
+            journeys (int): Journeys covered
+            first_day (date): First day of the pattern
+            days (int): Days in the pattern
+        """
+        self.total = total
+        self.purchases = purchases
+        self.journeys = journeys
+        self.first_day = first_day
+        self.days = days
+
+    def display_info(self):
+        """
+        Display the plan.
+
+        Returns:
+            None
+        """
+        last_day = self.first_day + timedelta(days=self.days - 1)
+        print(f"\nCheapest tickets for {self.journeys} journeys, "
+              f"{self.first_day:%d %b %Y} to {last_day:%d %b %Y}:")
+        print("="*40)
+        for ticket, count in self.purchases:
+            print(f"{count} x {ticket.topup_type} ({ticket.category})")
+            print(f"    £{ticket.get_price():.2f} each = £{ticket.get_price() * count:.2f}")
+        print("="*40)
+        print(f"Total: £{self.total:.2f}")
+        if self.journeys:
+            print(f"Cost per journey: £{self.total / self.journeys:.2f}")
+
+
+def _parse_day(text):
+    """Turn an ISO date/time string from the CSV into a date (None if invalid)"""
+    try:
+        return datetime.fromisoformat(str(text).strip()).date()
+    except ValueError:
+        return None
+
+
+def _whole_number(text, default=None):
+    """Turn a CSV field into a positive int (default if blank or invalid)"""
+    try:
+        value = int(float(text))
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+def matches_passenger_class(ticket, passenger_class):
+    """
+    Check whether a ticket is for a single rider of a passenger class.
+
+    Args:
+        ticket (Ticket): The ticket
+        passenger_class (str): Class id or name, e.g. 'adult' or 'Under 19'
+
+    Returns:
+        bool: True if the ticket is for one rider of that class
+    """
+    if _whole_number(ticket.passenger_class_quantity, 1) != 1:
+        return False  # Group tickets
+    wanted = passenger_class.strip().lower()
+    return wanted in (str(ticket.passenger_class_id).lower(), str(ticket.passenger_class).lower())
+
+
+def is_restricted(ticket):
+    """
+    Check whether only some riders are allowed to buy a ticket.
+
+    Args:
+        ticket (Ticket): The ticket
+
+    Returns:
+        bool: True if the ticket needs proof of eligibility
+    """
+    return RESTRICTED_PATTERN.search(f"{ticket.topup_type} {ticket.category}".lower()) is not None
+
+
+def ticket_to_product(ticket):
+    """
+    Describe a ticket as a Product, if the optimizer can use it.
+
+    Args:
+        ticket (Ticket): The ticket
+
+    Returns:
+        Product: The product, or None if the entitlement isn't understood
+    """
+    if ticket.get_price() <= 0:
+        return None
+
+    if ticket.entitlement_type == 'fixed_date':
+        first_day = _parse_day(ticket.start_date)
+        last_day = _parse_day(ticket.end_date)
+        if first_day is None or last_day is None or last_day < first_day:
+            return None
+        return Product(ticket, FIXED_PASS, (last_day - first_day).days + 1, first_day, last_day)
+
+    unit = str(ticket.entitlement_unit).lower()
+    quantity = _whole_number(ticket.entitlement_quantity, 1)
+    if unit in ('minutes', 'hours'):
+        return Product(ticket, JOURNEY_PACK, quantity)
+    if unit == 'days':
+        length = _whole_number(ticket.entitlement_value)
+        if length is None:
+            return None
+        if length == 1:
+            return Product(ticket, DAY_PACK, quantity)
+        if quantity == 1:
+            return Product(ticket, PASS, length)
+    return None
+
+
+def prune_dominated(products):
+    """
+    Remove products that can never be part of a cheapest plan.
+
+    A pass is dominated by a pass at least as long that costs no more. A
+    pack is dominated by another pack of the same kind that gives at
+    least as many credits for no more money, either bought once or bought
+    several times. A fixed pass is dominated by one valid over at least
+    the same dates that costs no more.
+
+    Args:
+        products (list): Product objects
+
+    Returns:
+        list: The products that are left
+    """
+    def dominated(product, other):
+        if other is product or other.kind != product.kind or other.price > product.price:
+            return False
+        if product.kind == FIXED_PASS:
+            return other.first_day <= product.first_day and other.last_day >= product.last_day
+        if other.size >= product.size:
+            return True
+        if product.kind == PASS:
+            return False  # Two short passes don't make one long one
+        # Several of a smaller pack can replace one bigger pack
+        copies = -(-product.size // other.size)
+        return copies * other.price <= product.price
+
+    kept = []
+    for product in products:
+        if any(dominated(product, other) for other in kept):
+            continue
+        kept = [other for other in kept if not dominated(other, product)]
+        kept.append(product)
+    return kept
+
+
+class _CreditCost:
+    """
+    Memoized cheapest way to buy at least n credits from some packs.
+
+    Unbounded covering knapsack: best(n) = min over packs of
+    price + best(n - size). Results are kept, so asking for many values
+    of n costs no more than asking for the largest one.
+    """
+
+    def __init__(self, packs):
+        self.packs = packs
+        self.best = [(0.0, None)]  # n -> (cost, pack bought last)
+
+    def cost(self, needed):
+        """Cheapest cost for at least 'needed' credits (inf if there are no packs)"""
+        if needed <= 0:
+            return 0.0
+        if not self.packs:
+            return float('inf')
+        while len(self.best) <= needed:
+            n = len(self.best)
+            self.best.append(min(((pack.price + self.best[max(0, n - pack.size)][0], pack)
+                                  for pack in self.packs), key=lambda option: option[0]))
+        return self.best[needed][0]
+
+    def packs_for(self, needed):
+        """The packs bought for 'needed' credits, as a list"""
+        bought = []
+        self.cost(needed)
+        while needed > 0:
+            pack = self.best[needed][1]
+            bought.append(pack)
+            needed -= pack.size
+        return bought
+
+
+def _prune_states(states, extra_cost):
+    """
+    Drop states that can never lead to the cheapest plan.
+
+    State B beats state A if B's cost so far, plus the cheapest way to pay
+    for the uncovered days B has and A doesn't, is no more than A's cost.
+    Whatever is bought for the remaining days, B can then do the same and
+    end up no more expensive than A (buying credits for two groups of days
+    together never costs more than buying them separately).
+
+    Args:
+        states (dict): Uncovered-day counts (tuple) -> (cost, back pointer)
+        extra_cost: Function giving the credit cost of a tuple of counts
+
+    Returns:
+        dict: The states that are left
+    """
+    if len(states) < 2:
+        return states
+    kept = []
+    for key in sorted(states, key=lambda key: (states[key][0], sum(key))):
+        cost = states[key][0]
+        beaten = False
+        for other, other_cost in kept:
+            extra = tuple(b - a if b > a else 0 for a, b in zip(key, other))
+            if other_cost + extra_cost(extra) <= cost:
+                beaten = True
+                break
+        if not beaten:
+            kept.append((key, cost))
+    return {key: states[key] for key, _ in kept}
+
+
+def _credits_cost(uncovered, journey_costs, day_costs):
+    """
+    Cheapest way to pay for the days no pass covers.
+
+    Day credits are best spent on the busiest days, so try every number
+    of day credits x: the x busiest days use day credits and every other
+    journey uses a journey credit.
+
+    Args:
+        uncovered (list): Journeys on each uncovered day, busiest first
+        journey_costs (_CreditCost): Memoized journey pack costs
+        day_costs (_CreditCost): Memoized day pack costs
+
+    Returns:
+        tuple: (cost, journey credits, day credits)
+    """
+    remaining = sum(uncovered)
+    best = (journey_costs.cost(remaining), remaining, 0)
+    for x, journeys in enumerate(uncovered, 1):
+        remaining -= journeys
+        cost = day_costs.cost(x) + journey_costs.cost(remaining)
+        if cost < best[0]:
+            best = (cost, remaining, x)
+    return best
+
+
+def cheapest_plan(products, journeys_by_day, first_day):
+    """
+    Find the cheapest tickets for a travel pattern.
+
+    Walks the days in order. On a travel day the options are to leave it
+    to be paid with journey or day credits, or to start a pass (which
+    jumps past every day it covers). Credits can be used on any day, so a
+    state only needs to count the uncovered days by how many journeys
+    they have; the credits are priced once at the end with the memoized
+    pack costs. After every day, states that can't beat another state,
+    or that can't finish below the cost of a plan we already know, are
+    dropped.
+
+    Args:
+        products (list): Product objects (ideally already pruned)
+        journeys_by_day (list): Journeys on each day, starting at first_day
+        first_day (date): Date of journeys_by_day[0]
+
+    Returns:
+        FarePlan: The cheapest plan, or None if the journeys can't be covered
+    """
+    days = len(journeys_by_day)
+    journey_costs = _CreditCost([p for p in products if p.kind == JOURNEY_PACK])
+    day_costs = _CreditCost([p for p in products if p.kind == DAY_PACK])
+    passes = [p for p in products if p.kind == PASS]
+    fixed_passes = []
+    for product in products:
+        if product.kind == FIXED_PASS:
+            start = (product.first_day - first_day).days
+            end = (product.last_day - first_day).days
+            if end >= 0 and start < days:
+                fixed_passes.append((max(start, 0), min(end, days - 1), product))
+
+    # Uncovered days are counted per distinct number of journeys
+    values = sorted({journeys for journeys in journeys_by_day if journeys > 0}, reverse=True)
+    position_of = {journeys: position for position, journeys in enumerate(values)}
+
+    extra_costs = {}
+
+    def extra_cost(counts):
+        # Credit cost of some uncovered days, memoized by their counts
+        if counts not in extra_costs:
+            uncovered = [journeys for journeys, count in zip(values, counts) for _ in range(count)]
+            extra_costs[counts] = _credits_cost(uncovered, journey_costs, day_costs)[0]
+        return extra_costs[counts]
+
+    # Cheapest price per uncovered day if credits could be bought singly at
+    # the best rate of any pack. rest[day] is the cheapest way to finish
+    # from 'day' at those prices: a lower bound on the real cost.
+    journey_rate = min((p.price / p.size for p in journey_costs.packs), default=float('inf'))
+    day_rate = min((p.price / p.size for p in day_costs.packs), default=float('inf'))
+    rates = [min(journeys * journey_rate, day_rate) for journeys in values]
+    rest = [(0.0, None)] * (days + 1)
+    for day in range(days - 1, -1, -1):
+        journeys = journeys_by_day[day]
+        if journeys <= 0:
+            rest[day] = (rest[day + 1][0], None)
+            continue
+        options = [(rates[position_of[journeys]] + rest[day + 1][0], None)]
+        options += [(p.price + rest[min(day + p.size, days)][0], p) for p in passes]
+        options += [(p.price + rest[end + 1][0], p) for start, end, p in fixed_passes if start <= day <= end]
+        rest[day] = min(options, key=lambda option: option[0])
+
+    # Buying the passes that plan picks and paying for the other days
+    # with real packs gives a plan we can always finish: an upper bound
+    upper_counts = [0] * len(values)
+    upper = 0.0
+    day = 0
+    while day < days:
+        product = rest[day][1]
+        if product is None:
+            if journeys_by_day[day] > 0:
+                upper_counts[position_of[journeys_by_day[day]]] += 1
+            day += 1
+        else:
+            upper += product.price
+            last = day + product.size - 1 if product.kind == PASS else (product.last_day - first_day).days
+            day = min(last, days - 1) + 1
+    upper += extra_cost(tuple(upper_counts)) + 1e-9
+
+    # states[day] maps uncovered-day counts -> (cost of passes, back pointer)
+    states = [dict() for _ in range(days + 1)]
+    states[0][(0,) * len(values)] = (0.0, None)
+
+    def offer(day, key, cost, back):
+        current = states[day].get(key)
+        if current is None or cost < current[0]:
+            states[day][key] = (cost, back)
+
+    for day in range(days):
+        # A state can't finish below its cost, plus the credits for the days
+        # it left uncovered, plus the rest of the walk priced at the best rates
+        states[day] = {key: state for key, state in states[day].items()
+                       if state[0] + max(extra_cost(key), sum(count * rate for count, rate in zip(key, rates))
+                                         + rest[day][0]) <= upper}
+        states[day] = _prune_states(states[day], extra_cost)
+        journeys = journeys_by_day[day]
+        for key, (cost, _) in states[day].items():
+            if journeys <= 0:
+                offer(day + 1, key, cost, (day, key, None))
+                continue
+            counts = list(key)
+            counts[position_of[journeys]] += 1
+            offer(day + 1, tuple(counts), cost, (day, key, None))
+            for product in passes:
+                offer(min(day + product.size, days), key, cost + product.price, (day, key, product))
+            for start, end, product in fixed_passes:
+                if start <= day <= end:
+                    offer(end + 1, key, cost + product.price, (day, key, product))
+
+    # Price the uncovered days and pick the cheapest finish
+    best = None
+    for key, (cost, _) in states[days].items():
+        uncovered = [journeys for journeys, count in zip(values, key) for _ in range(count)]
+        credits_cost, journey_credits, day_credits = _credits_cost(uncovered, journey_costs, day_costs)
+        if best is None or cost + credits_cost < best[0]:
+            best = (cost + credits_cost, key, journey_credits, day_credits)
+    if best is None or best[0] == float('inf'):
+        return None
+    total, key, journey_credits, day_credits = best
+
+    # Follow the back pointers to list what was bought
+    bought = journey_costs.packs_for(journey_credits) + day_costs.packs_for(day_credits)
+    day = days
+    while True:
+        back = states[day][key][1]
+        if back is None:
+            break
+        day, key, product = back
+        if product is not None:
+            bought.append(product)
+
+    counts = {}
+    for product in bought:
+        counts[id(product)] = (product, counts.get(id(product), (product, 0))[1] + 1)
+    purchases = [(product.ticket, count) for product, count in
+                 sorted(counts.values(), key=lambda item: -item[0].price * item[1])]
+    return FarePlan(total, purchases, sum(journeys_by_day), first_day, days)
+
+
+def spread_journeys(journeys, days, first_day, weekdays_only=True):
+    """
+    Spread a number of journeys evenly over a period.
+
+    Args:
+        journeys (int): Total journeys
+        days (int): Length of the period in days
+        first_day (date): First day of the period
+        weekdays_only (bool, optional): Travel Monday-Friday only (if the
+                                        period has any weekdays). Defaults to True.
+
+    Returns:
+        list: Journeys on each day of the period
+    """
+    pattern = [0] * days
+    travel_days = list(range(days))
+    if weekdays_only:
+        weekdays = [day for day in travel_days if (first_day + timedelta(days=day)).weekday() < 5]
+        travel_days = weekdays or travel_days
+    if not travel_days:
+        return pattern
+    per_day, extra = divmod(journeys, len(travel_days))
+    for position, day in enumerate(travel_days):
+        pattern[day] = per_day + (1 if position < extra else 0)
+    return pattern
+
+
+def candidate_products(categories, passenger_class, category_names=None, include_restricted=False):
+    """
+    Collect and prune the products a rider could buy.
+
+    Args:
+        categories (Catalog): The catalog
+        passenger_class (str): Class id or name, e.g. 'adult'
+        category_names (list, optional): Only use these categories. Defaults to all.
+        include_restricted (bool, optional): Also use tickets that need proof of
+                                             eligibility. Defaults to False.
+
+    Returns:
+        list: Pruned Product objects
+    """
+    products = []
+    snapshot = categories.snapshot()
+    for category_name in snapshot.category_names():
+        if category_names and category_name not in category_names:
+            continue
+        for ticket in snapshot.get_tickets(category_name):
+            if not include_restricted and is_restricted(ticket):
+                continue
+            if matches_passenger_class(ticket, passenger_class):
+                product = ticket_to_product(ticket)
+                if product is not None:
+                    products.append(product)
+    return prune_dominated(products)
+
+
+def find_cheapest_fare(categories, passenger_class, journeys_by_day, first_day=None,
+                       category_names=None, include_restricted=False):
+    """
+    Find the cheapest tickets in the catalog for a travel pattern.
+
+    Args:
+        categories (Catalog): The catalog
+        passenger_class (str): Class id or name, e.g. 'adult', 'student', 'Under 19'
+        journeys_by_day (list): Journeys on each day, starting at first_day
+        first_day (date, optional): Date of the first day. Defaults to today.
+        category_names (list, optional): Only use these categories. Defaults to all.
+        include_restricted (bool, optional): Also use tickets that need proof of
+                                             eligibility. Defaults to False.
+
+    Returns:
+        FarePlan: The cheapest plan, or None if no tickets cover the journeys
+    """
+    first_day = first_day or date.today()
+    products = candidate_products(categories, passenger_class, category_names, include_restricted)
+    return cheapest_plan(products, journeys_by_day, first_day)
+
+
+# Test code
+if __name__ == "__main__":
+    import time
+    from file_handler import load_ticket_objects
+
+    categories = load_ticket_objects('data/bus_tickets.csv')
+    today = date.today()
+
+    for journeys, days in [(2, 1), (12, 21), (40, 28), (500, 365)]:
+        start = time.perf_counter()
+        plan = find_cheapest_fare(categories, 'adult', spread_journeys(journeys, days, today),
+                                  today, ['Single Tickets - City Zone', '24 Hour Tickets - City Zone',
+                                          'Season Tickets - City Zone'])
+        elapsed = (time.perf_counter() - start) * 1000
+        plan.display_info()
+        print(f"({elapsed:.1f} ms)")
@@ -1,6 +1,12 @@
 import csv
 import os
-from ticket_classes import Ticket, Category
+import metrics
+from catalog import Catalog
+from catalog_ingest import ingest_catalog
+from purchase_log import frame_record, read_records
+
+# Functions called with the lines of every batch save_purchases() writes
+_purchase_listeners = []
 
 def load_ticket_data(filename):
     """
@@ -109,14 +115,69 @@ def save_purchase(purchase_data, filename='data/purchases.txt'):
     Returns:
         bool: True if save was successful, False otherwise
     """
-    try:
-        with open(filename, 'a') as file:  # 'a' for append
-            file.write(str(purchase_data) + '\n')
+    return save_purchases([purchase_data], filename)
+
+
+def add_purchase_listener(listener):
+    """
+    Call a function every time purchases are saved.
+    
+    The listener is called with the list of saved lines after they have
+    reached the file (never for a batch that failed to save). An error in
+    a listener is reported but doesn't undo or fail the save.
+    
+    Args:
+        listener: Function taking a list of purchase lines
+        
+    Returns:
+        None
+    """
+    _purchase_listeners.append(listener)
+
+
+@metrics.timed('purchase_save')
+def save_purchases(purchase_lines, filename='data/purchases.txt'):
+    """
+    Save several purchase records to a file in one atomic write.
+    
+    All records are joined into a single buffer and written with one
+    write() call on a file opened in append mode, then flushed to disk.
+    Either every record in the batch reaches the file or (if the write
+    fails) the batch is reported as not saved.
+    
+    Args:
+        purchase_lines (list): Strings representing the purchases to save
+        filename (str, optional): Path to the purchases file. Defaults to 'data/purchases.txt'.
+        
+    Returns:
+        bool: True if save was successful, False otherwise
+    """
+    if not purchase_lines:
         return True
+    
+    # Each record carries its length and checksum (see purchase_log.py)
+    batch = ''.join(frame_record(line) + '\n' for line in purchase_lines).encode('utf-8')
+    
+    try:
+        # Unbuffered append so the whole batch goes out in one write()
+        with open(filename, 'ab', buffering=0) as file:
+            written = file.write(batch)
+            if written != len(batch):
+                raise OSError(f"only {written} of {len(batch)} bytes written")
+            os.fsync(file.fileno())
+        metrics.count('bus_purchases_saved_total', len(purchase_lines))
         
     except Exception as e:
         print(f"Error saving purchase: {e}")
+        metrics.count('bus_purchase_save_failures_total')
         return False
+    
+    for listener in _purchase_listeners:
+        try:
+            listener(purchase_lines)
+        except Exception as e:
+            print(f"Error in purchase listener: {e}")
+    return True
 
 
 def load_purchases(filename='data/purchases.txt'):
@@ -125,6 +186,8 @@ def load_purchases(filename='data/purchases.txt'):
     
     Reads all purchase records from the purchases file, one per line.
     Returns an empty list if the file doesn't exist (no previous purchases).
+    Damaged records and a torn last record are left out (see
+    purchase_log.py), and the length/checksum frames are removed.
     
     Args:
         filename (str, optional): Path to the purchases file. Defaults to 'data/purchases.txt'.
@@ -135,9 +198,7 @@ def load_purchases(filename='data/purchases.txt'):
     purchases = []
     
     try:
-        with open(filename, 'r') as file:
-            for line in file:
-                purchases.append(line.strip())
+        purchases.extend(read_records(filename))
                 
     except FileNotFoundError:
         print("No previous purchases found.")
@@ -148,43 +209,44 @@ def load_purchases(filename='data/purchases.txt'):
     return purchases
 
 
-def load_ticket_objects(filename):
+@metrics.timed('catalog_load')
+def load_ticket_objects(filename, quiet=False, trusted=False):
     """
     Load ticket data and return as Ticket objects organized by Category.
     
     Reads CSV file, creates Ticket objects for each row, and organizes
-    them into Category objects. Returns a dictionary where keys are
-    category names and values are Category objects containing their tickets.
+    them into Category objects. Returns a Catalog (a dictionary where keys
+    are category names and values are Category objects containing their
+    tickets). Every row is checked first (see catalog_ingest.py); bad rows
+    are written to a reject file and skipped, and the rest still load.
     
     Args:
         filename (str): Path to the CSV file containing ticket data
+        quiet (bool, optional): Don't print the success message. Defaults to False.
+        trusted (bool, optional): The file was written by this program (the
+                                  catalog snapshot), so keep every row that
+                                  can be read. Defaults to False.
         
     Returns:
-        dict: Dictionary mapping category names (str) to Category objects,
-              or empty dict if error
+        Catalog: Dictionary mapping category names (str) to Category objects,
+                 or empty Catalog if error
     """
-    categories = {}
+    categories = Catalog()
     
     try:
-        with open(filename, 'r') as file:
-            reader = csv.DictReader(file)
-            
-            for row in reader:
-                # Create Ticket object
-                ticket = Ticket(row)
-                
-                # Get or create Category
-                cat_name = ticket.category
-                if cat_name not in categories:
-                    categories[cat_name] = Category(cat_name)
-                
-                # Add ticket to category
-                categories[cat_name].add_ticket(ticket)
+        categories, report = ingest_catalog(filename, trusted=trusted)
         
-        print(f"Loaded {len(categories)} categories successfully")
+        if not quiet:
+            print(f"Loaded {len(categories)} categories successfully")
+        if report.rejected:
+            print(f"Warning: skipped {report.rejected} bad ticket rows "
+                  f"(see {report.reject_file})")
+            metrics.count('bus_ticket_rows_rejected_total', report.rejected)
+        metrics.count('bus_tickets_loaded_total', report.loaded)
         
     except Exception as e:
         print(f"Error loading tickets: {e}")
+        metrics.count('bus_catalog_load_failures_total')
     
     return categories
 
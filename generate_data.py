@@ -0,0 +1,423 @@
+# ============================================================================
+# TEST DATA GENERATOR - BUS TICKET SYSTEM
+# ============================================================================
+# data/bus_tickets.csv only has about 80 rows, which is too small to show
+# how anything scales. This file writes large synthetic catalogs in the
+# same 16-column layout, and purchase logs in the Purchase.to_file_format
+# layout, for load and benchmark testing.
+#
+# Output is deterministic for a given seed and is written as it is
+# generated, so multi-GB files can be made without holding them in memory.
+#
+# Run: python generate_data.py catalog --rows 1000000 --out data/big_tickets.csv
+#      python generate_data.py purchases --rows 20000000 --catalog data/big_tickets.csv \
+#          --out data/big_purchases.txt
+# ============================================================================
+
+import argparse
+import csv
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from ticket_classes import TICKET_CSV_COLUMNS
+
+# Kinds of category, modelled on the real NCT feed. Each has a
+# description and the products sold in it:
+#   (title, entitlement type, unit, value, quantity, adult price in pence)
+CATEGORY_PROFILES = [
+    ('Single Tickets', 'Single journeys on buses in the {area}.', [
+        ('Single', 'flexible', 'minutes', '90', '1', 250),
+        ('Single 10 Trips', 'flexible', 'minutes', '90', '10', 2200),
+        ('Single 20 Trips', 'flexible', 'minutes', '90', '20', 4200),
+    ]),
+    ('24 Hour Tickets', 'Unlimited travel on all buses in the {area}.', [
+        ('Day', 'flexible', 'days', '1', '1', 450),
+        ('Day 5 Pack', 'flexible', 'days', '1', '5', 2100),
+        ('Day 10 Pack', 'flexible', 'days', '1', '10', 4000),
+        ('Day 50 Pack', 'flexible', 'days', '1', '50', 19000),
+    ]),
+    ('Season Tickets', 'Unlimited travel for a week- a month or a year in the {area}.', [
+        ('Week', 'flexible', 'days', '7', '1', 1850),
+        ('Month', 'flexible', 'days', '31', '1', 6500),
+        ('Year', 'flexible', 'days', '365', '1', 62000),
+    ]),
+    ('Network Tickets', 'Tickets for use on every bus in the {area} and Outer Zone.', [
+        ('Network Day', 'flexible', 'days', '1', '1', 600),
+        ('Network Week', 'flexible', 'days', '7', '1', 2400),
+        ('Network Month', 'flexible', 'days', '31', '1', 8500),
+    ]),
+    ('Group Tickets', 'Day tickets for groups travelling together in the {area}.', [
+        ('Grouprider', 'flexible', 'days', '1', '1', 900),
+        ('Family Day', 'flexible', 'days', '1', '1', 1100),
+    ]),
+    ('Academic Year Tickets', 'Academic Year tickets for school- college and university students.', [
+        ('Academic Year', 'fixed_date', '', '', '', 29900),
+        ('Academic Year Further', 'fixed_date', '', '', '', 48900),
+    ]),
+    ('Partner Tickets', 'Discounted tickets for partner organisations in the {area}.', [
+        ('Partner Day', 'flexible', 'days', '1', '1', 468),
+        ('Partner Group Day', 'flexible', 'days', '1', '1', 765),
+    ]),
+]
+
+# Passenger classes: (id, name, price multiplier, how often it is listed)
+PASSENGER_CLASSES = [
+    ('adult', 'Adult', 1.0, 40),
+    ('child', 'Under 19', 0.6, 25),
+    ('student', 'Student', 0.7, 20),
+    ('8b37170e-8639-4bf8-a230-e991538fa1ca', 'Under 22', 0.75, 15),
+]
+
+AREAS = ['City Zone', 'Outer Zone', 'County', 'North', 'South', 'East', 'West',
+         'Airport', 'Park & Ride', 'University']
+
+ACADEMIC_START = '2025-08-31T23:00:00+00:00'
+ACADEMIC_END = '2026-07-31T22:59:00+00:00'
+
+# Share of purchases made in each hour of the day (commuter peaks)
+HOURLY_WEIGHTS = [1, 1, 1, 1, 2, 8, 30, 70, 80, 40, 30, 30,
+                  35, 30, 30, 40, 65, 75, 45, 25, 15, 10, 6, 3]
+
+# Relative purchase volume on each day of the week (Monday first)
+WEEKDAY_WEIGHTS = [1.0, 1.0, 1.0, 1.0, 1.05, 0.6, 0.4]
+
+# How many tickets are bought in one purchase line
+QUANTITY_CHOICES = [1, 2, 3, 4, 5, 10]
+QUANTITY_WEIGHTS = [70, 17, 6, 4, 2, 1]
+
+# First purchase time when none is given (fixed so output is repeatable)
+DEFAULT_START = datetime(2026, 1, 1)
+
+# Rows are generated and written in chunks of this size
+CHUNK_SIZE = 10000
+
+
+def _random_uuid(rng):
+    """Return a uuid4-style id string taken from rng (so it is repeatable)"""
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _zipf_weights(count, exponent):
+    """Cumulative weights where item i is picked in proportion to 1/(i+1)^exponent"""
+    cumulative = []
+    total = 0.0
+    for rank in range(1, count + 1):
+        total += 1.0 / rank ** exponent
+        cumulative.append(total)
+    return cumulative
+
+
+def default_category_count(rows):
+    """
+    Return a realistic number of categories for a catalog size.
+
+    Args:
+        rows (int): Number of ticket rows
+
+    Returns:
+        int: The number of categories (at least one per category profile)
+    """
+    return max(len(CATEGORY_PROFILES), int(rows ** 0.5 / 4))
+
+
+def make_categories(rng, count):
+    """
+    Build the category definitions for a generated catalog.
+
+    The first categories use the City Zone, like the real feed; further
+    ones spread the same kinds of category over more areas. Each category
+    gets its own price level.
+
+    Args:
+        rng (random.Random): Random number generator
+        count (int): Number of categories
+
+    Returns:
+        list: One dict per category (id, title, description, profile, price factor)
+    """
+    categories = []
+    for number in range(count):
+        title, description, products = CATEGORY_PROFILES[number % len(CATEGORY_PROFILES)]
+        area_number = number // len(CATEGORY_PROFILES)
+        if area_number < len(AREAS):
+            area = AREAS[area_number]
+        else:
+            area = f'Area {area_number + 1}'
+        categories.append({
+            'id': _random_uuid(rng),
+            'title': f'{title} - {area}',
+            'description': description.format(area=area),
+            'products': products,
+            'price_factor': rng.uniform(0.85, 1.25),
+        })
+    return categories
+
+
+def generate_catalog_rows(rows, seed=0, category_count=None):
+    """
+    Generate ticket rows in the bus_tickets.csv layout.
+
+    Categories are picked with a skewed (Zipf) distribution, so a few
+    categories are large and most are small, as in the real feed. Prices
+    follow the product, the passenger class and the category's price
+    level, rounded to 5p.
+
+    Args:
+        rows (int): Number of rows to generate
+        seed (int, optional): Random seed. Defaults to 0.
+        category_count (int, optional): Number of categories. Defaults to
+                                        default_category_count(rows).
+
+    Yields:
+        dict: One CSV row (keys are TICKET_CSV_COLUMNS)
+    """
+    rng = random.Random(f'catalog-{seed}')
+    categories = make_categories(rng, category_count or default_category_count(rows))
+    category_weights = _zipf_weights(len(categories), 0.8)
+    class_weights = [weight for _, _, _, weight in PASSENGER_CLASSES]
+
+    produced = 0
+    while produced < rows:
+        chunk = min(CHUNK_SIZE, rows - produced)
+        picked_categories = rng.choices(categories, cum_weights=category_weights, k=chunk)
+        picked_classes = rng.choices(PASSENGER_CLASSES, weights=class_weights, k=chunk)
+
+        for category, passenger_class in zip(picked_categories, picked_classes):
+            name, entitlement_type, unit, value, quantity, adult_pence = rng.choice(category['products'])
+            class_id, class_name, multiplier, _ = passenger_class
+            group_size = 1
+            if name in ('Grouprider', 'Family Day'):
+                class_id, class_name, multiplier = 'adult', 'Adults', 1.0
+                group_size = rng.choice([2, 3])
+
+            pence = adult_pence * multiplier * category['price_factor'] * rng.uniform(0.95, 1.05)
+            pence = max(5, int(round(pence / 5)) * 5)
+            fixed = entitlement_type == 'fixed_date'
+
+            yield {
+                'category_id': category['id'],
+                'category_title': category['title'],
+                'category_description': category['description'],
+                'topup_id': _random_uuid(rng),
+                'topup_title': f'{class_name} {name}',
+                'topup_description': category['description'],
+                'topup_price_in_pence': str(pence),
+                'topup_entitlement_type': entitlement_type,
+                'topup_entitlement_unit': unit,
+                'topup_entitlement_value': value,
+                'topup_entitlement_quantity': quantity,
+                'topup_entitlement_start_date': ACADEMIC_START if fixed else '',
+                'topup_entitlement_end_date': ACADEMIC_END if fixed else '',
+                'topup_passenger_class_id': class_id,
+                'topup_passenger_class_name': class_name,
+                'topup_passenger_class_quantity': str(group_size),
+            }
+        produced += chunk
+
+
+def write_catalog(filename, rows, seed=0, category_count=None):
+    """
+    Write a generated catalog CSV.
+
+    Args:
+        filename (str): Path of the CSV to write
+        rows (int): Number of ticket rows
+        seed (int, optional): Random seed. Defaults to 0.
+        category_count (int, optional): Number of categories. Defaults to
+                                        default_category_count(rows).
+
+    Returns:
+        int: Number of rows written
+    """
+    written = 0
+    with open(filename, 'w', newline='', buffering=1024 * 1024) as file:
+        writer = csv.DictWriter(file, fieldnames=TICKET_CSV_COLUMNS)
+        writer.writeheader()
+        for row in generate_catalog_rows(rows, seed, category_count):
+            writer.writerow(row)
+            written += 1
+    return written
+
+
+def read_catalog_products(filename):
+    """
+    Read (category, ticket title, price in pence) for every row of a catalog.
+
+    Args:
+        filename (str): Path to a catalog CSV
+
+    Returns:
+        list: (category, title, pence) tuples in file order
+    """
+    products = []
+    with open(filename, 'r', encoding='utf-8', newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        try:
+            category_column = header.index('category_title')
+            title_column = header.index('topup_title')
+            price_column = header.index('topup_price_in_pence')
+        except ValueError:
+            print(f"Error: {filename} is not a ticket catalog")
+            return products
+        for row in reader:
+            try:
+                pence = int(float(row[price_column] or 0))
+                products.append((row[category_column], row[title_column], pence))
+            except (IndexError, ValueError):
+                continue  # Skip broken rows
+    return products
+
+
+def generate_purchase_lines(products, rows, seed=0, start=None, days=30, customers=0):
+    """
+    Generate purchase log lines in the Purchase.to_file_format layout.
+
+    Purchases arrive at random, busier in the morning and evening peaks
+    and quieter at weekends, spread over the given number of days.
+    Popular tickets are bought much more often than the rest (Zipf), most
+    purchases are for one ticket, and about one order in ten has two or
+    three lines sharing an order_id and timestamp. With customers, each
+    order is made by one of that many customers ('c0000001' ...), chosen
+    at random.
+
+    Args:
+        products (list): (category, title, pence) tuples to buy from
+        rows (int): Number of lines to generate
+        seed (int, optional): Random seed. Defaults to 0.
+        start (datetime, optional): When the log starts. Defaults to DEFAULT_START.
+        days (int, optional): Days the log covers. Defaults to 30.
+        customers (int, optional): Number of customers. Defaults to 0 (no
+                                   customer ids, like a log written before
+                                   customers were added).
+
+    Yields:
+        str: One log line, without the newline
+    """
+    rng = random.Random(f'purchases-{seed}')
+    start = (start or DEFAULT_START).replace(microsecond=0)
+
+    # Shuffle which tickets are popular, then weight them by rank
+    order = list(range(len(products)))
+    rng.shuffle(order)
+    ranked = [products[index] for index in order]
+    product_weights = _zipf_weights(len(ranked), 1.0)
+
+    # Expected purchases per second in each hour of the week
+    hourly_total = sum(HOURLY_WEIGHTS)
+    week_total = sum(WEEKDAY_WEIGHTS) * hourly_total
+    mean_rate = rows / (days * 86400.0)
+    rates = [mean_rate * 7 * 24 * WEEKDAY_WEIGHTS[day] * HOURLY_WEIGHTS[hour] / week_total
+             for day in range(7) for hour in range(24)]
+    start_hour_of_week = start.weekday() * 24 + start.hour
+
+    seconds = 0.0
+    whole_second = None
+    produced = 0
+    while produced < rows:
+        chunk = min(CHUNK_SIZE, rows - produced)
+        picked = rng.choices(ranked, cum_weights=product_weights, k=chunk)
+        quantities = rng.choices(QUANTITY_CHOICES, weights=QUANTITY_WEIGHTS, k=chunk)
+
+        position = 0
+        while position < chunk:
+            # Time until the next order, at the rate for the current hour
+            hour_of_week = (start_hour_of_week + int(seconds // 3600)) % 168
+            seconds += rng.expovariate(rates[hour_of_week])
+
+            # Same text as str(datetime); the date part is only rebuilt
+            # when the second changes
+            if int(seconds) != whole_second:
+                whole_second = int(seconds)
+                second_text = str(start + timedelta(seconds=whole_second))
+            microseconds = int((seconds - whole_second) * 1000000)
+            timestamp = f'{second_text}.{microseconds:06d}' if microseconds else second_text
+            order_id = '%012x' % rng.getrandbits(48)
+            customer = f'|c{rng.randrange(customers) + 1:07d}' if customers else ''
+
+            lines_in_order = 1 if rng.random() < 0.9 else rng.choice([2, 3])
+            for _ in range(min(lines_in_order, chunk - position)):
+                category, title, pence = picked[position]
+                quantity = quantities[position]
+                total = pence / 100.0 * quantity
+                yield f"{timestamp}|{category}|{title}|{quantity}|{total}|{order_id}{customer}"
+                position += 1
+        produced += chunk
+
+
+def write_purchase_log(filename, products, rows, seed=0, start=None, days=30, customers=0):
+    """
+    Write a generated purchase log.
+
+    Args:
+        filename (str): Path of the log to write
+        products (list): (category, title, pence) tuples to buy from
+        rows (int): Number of lines
+        seed (int, optional): Random seed. Defaults to 0.
+        start (datetime, optional): When the log starts. Defaults to DEFAULT_START.
+        days (int, optional): Days the log covers. Defaults to 30.
+        customers (int, optional): Number of customers. Defaults to 0 (none).
+
+    Returns:
+        int: Number of lines written
+    """
+    written = 0
+    batch = []
+    with open(filename, 'w', encoding='utf-8', buffering=1024 * 1024) as file:
+        for line in generate_purchase_lines(products, rows, seed, start, days, customers):
+            batch.append(line)
+            if len(batch) == CHUNK_SIZE:
+                file.write('\n'.join(batch) + '\n')
+                written += len(batch)
+                batch = []
+        if batch:
+            file.write('\n'.join(batch) + '\n')
+            written += len(batch)
+    return written
+
+
+def main():
+    """Generate a catalog or a purchase log from the command line"""
+    parser = argparse.ArgumentParser(description="Generate synthetic test data")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    catalog_parser = commands.add_parser('catalog', help="write a catalog CSV")
+    catalog_parser.add_argument('--rows', type=int, required=True, help="number of ticket rows")
+    catalog_parser.add_argument('--categories', type=int, default=None, help="number of categories")
+    catalog_parser.add_argument('--out', required=True, help="CSV file to write")
+    catalog_parser.add_argument('--seed', type=int, default=0, help="random seed")
+
+    purchases_parser = commands.add_parser('purchases', help="write a purchase log")
+    purchases_parser.add_argument('--rows', type=int, required=True, help="number of purchase lines")
+    purchases_parser.add_argument('--catalog', default='data/bus_tickets.csv', help="catalog to buy from")
+    purchases_parser.add_argument('--days', type=int, default=30, help="days the log covers")
+    purchases_parser.add_argument('--start', default=None, help="first day, e.g. 2026-01-01 (default)")
+    purchases_parser.add_argument('--customers', type=int, default=0,
+                                  help="number of customers (default: no customer ids)")
+    purchases_parser.add_argument('--out', required=True, help="log file to write")
+    purchases_parser.add_argument('--seed', type=int, default=0, help="random seed")
+
+    args = parser.parse_args()
+    started = time.perf_counter()
+
+    if args.command == 'catalog':
+        written = write_catalog(args.out, args.rows, args.seed, args.categories)
+    else:
+        products = read_catalog_products(args.catalog)
+        if not products:
+            print(f"Error: no tickets in {args.catalog}")
+            return
+        start = datetime.strptime(args.start, '%Y-%m-%d') if args.start else None
+        written = write_purchase_log(args.out, products, args.rows, args.seed, start, args.days,
+                                     args.customers)
+
+    elapsed = time.perf_counter() - started
+    size_mb = os.path.getsize(args.out) / 1e6
+    print(f"Wrote {written:,} rows ({size_mb:,.1f} MB) to {args.out} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+# ============================================================================
+# LIVE SALES STATISTICS - BUS TICKET SYSTEM
+# ============================================================================
+# Sliding-window sales figures for the admin dashboard: "purchases in the
+# last 5 minutes by category", "revenue per minute in the last hour".
+#
+# Every saved purchase is added to two ring buffers of time buckets:
+#   10-second buckets covering the last 15 minutes
+#   1-minute buckets covering the last hour
+# A bucket is reused once it falls out of its ring, so memory stays the
+# same however many purchases are made, and a window query only adds up
+# the buckets in the window (never the purchases themselves).
+#
+# The figures are fed by file_handler.save_purchases() through a purchase
+# listener (see track_purchases()), so purchases from the console menu and
+# from the service both count. They live in memory only and start empty
+# each time the program starts.
+# ============================================================================
+
+import threading
+import time
+from collections import Counter
+
+from file_handler import add_purchase_listener
+from ticket_classes import Purchase
+
+# (bucket length in seconds, number of buckets) for each ring
+SHORT_RING = (10, 90)   # 15 minutes
+LONG_RING = (60, 60)    # 1 hour
+
+
+class RingWindow:
+    """
+    Fixed number of time buckets, reused in a circle.
+
+    Bucket b (the number of whole bucket lengths since the epoch) lives in
+    slot b % bucket_count. Each slot remembers which bucket it holds, so
+    a slot left over from an older lap of the ring is cleared before it
+    is reused, and is skipped by queries.
+
+    Attributes:
+        bucket_seconds (int): Length of one bucket in seconds
+        bucket_count (int): Number of buckets in the ring
+    """
+
+    def __init__(self, bucket_seconds, bucket_count):
+        """
+        Initialize an empty ring.
+
+        Args:
+            bucket_seconds (int): Length of one bucket in seconds
+            bucket_count (int): Number of buckets
+        """
+        self.bucket_seconds = bucket_seconds
+        self.bucket_count = bucket_count
+        self._buckets = [-1] * bucket_count      # Bucket number held by each slot
+        self._purchases = [0] * bucket_count
+        self._tickets = [0] * bucket_count
+        self._revenue_pence = [0] * bucket_count
+        self._categories = [Counter() for _ in range(bucket_count)]
+
+    def span(self):
+        """
+        Return how far back the ring reaches.
+
+        Returns:
+            int: Seconds covered by all the buckets together
+        """
+        return self.bucket_seconds * self.bucket_count
+
+    def add(self, when, category, quantity, revenue_pence):
+        """
+        Add one purchase record.
+
+        Args:
+            when (float): Time of the purchase (seconds since the epoch)
+            category (str): Category name
+            quantity (int): Tickets bought
+            revenue_pence (int): Amount paid in pence
+
+        Returns:
+            None
+        """
+        bucket = int(when // self.bucket_seconds)
+        slot = bucket % self.bucket_count
+        if self._buckets[slot] != bucket:
+            if self._buckets[slot] > bucket:
+                return  # Older than anything the ring still holds
+            self._buckets[slot] = bucket
+            self._purchases[slot] = 0
+            self._tickets[slot] = 0
+            self._revenue_pence[slot] = 0
+            self._categories[slot].clear()
+        self._purchases[slot] += 1
+        self._tickets[slot] += quantity
+        self._revenue_pence[slot] += revenue_pence
+        self._categories[slot][category] += 1
+
+    def _window_buckets(self, seconds, now):
+        """Range of bucket numbers in the last 'seconds' (at most the whole ring)"""
+        last = int(now // self.bucket_seconds)
+        count = min(self.bucket_count, max(1, -(-int(seconds) // self.bucket_seconds)))
+        return last - count + 1, last
+
+    def totals(self, seconds, now):
+        """
+        Add up the buckets in a window.
+
+        Args:
+            seconds (float): Window length, e.g. 300 for the last 5 minutes
+            now (float): Current time (seconds since the epoch)
+
+        Returns:
+            dict: 'purchases', 'tickets', 'revenue' (pounds) and
+                  'by_category' (Counter of purchases per category)
+        """
+        first, last = self._window_buckets(seconds, now)
+        purchases = tickets = revenue_pence = 0
+        by_category = Counter()
+        for slot in range(self.bucket_count):
+            if first <= self._buckets[slot] <= last:
+                purchases += self._purchases[slot]
+                tickets += self._tickets[slot]
+                revenue_pence += self._revenue_pence[slot]
+                by_category.update(self._categories[slot])
+        return {'purchases': purchases, 'tickets': tickets,
+                'revenue': revenue_pence / 100, 'by_category': by_category}
+
+    def series(self, seconds, now):
+        """
+        Revenue and purchases for each bucket in a window, oldest first.
+
+        Args:
+            seconds (float): Window length
+            now (float): Current time (seconds since the epoch)
+
+        Returns:
+            list: (bucket start time, purchases, revenue in pounds) per bucket
+        """
+        first, last = self._window_buckets(seconds, now)
+        points = []
+        for bucket in range(first, last + 1):
+            slot = bucket % self.bucket_count
+            if self._buckets[slot] == bucket:
+                points.append((bucket * self.bucket_seconds, self._purchases[slot],
+                               self._revenue_pence[slot] / 100))
+            else:
+                points.append((bucket * self.bucket_seconds, 0, 0.0))
+        return points
+
+
+class LiveSalesStats:
+    """
+    Sliding-window sales figures, updated as purchases are saved.
+
+    Windows up to 15 minutes are answered from the 10-second ring, longer
+    ones (up to an hour) from the 1-minute ring.
+    """
+
+    def __init__(self, short_ring=SHORT_RING, long_ring=LONG_RING, clock=time.time):
+        """
+        Initialize empty statistics.
+
+        Args:
+            short_ring (tuple, optional): (bucket seconds, buckets) of the fine ring
+            long_ring (tuple, optional): (bucket seconds, buckets) of the coarse ring
+            clock (optional): Function returning the current time. Defaults to time.time.
+        """
+        self.clock = clock
+        self._rings = [RingWindow(*short_ring), RingWindow(*long_ring)]
+        self._lock = threading.Lock()
+
+    def add_record(self, category, quantity, total, when=None):
+        """
+        Add one purchase record.
+
+        Args:
+            category (str): Category name of the purchase
+            quantity (int): Number of tickets bought
+            total (float): Total paid in pounds
+            when (float, optional): Time of the purchase. Defaults to now.
+
+        Returns:
+            None
+        """
+        when = self.clock() if when is None else when
+        revenue_pence = round(total * 100)
+        with self._lock:
+            for ring in self._rings:
+                ring.add(when, category, quantity, revenue_pence)
+
+    def add_lines(self, purchase_lines):
+        """
+        Add purchase records in file format (used as a purchase listener).
+
+        Args:
+            purchase_lines (iterable): Strings in Purchase.to_file_format layout
+
+        Returns:
+            None
+        """
+        now = self.clock()
+        for purchase_data in purchase_lines:
+            try:
+                purchase_info = Purchase.from_file_format(purchase_data)
+                self.add_record(purchase_info['category'], int(purchase_info['quantity']),
+                                float(purchase_info['total']), now)
+            except (IndexError, ValueError):
+                continue  # Skip invalid purchases
+
+    def _ring_for(self, seconds):
+        """The finest ring that covers a window (the coarsest if none does)"""
+        for ring in self._rings:
+            if seconds <= ring.span():
+                return ring
+        return self._rings[-1]
+
+    def window(self, seconds):
+        """
+        Sales in the last 'seconds'.
+
+        Args:
+            seconds (float): Window length, e.g. 300 for the last 5 minutes
+
+        Returns:
+            dict: 'purchases', 'tickets', 'revenue' and 'by_category'
+        """
+        with self._lock:
+            return self._ring_for(seconds).totals(seconds, self.clock())
+
+    def revenue_per_minute(self, minutes=60):
+        """
+        Purchases and revenue for each of the last few minutes, oldest first.
+
+        Args:
+            minutes (int, optional): Number of minutes. Defaults to 60.
+
+        Returns:
+            list: (minute start time, purchases, revenue in pounds) per minute
+        """
+        with self._lock:
+            return self._rings[-1].series(minutes * 60, self.clock())
+
+    def to_dict(self):
+        """
+        Convert the main windows to a JSON-friendly dictionary.
+
+        Returns:
+            dict: Figures for the last 1, 5 and 60 minutes
+        """
+        result = {}
+        for label, seconds in (('last_1_min', 60), ('last_5_min', 300), ('last_60_min', 3600)):
+            totals = self.window(seconds)
+            totals['by_category'] = dict(totals['by_category'].most_common())
+            result[label] = totals
+        return result
+
+
+# The figures shown on the admin dashboard
+tracker = LiveSalesStats()
+
+_tracking = False
+_tracking_lock = threading.Lock()
+
+
+def track_purchases():
+    """
+    Start feeding every saved purchase into the tracker (only once).
+
+    Returns:
+        LiveSalesStats: The tracker
+    """
+    global _tracking
+    with _tracking_lock:
+        if not _tracking:
+            add_purchase_listener(tracker.add_lines)
+            _tracking = True
+    return tracker
@@ -0,0 +1,327 @@
+# ============================================================================
+# PURCHASE LOG STATISTICS - BUS TICKET SYSTEM
+# ============================================================================
+# Totals over one or more purchase logs (e.g. the live log and years of
+# archived ones), computed map-reduce style:
+#
+#   map     - each log is cut into byte ranges that end at a record
+#             boundary, and each range is summed on its own (in a worker
+#             process when there is enough to read) into a LogStats
+#   reduce  - the partial LogStats are merged into one
+#
+# Every total is a count or a sum in pence, so merging is exact and the
+# result doesn't depend on how the logs were split or how many workers
+# ran. Damaged records found by purchase_log.py are skipped by offset
+# and a torn last record is never read.
+#
+# Run: python log_stats.py data/purchases.txt archive/*.txt --workers 4
+# ============================================================================
+
+import argparse
+import os
+import time
+from collections import Counter
+
+from purchase_log import FRAME_MARK, get_verified_log, plan_segments
+
+# Logs totalling at least this much are read by worker processes, in ranges of SPLIT_BYTES
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+SPLIT_BYTES = 8 * 1024 * 1024
+
+
+class LogStats:
+    """
+    Totals for part of a purchase log, or merged totals for several logs.
+
+    Attributes:
+        purchases (int): Purchase records counted
+        tickets (int): Tickets sold (sum of quantities)
+        revenue_pence (int): Revenue in pence
+        skipped (int): Records that couldn't be read (damaged or malformed)
+        first (str): Earliest timestamp seen ('' if none)
+        last (str): Latest timestamp seen ('' if none)
+        category_purchases (Counter): Purchases per category
+        category_tickets (Counter): Tickets sold per category
+        category_revenue (Counter): Revenue in pence per category
+        month_revenue (Counter): Revenue in pence per 'YYYY-MM'
+    """
+
+    def __init__(self):
+        """Initialize empty totals."""
+        self.purchases = 0
+        self.tickets = 0
+        self.revenue_pence = 0
+        self.skipped = 0
+        self.first = ''
+        self.last = ''
+        self.category_purchases = Counter()
+        self.category_tickets = Counter()
+        self.category_revenue = Counter()
+        self.month_revenue = Counter()
+
+    def add_lines(self, lines):
+        """
+        Add purchase records to the totals.
+
+        Args:
+            lines (iterable): Records in Purchase.to_file_format layout
+                              (framed or not, with or without newline)
+
+        Returns:
+            None
+        """
+        purchases = tickets = revenue = skipped = 0
+        first = self.first
+        last = self.last
+        category_purchases = self.category_purchases
+        category_tickets = self.category_tickets
+        category_revenue = self.category_revenue
+        month_revenue = self.month_revenue
+
+        for line in lines:
+            cut = line.rfind(FRAME_MARK)
+            if cut != -1:
+                line = line[:cut]
+            parts = line.strip().split('|')
+            if len(parts) < 5:
+                if parts != ['']:
+                    skipped += 1
+                continue
+            try:
+                quantity = int(parts[3])
+                pence = round(float(parts[4]) * 100)
+            except ValueError:
+                skipped += 1
+                continue
+
+            timestamp = parts[0].strip()
+            category = parts[1]
+            purchases += 1
+            tickets += quantity
+            revenue += pence
+            category_purchases[category] += 1
+            category_tickets[category] += quantity
+            category_revenue[category] += pence
+            month_revenue[timestamp[:7]] += pence
+            if not first or timestamp < first:
+                first = timestamp
+            if timestamp > last:
+                last = timestamp
+
+        self.purchases += purchases
+        self.tickets += tickets
+        self.revenue_pence += revenue
+        self.skipped += skipped
+        self.first = first
+        self.last = last
+
+    def merge(self, other):
+        """
+        Add another LogStats' totals to these.
+
+        Args:
+            other (LogStats): Totals for another part of the logs
+
+        Returns:
+            LogStats: self, so partials can be folded together
+        """
+        self.purchases += other.purchases
+        self.tickets += other.tickets
+        self.revenue_pence += other.revenue_pence
+        self.skipped += other.skipped
+        if other.first and (not self.first or other.first < self.first):
+            self.first = other.first
+        if other.last > self.last:
+            self.last = other.last
+        self.category_purchases.update(other.category_purchases)
+        self.category_tickets.update(other.category_tickets)
+        self.category_revenue.update(other.category_revenue)
+        self.month_revenue.update(other.month_revenue)
+        return self
+
+    def to_dict(self):
+        """
+        Convert the totals to a dictionary (e.g. for JSON output).
+
+        Returns:
+            dict: The totals, with revenue in pounds
+        """
+        return {
+            'purchases': self.purchases,
+            'tickets': self.tickets,
+            'revenue': self.revenue_pence / 100,
+            'skipped': self.skipped,
+            'first': self.first,
+            'last': self.last,
+            'categories': {category: {'purchases': count,
+                                      'tickets': self.category_tickets[category],
+                                      'revenue': self.category_revenue[category] / 100}
+                           for category, count in self.category_purchases.most_common()},
+            'months': {month: pence / 100 for month, pence in sorted(self.month_revenue.items())},
+        }
+
+
+def scan_range(filename, start, end, damaged=()):
+    """
+    Total the records in a byte range of a log (the map step).
+
+    Args:
+        filename (str): Path to the log
+        start (int): Offset of the first record
+        end (int): Offset just after the last record's newline
+        damaged (iterable, optional): Offsets of damaged records to skip
+
+    Returns:
+        LogStats: Totals for the range
+    """
+    stats = LogStats()
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+
+    if not damaged:
+        stats.add_lines(data.decode('utf-8', 'replace').split('\n'))
+        return stats
+
+    damaged = set(damaged)
+    good = []
+    offset = start
+    for raw_line in data.split(b'\n'):
+        if offset in damaged:
+            stats.skipped += 1
+        else:
+            good.append(raw_line.decode('utf-8', 'replace'))
+        offset += len(raw_line) + 1
+    stats.add_lines(good)
+    return stats
+
+
+def _scan_task(task):
+    """Run scan_range for a (filename, start, end, damaged) task"""
+    return scan_range(*task)
+
+
+def plan_ranges(filenames, split_bytes=SPLIT_BYTES):
+    """
+    Cut logs into byte ranges to total separately.
+
+    Each log is checked first (see purchase_log.get_verified_log, which
+    only checks records added since last time), so ranges stop at the
+    last complete record and carry the damaged records inside them.
+
+    Args:
+        filenames (list): Paths to the logs
+        split_bytes (int, optional): Target size of a range. Defaults to SPLIT_BYTES.
+
+    Returns:
+        list: (filename, start, end, damaged offsets) tasks
+
+    Raises:
+        FileNotFoundError: If a log doesn't exist
+    """
+    tasks = []
+    for filename in filenames:
+        if not os.path.exists(filename):
+            raise FileNotFoundError(f"{filename} not found")
+        verified = get_verified_log(filename)
+        for start, end in plan_segments(filename, 0, verified.verified_offset, split_bytes):
+            damaged = [offset for offset, _ in verified.damaged if start <= offset < end]
+            tasks.append((filename, start, end, damaged))
+    return tasks
+
+
+def collect_stats(filenames, workers=None, split_bytes=SPLIT_BYTES):
+    """
+    Total one or more purchase logs, in parallel when they are big enough.
+
+    Args:
+        filenames (str or list): Path or paths to the logs
+        workers (int, optional): Worker processes; 0 or 1 totals everything
+                                 in this process. Defaults to one per CPU
+                                 when the logs total at least
+                                 PARALLEL_MIN_BYTES, otherwise none.
+        split_bytes (int, optional): Target size of a range. Defaults to SPLIT_BYTES.
+
+    Returns:
+        LogStats: Totals for all the logs
+
+    Raises:
+        FileNotFoundError: If a log doesn't exist
+    """
+    if isinstance(filenames, str):
+        filenames = [filenames]
+    tasks = plan_ranges(filenames, split_bytes)
+    if workers is None:
+        total_bytes = sum(end - start for _, start, end, _ in tasks)
+        workers = (os.cpu_count() or 1) if total_bytes >= PARALLEL_MIN_BYTES else 0
+
+    stats = LogStats()
+    if workers > 1 and len(tasks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            for partial in pool.map(_scan_task, tasks):
+                stats.merge(partial)
+    else:
+        for task in tasks:
+            stats.merge(_scan_task(task))
+    return stats
+
+
+def print_stats(stats, categories=10):
+    """
+    Print totals the way the statistics screens do.
+
+    Args:
+        stats (LogStats): Totals to print
+        categories (int, optional): Most categories to list. Defaults to 10.
+
+    Returns:
+        None
+    """
+    print(f"  Total purchases: {stats.purchases:,}")
+    print(f"  Tickets sold: {stats.tickets:,}")
+    print(f"  Total revenue: £{stats.revenue_pence / 100:,.2f}")
+    if stats.purchases:
+        print(f"  Average purchase: £{stats.revenue_pence / 100 / stats.purchases:.2f}")
+        print(f"  From {stats.first[:19]} to {stats.last[:19]}")
+    if stats.skipped:
+        print(f"  Unreadable records skipped: {stats.skipped:,}")
+
+    if stats.category_purchases:
+        print(f"\n  REVENUE BY CATEGORY:")
+        for category, count in stats.category_purchases.most_common(categories):
+            print(f"    {category}: £{stats.category_revenue[category] / 100:,.2f} "
+                  f"({count:,} purchases, {stats.category_tickets[category]:,} tickets)")
+        hidden = len(stats.category_purchases) - categories
+        if hidden > 0:
+            print(f"    ... and {hidden} more")
+
+
+def main():
+    """Total purchase logs from the command line"""
+    parser = argparse.ArgumentParser(description="Statistics over one or more purchase logs")
+    parser.add_argument('logs', nargs='*', default=['data/purchases.txt'], help="purchase logs")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per CPU for big logs)")
+    parser.add_argument('--split-mb', type=float, default=SPLIT_BYTES / 1024 / 1024,
+                        help="size of each range in MB")
+    parser.add_argument('--months', action='store_true', help="also show revenue by month")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        stats = collect_stats(args.logs, args.workers, int(args.split_mb * 1024 * 1024))
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        return
+    seconds = time.perf_counter() - start
+
+    print(f"\n{len(args.logs)} log(s) in {seconds:.2f}s")
+    print_stats(stats)
+    if args.months:
+        print(f"\n  REVENUE BY MONTH:")
+        for month, pence in sorted(stats.month_revenue.items()):
+            print(f"    {month}: £{pence / 100:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
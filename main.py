@@ -6,10 +6,22 @@
 # ============================================================================
 
 # Import functions from our other files
-from file_handler import load_ticket_objects, save_purchase, load_purchases
-from ticket_classes import Purchase
+import argparse
+import getpass
+import metrics
+import live_stats
+import best_sellers
+from file_handler import save_purchases, load_purchases
+from purchase_log import recover_log
+import os
+from catalog_journal import CatalogLoader
+from ticket_classes import Purchase, Cart, CUSTOMER_ID_PATTERN
+from catalog import find_tickets
+from ticket_views import parse_choice, ORDER_NAMES
 from collections import Counter
-from admin import admin_panel
+
+# Customer used when no --customer is given and the login name can't be used
+DEFAULT_CUSTOMER = 'guest'
 
 
 # ============================================================================
@@ -28,7 +40,8 @@ def display_menu():
     print("4. View My Purchases")
     print("5. View Purchase Statistics")
     print("6. Admin Panel")
-    print("7. Exit")
+    print("7. Find Cheapest Fare")
+    print("8. Exit")
     print("="*40)
 
 
@@ -37,6 +50,7 @@ def display_menu():
 # ============================================================================
 # This function shows all ticket categories and lets user see tickets in each
 # ============================================================================
+@metrics.timed('browse')
 def view_categories(categories):
     """Show all ticket categories and let user browse tickets"""
     
@@ -51,28 +65,36 @@ def view_categories(categories):
     print("="*40)
     
     # Convert dictionary to list so we can number them
-    category_list = list(categories.values())
-    
-    # Show each category with a number
-    for number, category in enumerate(category_list, 1):
-        print(f"{number}. {category}")
+    # (read-locked so an admin change can't happen half-way through)
+    with categories.read_locked():
+        category_list = list(categories.values())
+        
+        # Show each category with a number
+        for number, category in enumerate(category_list, 1):
+            print(f"{number}. {category}")
     
     print("="*40)
     
     # Ask user if they want to see details
+    # (a 'p' or 'e' after the number lists cheapest or expiring first)
     try:
-        user_input = input("\nEnter category number for details (or Enter to return): ")
+        user_input = input("\nEnter category number for details, add p for cheapest first "
+                           "or e for expiring soonest (or Enter to return): ")
         
         # If user entered something (not just pressed Enter)
         if user_input.strip():
             # Convert to number (subtract 1 because list starts at 0)
-            category_number = int(user_input) - 1
+            category_number, order = parse_choice(user_input)
+            category_number -= 1
             
             # Check if the number is valid
             if 0 <= category_number < len(category_list):
                 # Show all tickets in that category
                 selected_category = category_list[category_number]
-                selected_category.display_info()
+                if order:
+                    print(f"\n(Sorted {ORDER_NAMES[order]})")
+                with categories.read_locked():
+                    selected_category.display_info(order)
             else:
                 print("Invalid number!")
                 
@@ -85,6 +107,7 @@ def view_categories(categories):
 # ============================================================================
 # This function lets the user search for tickets by typing keywords
 # ============================================================================
+@metrics.timed('search')
 def search_tickets(categories):
     """Search for tickets by name or category"""
     
@@ -96,20 +119,8 @@ def search_tickets(categories):
         print("Search term cannot be empty!")
         return
     
-    # List to store matching tickets
-    matching_tickets = []
-    
-    # Look through all categories
-    for category in categories.values():
-        # Look through all tickets in each category
-        for ticket in category.get_all_tickets():
-            # Check if search word matches ticket name or category name
-            ticket_name_lower = ticket.topup_type.lower()
-            category_name_lower = ticket.category.lower()
-            
-            if search_word in ticket_name_lower or search_word in category_name_lower:
-                # Add this ticket to our results
-                matching_tickets.append((category.name, ticket))
+    # Look through all categories for tickets matching the search word
+    matching_tickets = find_tickets(categories, search_word)
     
     # Check if we found anything
     if not matching_tickets:
@@ -132,83 +143,132 @@ def search_tickets(categories):
 # ============================================================================
 # FUNCTION 4: PURCHASE TICKET
 # ============================================================================
-# This function handles the entire purchase process step by step
+# This function handles the entire purchase process step by step.
+# Several tickets can be added to a cart and bought together in one order.
 # ============================================================================
-def purchase_ticket(categories):
-    """Handle the ticket purchase process"""
+def choose_ticket_and_quantity(snapshot):
+    """Ask the user for a category, a ticket and a quantity"""
+    
+    # STEP 1: Show categories and let user choose
+    category_names = snapshot.category_names()
+    
+    print("\nAvailable Categories:")
+    for number, category_name in enumerate(category_names, 1):
+        print(f"{number}. {category_name}")
+    
+    # Get user's category choice ('3p' lists cheapest first, '3e' expiring soonest)
+    category_choice, order = parse_choice(input("\nSelect category number "
+                                                "(add p for cheapest first, e for expiring soonest): "))
+    category_choice -= 1
+    
+    # Check if choice is valid
+    if category_choice < 0 or category_choice >= len(category_names):
+        print("Invalid category!")
+        return None
+    
+    # Get the selected category
+    chosen_category_name = category_names[category_choice]
+    
+    # STEP 2: Show tickets in that category and let user choose
+    tickets_in_category = snapshot.get_tickets(chosen_category_name, order)
+    
+    if order:
+        print(f"\nTickets in {chosen_category_name} ({ORDER_NAMES[order]}):")
+    else:
+        print(f"\nTickets in {chosen_category_name}:")
+    for number, ticket in enumerate(tickets_in_category, 1):
+        price = ticket.get_price()
+        print(f"{number}. {ticket.topup_type} - £{price:.2f}")
+    
+    # Get user's ticket choice
+    ticket_choice = int(input("\nSelect ticket number: ")) - 1
+    
+    # Check if choice is valid
+    if ticket_choice < 0 or ticket_choice >= len(tickets_in_category):
+        print("Invalid ticket!")
+        return None
+    
+    # Get the selected ticket
+    chosen_ticket = tickets_in_category[ticket_choice]
+    
+    # STEP 3: Ask for quantity
+    quantity = int(input("Enter quantity: "))
+    
+    # Check if quantity is valid
+    if quantity <= 0:
+        print("Quantity must be positive!")
+        return None
+    
+    return chosen_ticket, quantity
+
+
+@metrics.timed('purchase')
+def purchase_ticket(categories, customer_id=DEFAULT_CUSTOMER):
+    """Handle the ticket purchase process for a customer"""
     
     print("\n" + "="*40)
     print("   PURCHASE TICKET")
     print("="*40)
     
+    # Pin the catalog version for the whole purchase, so an admin price
+    # change made while the user is choosing can't change what they pay
+    snapshot = categories.pin()
+    
     try:
-        # STEP 1: Show categories and let user choose
-        category_list = list(categories.values())
-        
-        print("\nAvailable Categories:")
-        for number, category in enumerate(category_list, 1):
-            print(f"{number}. {category.name}")
-        
-        # Get user's category choice
-        category_choice = int(input("\nSelect category number: ")) - 1
-        
-        # Check if choice is valid
-        if category_choice < 0 or category_choice >= len(category_list):
-            print("Invalid category!")
-            return
-        
-        # Get the selected category
-        chosen_category = category_list[category_choice]
-        
-        # STEP 2: Show tickets in that category and let user choose
-        tickets_in_category = chosen_category.get_all_tickets()
-        
-        print(f"\nTickets in {chosen_category.name}:")
-        for number, ticket in enumerate(tickets_in_category, 1):
-            price = ticket.get_price()
-            print(f"{number}. {ticket.topup_type} - £{price:.2f}")
-        
-        # Get user's ticket choice
-        ticket_choice = int(input("\nSelect ticket number: ")) - 1
+        # STEPS 1-3: Fill the cart, one ticket type at a time
+        cart = Cart()
         
-        # Check if choice is valid
-        if ticket_choice < 0 or ticket_choice >= len(tickets_in_category):
-            print("Invalid ticket!")
-            return
-        
-        # Get the selected ticket
-        chosen_ticket = tickets_in_category[ticket_choice]
-        
-        # STEP 3: Ask for quantity
-        quantity = int(input("Enter quantity: "))
-        
-        # Check if quantity is valid
-        if quantity <= 0:
-            print("Quantity must be positive!")
-            return
-        
-        # STEP 4: Show summary and ask for confirmation
-        unit_price = chosen_ticket.get_price()
-        total_price = unit_price * quantity
-        
-        print(f"\nYou are purchasing:")
-        print(f"{quantity}x {chosen_ticket.topup_type}")
-        print(f"Total: £{total_price:.2f}")
+        while True:
+            try:
+                choice = choose_ticket_and_quantity(snapshot)
+            except ValueError:
+                # A typo only loses this item - ask again, keeping the cart
+                print("Invalid input! Please enter numbers only.")
+                continue
+            if choice is None:
+                if cart.is_empty():
+                    return
+            else:
+                chosen_ticket, quantity = choice
+                cart.add_item(chosen_ticket, quantity)
+            
+            add_more = input("\nAdd another ticket type? (yes/no): ").lower()
+            if add_more not in ['yes', 'y']:
+                break
         
-        # Ask user to confirm
-        confirm_answer = input("\nConfirm purchase? (yes/no): ").lower()
+        # STEP 4: Show summary and ask for confirmation (lines can be removed first)
+        while True:
+            print(f"\nYou are purchasing:")
+            cart.display_info()
+            
+            # Ask user to confirm
+            confirm_answer = input("\nConfirm purchase? (yes/no, or r to remove a line): ").lower()
+            if confirm_answer != 'r':
+                break
+            
+            try:
+                line_number = int(input("Line number to remove: ")) - 1
+            except ValueError:
+                line_number = -1
+            if 0 <= line_number < len(cart.lines):
+                cart.remove_item(line_number)
+            else:
+                print("Invalid line number!")
+            if cart.is_empty():
+                print("Cart is empty - purchase cancelled.")
+                return
         
         # If user confirms
         if confirm_answer in ['yes', 'y']:
-            # Create a Purchase object
-            new_purchase = Purchase(chosen_ticket, quantity)
+            # Turn the cart into an order (one Purchase per line)
+            new_order = cart.checkout(customer_id)
             
-            # Save to file
-            purchase_saved = save_purchase(new_purchase.to_file_format())
+            # Save every line in one write
+            purchase_saved = save_purchases(new_order.to_file_format())
             
             if purchase_saved:
                 # Show receipt
-                new_purchase.display_receipt()
+                new_order.display_receipt()
                 print("\n✓ Purchase saved successfully!")
             else:
                 print("\n✗ Error saving purchase!")
@@ -219,6 +279,9 @@ def purchase_ticket(categories):
         print("Invalid input! Please enter numbers only.")
     except Exception as e:
         print(f"Error during purchase: {e}")
+    finally:
+        # Let the pinned version be freed once nobody else is using it
+        categories.unpin(snapshot)
 
 
 # ============================================================================
@@ -226,31 +289,30 @@ def purchase_ticket(categories):
 # ============================================================================
 # This function shows all previous purchases the user has made
 # ============================================================================
-def view_my_purchases():
-    """Display all previous purchases"""
+@metrics.timed('history')
+def view_my_purchases(customer_id=DEFAULT_CUSTOMER):
+    """Display the customer's previous purchases"""
     
-    # Load all purchases from file
-    all_purchases = load_purchases()
+    # Look up only this customer's purchases (only loaded the first time)
+    from customer_index import purchases_for_customer
+    my_purchases = purchases_for_customer(customer_id)
     
     # Check if there are any purchases
-    if not all_purchases:
-        print("\nNo purchases found.")
+    if not my_purchases:
+        print(f"\nNo purchases found for {customer_id}.")
         return
     
     # Display header
     print("\n" + "="*40)
-    print("   YOUR PURCHASE HISTORY")
+    print(f"   YOUR PURCHASE HISTORY ({customer_id})")
     print("="*40)
     
     # Variable to keep track of total money spent
     total_money_spent = 0.0
     
     # Go through each purchase
-    for purchase_number, purchase_data in enumerate(all_purchases, 1):
+    for purchase_number, purchase_info in enumerate(my_purchases, 1):
         try:
-            # Convert the saved data back to a dictionary
-            purchase_info = Purchase.from_file_format(purchase_data)
-            
             # Display purchase details
             print(f"\n{purchase_number}. Date: {purchase_info['timestamp']}")
             print(f"   Ticket: {purchase_info['topup_type']}")
@@ -282,6 +344,7 @@ def view_my_purchases():
 # ============================================================================
 # This function shows a simple bar chart of purchases by category
 # ============================================================================
+@metrics.timed('stats')
 def view_purchase_stats():
     """Show statistics about purchases with a simple bar chart"""
     
@@ -340,6 +403,67 @@ def view_purchase_stats():
     print("="*40)
     total_purchases = sum(category_purchase_count.values())
     print(f"Total purchases: {total_purchases}")
+    
+    # Best-selling tickets, from sketches kept next to the purchase log
+    # (approximate for very large logs, with the error shown)
+    top_sellers = best_sellers.get_best_sellers()
+    print("\n" + "="*40)
+    print("   TOP 10 TICKETS")
+    print("="*40)
+    best_sellers.print_top(*top_sellers.top_tickets(10))
+    
+    from datetime import date
+    today = str(date.today())
+    rows, day_total, unlisted_error = top_sellers.top_tickets_for_days(today, today, 5)
+    if rows:
+        print("\nTOP 5 TICKETS TODAY")
+        best_sellers.print_top(rows, day_total, unlisted_error)
+
+
+# ============================================================================
+# FUNCTION 7: FIND CHEAPEST FARE
+# ============================================================================
+# This function asks how the user travels and shows the cheapest tickets
+# ============================================================================
+@metrics.timed('fare_finder')
+def find_cheapest_fare(categories):
+    """Find the cheapest tickets for a number of journeys over some days"""
+    # Only loaded the first time it is used
+    from fare_optimizer import find_cheapest_fare as cheapest_fare, spread_journeys
+    from datetime import date
+    
+    # Get the travel pattern from the user
+    passenger_class = input("\nPassenger class (adult, student, child, Under 22): ").strip()
+    if not passenger_class:
+        print("Passenger class cannot be empty!")
+        return
+    
+    try:
+        journeys = int(input("How many journeys? "))
+        days = int(input("Over how many days? "))
+    except ValueError:
+        print("Please enter whole numbers!")
+        return
+    
+    if journeys <= 0 or days <= 0:
+        print("Journeys and days must be greater than 0!")
+        return
+    if days > 366:
+        print("Please enter at most 366 days!")
+        return
+    
+    weekdays_only = input("Weekdays only? (yes/no): ").lower() in ["yes", "y"]
+    
+    # Work out the cheapest tickets
+    today = date.today()
+    pattern = spread_journeys(journeys, days, today, weekdays_only)
+    plan = cheapest_fare(categories, passenger_class, pattern, today)
+    
+    if plan is None:
+        print(f"\nNo tickets found for passenger class '{passenger_class}'")
+        return
+    
+    plan.display_info()
 
 
 # ============================================================================
@@ -350,23 +474,74 @@ def view_purchase_stats():
 def main():
     """Main program - this is where everything starts"""
     
-    # STEP 1: Load ticket data from CSV file
-    print("Loading ticket data...")
-    categories = load_ticket_objects('data/bus_tickets.csv')
+    # Optional instrumentation (see metrics.py)
+    parser = argparse.ArgumentParser(description="Bus Ticket Purchase System")
+    parser.add_argument('--metrics', nargs='?', const=metrics.DEFAULT_METRICS_FILE,
+                        help="collect timings and write them to a Prometheus text file")
+    parser.add_argument('--profile', metavar='OPERATION',
+                        help="profile one operation with cProfile (e.g. search, purchase)")
+    parser.add_argument('--customer', help="customer id for purchases and history "
+                                           "(default: your login name)")
+    args = parser.parse_args()
+    if args.metrics or args.profile:
+        metrics.enable(args.metrics, profile_operation=args.profile)
+    
+    # Who is buying (their purchases are the ones shown under View My Purchases)
+    customer_id = args.customer or default_customer_id()
+    if not CUSTOMER_ID_PATTERN.match(customer_id):
+        print(f"Error: invalid customer id '{customer_id}' (use letters, digits and _ . @ -)")
+        return
     
-    # Check if data loaded successfully
-    if not categories:
+    # Cut off a purchase record left half-written by a crash or power cut
+    removed = recover_log('data/purchases.txt')
+    if removed:
+        print(f"Recovered the purchase log (removed {removed} bytes of an unfinished record)")
+    
+    # Feed saved purchases into the live figures on the admin dashboard
+    live_stats.track_purchases()
+    best_sellers.track_purchases()
+    
+    # STEP 1: Start loading ticket data in the background, so the menu
+    # can be shown straight away
+    if not os.path.exists('data/bus_tickets.csv'):
+        print("Error: File data/bus_tickets.csv not found!")
         print("Cannot run without ticket data. Exiting.")
         return
+    categories = CatalogLoader('data/bus_tickets.csv').start()
+    
+    # STEP 2: Run the menu until the user exits
+    run_menu(categories, customer_id)
+
+
+def default_customer_id():
+    """Return the login name as a customer id, or DEFAULT_CUSTOMER if it can't be used"""
+    try:
+        login_name = getpass.getuser()
+    except Exception:
+        return DEFAULT_CUSTOMER
+    return login_name if CUSTOMER_ID_PATTERN.match(login_name) else DEFAULT_CUSTOMER
+
+
+def run_menu(categories, customer_id=DEFAULT_CUSTOMER):
+    """Main program loop - keeps running until user exits"""
+    
+    # Menu options that need the catalog (it may still be loading)
+    catalog_options = ["1", "2", "3", "6", "7"]
     
-    # STEP 2: Main program loop - keeps running until user exits
     while True:
         # Show menu
         display_menu()
         
         try:
             # Get user's choice
-            user_choice = input("\nEnter your choice (1-7): ")
+            user_choice = input("\nEnter your choice (1-8): ")
+            
+            # Wait for the catalog if this option needs it
+            if user_choice in catalog_options and isinstance(categories, CatalogLoader):
+                categories = categories.result()
+                if not categories:
+                    print("Cannot run without ticket data. Exiting.")
+                    break
             
             # Handle each menu option
             if user_choice == "1":
@@ -379,28 +554,33 @@ def main():
                 
             elif user_choice == "3":
                 # Purchase a ticket
-                purchase_ticket(categories)
+                purchase_ticket(categories, customer_id)
                 
             elif user_choice == "4":
                 # View purchase history
-                view_my_purchases()
+                view_my_purchases(customer_id)
                 
             elif user_choice == "5":
                 # View statistics
                 view_purchase_stats()
                 
             elif user_choice == "6":
-                # Admin panel
+                # Admin panel (only loaded the first time it is opened)
+                from admin import admin_panel
                 admin_panel(categories)
                 
             elif user_choice == "7":
+                # Cheapest tickets for a travel pattern
+                find_cheapest_fare(categories)
+                
+            elif user_choice == "8":
                 # Exit program
                 print("Thank you for using Bus Ticket System!")
                 break
                 
             else:
                 # Invalid choice
-                print("Invalid choice! Please enter 1-7.")
+                print("Invalid choice! Please enter 1-8.")
                 
         except KeyboardInterrupt:
             # User pressed Ctrl+C
@@ -0,0 +1,389 @@
+# ============================================================================
+# METRICS - BUS TICKET SYSTEM
+# ============================================================================
+# Lightweight timers and counters for the hot paths (catalog load, search,
+# purchase save, statistics). Metrics are off by default and cost one flag
+# check per call; switch them on with the BUS_METRICS environment variable
+# or `python main.py --metrics`.
+#
+# Timings go into in-memory histograms. While metrics are on, a background
+# thread writes every histogram and counter to a local file in Prometheus
+# text format every few seconds (and once more at exit).
+#
+# A single operation can also be profiled with cProfile
+# (BUS_PROFILE=search or `python main.py --profile search`); the profile is
+# saved next to the metrics file and can be read with pstats or snakeviz.
+#
+#   BUS_METRICS=1                      on, written to data/metrics.prom
+#   BUS_METRICS=/tmp/bus.prom          on, written to that file
+#   BUS_METRICS_INTERVAL=10            seconds between dumps
+#   BUS_PROFILE=purchase               profile the 'purchase' operation
+# ============================================================================
+
+import atexit
+import bisect
+import cProfile
+import functools
+import os
+import threading
+import time
+
+DEFAULT_METRICS_FILE = 'data/metrics.prom'
+DEFAULT_INTERVAL = 10.0
+
+# Histogram bucket upper bounds in seconds (Prometheus 'le' labels)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+           0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# HELP text for the metric families this program writes
+METRIC_HELP = {
+    'bus_operation_seconds': 'Time spent in instrumented operations',
+    'bus_operation_errors_total': 'Instrumented operations that raised an exception',
+    'bus_purchases_saved_total': 'Purchase records written to the purchase log',
+    'bus_purchase_save_failures_total': 'Purchase batches that could not be saved',
+    'bus_tickets_loaded_total': 'Tickets loaded into the catalog',
+    'bus_catalog_load_failures_total': 'Catalog loads that failed',
+}
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram of durations, as Prometheus expects.
+
+    Attributes:
+        bucket_counts (list): Observations per bucket (not cumulative)
+        count (int): Number of observations
+        total (float): Sum of all observations in seconds
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty histogram.
+        """
+        self.bucket_counts = [0] * (len(BUCKETS) + 1)  # Last one is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        """
+        Record one duration.
+
+        Args:
+            seconds (float): The duration
+
+        Returns:
+            None
+        """
+        self.bucket_counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+
+class MetricsRegistry:
+    """
+    All histograms and counters, plus the optional profiler.
+
+    Attributes:
+        enabled (bool): True if metrics are being collected
+        filename (str): Where the Prometheus text file is written
+        interval (float): Seconds between periodic dumps
+        profile_operation (str): Name of the operation to profile, or None
+        histograms (dict): Operation name -> Histogram
+        counters (dict): (metric name, labels) -> value
+    """
+
+    def __init__(self):
+        """
+        Initialize a disabled registry.
+        """
+        self.enabled = False
+        self.filename = DEFAULT_METRICS_FILE
+        self.interval = DEFAULT_INTERVAL
+        self.profile_operation = None
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._profiler = None
+        self._profile_lock = threading.Lock()
+        self._dump_thread = None
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    def observe(self, operation, seconds):
+        """
+        Add a duration to an operation's histogram.
+
+        Args:
+            operation (str): Operation name
+            seconds (float): How long it took
+
+        Returns:
+            None
+        """
+        with self._lock:
+            histogram = self.histograms.get(operation)
+            if histogram is None:
+                histogram = self.histograms[operation] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name, amount=1, **labels):
+        """
+        Add to a counter.
+
+        Args:
+            name (str): Metric name, e.g. 'bus_purchases_saved_total'
+            amount (int, optional): Amount to add. Defaults to 1.
+            **labels: Prometheus labels, e.g. operation='search'
+
+        Returns:
+            None
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    # ------------------------------------------------------------------
+    # Exporting
+    # ------------------------------------------------------------------
+    def render(self):
+        """
+        Render every metric in Prometheus text exposition format.
+
+        Returns:
+            str: The metrics text
+        """
+        with self._lock:
+            histograms = {name: (list(h.bucket_counts), h.count, h.total)
+                          for name, h in self.histograms.items()}
+            counters = dict(self.counters)
+
+        lines = []
+        if histograms:
+            family = 'bus_operation_seconds'
+            lines.append(f'# HELP {family} {METRIC_HELP[family]}')
+            lines.append(f'# TYPE {family} histogram')
+            for operation in sorted(histograms):
+                bucket_counts, count, total = histograms[operation]
+                running = 0
+                for bound, in_bucket in zip(BUCKETS, bucket_counts):
+                    running += in_bucket
+                    lines.append(f'{family}_bucket{{operation="{operation}",le="{bound}"}} {running}')
+                lines.append(f'{family}_bucket{{operation="{operation}",le="+Inf"}} {count}')
+                lines.append(f'{family}_sum{{operation="{operation}"}} {total}')
+                lines.append(f'{family}_count{{operation="{operation}"}} {count}')
+
+        written = set()
+        for (name, labels), value in sorted(counters.items()):
+            if name not in written:
+                written.add(name)
+                if name in METRIC_HELP:
+                    lines.append(f'# HELP {name} {METRIC_HELP[name]}')
+                lines.append(f'# TYPE {name} counter')
+            label_text = ','.join(f'{key}="{label}"' for key, label in labels)
+            lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def dump(self):
+        """
+        Write the metrics file (and the profile, if one is being taken).
+
+        The file is written under a temporary name and renamed, so a
+        scraper never reads half a file.
+
+        Returns:
+            bool: True if the file was written, False otherwise
+        """
+        if self._profiler is not None:
+            with self._profile_lock:
+                try:
+                    self._profiler.dump_stats(self.profile_filename())
+                except OSError as e:
+                    print(f"Warning: could not save profile: {e}")
+
+        temp_name = self.filename + '.tmp'
+        try:
+            with open(temp_name, 'w') as file:
+                file.write(self.render())
+            os.replace(temp_name, self.filename)
+            return True
+        except OSError as e:
+            print(f"Warning: could not write metrics file: {e}")
+            return False
+
+    def profile_filename(self):
+        """
+        Return where the profile of the selected operation is saved.
+
+        Returns:
+            str: e.g. 'data/profile-search.prof'
+        """
+        folder = os.path.dirname(self.filename)
+        return os.path.join(folder, f'profile-{self.profile_operation}.prof')
+
+    # ------------------------------------------------------------------
+    # Switching on
+    # ------------------------------------------------------------------
+    def enable(self, filename=None, interval=None, profile_operation=None):
+        """
+        Start collecting metrics and dumping them periodically.
+
+        Args:
+            filename (str, optional): Metrics file. Defaults to DEFAULT_METRICS_FILE.
+            interval (float, optional): Seconds between dumps. Defaults to DEFAULT_INTERVAL.
+            profile_operation (str, optional): Operation to profile. Defaults to None.
+
+        Returns:
+            None
+        """
+        self.filename = filename or self.filename
+        self.interval = interval or self.interval
+        if profile_operation:
+            self.profile_operation = profile_operation
+            self._profiler = cProfile.Profile()
+
+        if self.enabled:
+            return
+        self.enabled = True
+
+        self._dump_thread = threading.Thread(target=self._dump_loop, name='metrics-dump', daemon=True)
+        self._dump_thread.start()
+        atexit.register(self.disable)
+
+    def disable(self):
+        """
+        Stop collecting, stop the dump thread and write a final dump.
+
+        Returns:
+            None
+        """
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop.set()
+        self.dump()
+
+    def _dump_loop(self):
+        """Write the metrics file every interval until disabled"""
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+    def run_profiled(self, function, args, kwargs):
+        """
+        Run a function under the profiler.
+
+        Only one call is profiled at a time (cProfile follows a single
+        thread); concurrent calls just run normally.
+
+        Args:
+            function: The function to run
+            args (tuple): Positional arguments
+            kwargs (dict): Keyword arguments
+
+        Returns:
+            Whatever the function returns
+        """
+        if not self._profile_lock.acquire(blocking=False):
+            return function(*args, **kwargs)
+        try:
+            return self._profiler.runcall(function, *args, **kwargs)
+        finally:
+            self._profile_lock.release()
+
+
+# The one registry used by the whole program
+registry = MetricsRegistry()
+
+
+def timed(operation):
+    """
+    Decorator that times a function as the named operation.
+
+    When metrics are off the only cost is one flag check. When the
+    operation is the one selected for profiling, calls run under cProfile.
+    Exceptions are counted in bus_operation_errors_total and re-raised.
+
+    Args:
+        operation (str): Operation name used in the metrics
+
+    Returns:
+        function: The decorator
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return function(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                if registry.profile_operation == operation:
+                    return registry.run_profiled(function, args, kwargs)
+                return function(*args, **kwargs)
+            except Exception:
+                registry.count('bus_operation_errors_total', operation=operation)
+                raise
+            finally:
+                registry.observe(operation, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def count(name, amount=1, **labels):
+    """
+    Add to a counter (does nothing when metrics are off).
+
+    Args:
+        name (str): Metric name
+        amount (int, optional): Amount to add. Defaults to 1.
+        **labels: Prometheus labels
+
+    Returns:
+        None
+    """
+    if registry.enabled:
+        registry.count(name, amount, **labels)
+
+
+def enable(filename=None, interval=None, profile_operation=None):
+    """
+    Switch metrics on (see MetricsRegistry.enable).
+
+    Args:
+        filename (str, optional): Metrics file. Defaults to DEFAULT_METRICS_FILE.
+        interval (float, optional): Seconds between dumps. Defaults to DEFAULT_INTERVAL.
+        profile_operation (str, optional): Operation to profile. Defaults to None.
+
+    Returns:
+        None
+    """
+    registry.enable(filename, interval, profile_operation)
+
+
+def enable_from_environment():
+    """
+    Switch metrics on if BUS_METRICS or BUS_PROFILE is set.
+
+    Returns:
+        bool: True if metrics were switched on
+    """
+    setting = os.environ.get('BUS_METRICS', '').strip()
+    profile_operation = os.environ.get('BUS_PROFILE', '').strip() or None
+    if setting.lower() in ('', '0', 'no', 'off', 'false') and not profile_operation:
+        return False
+
+    filename = None
+    if setting and setting.lower() not in ('1', 'yes', 'on', 'true'):
+        filename = setting
+    try:
+        interval = float(os.environ.get('BUS_METRICS_INTERVAL', DEFAULT_INTERVAL))
+    except ValueError:
+        interval = DEFAULT_INTERVAL
+
+    enable(filename, interval, profile_operation)
+    return True
+
+
+enable_from_environment()
@@ -0,0 +1,296 @@
+# ============================================================================
+# PRE-FORK WORKER POOL - BUS TICKET SYSTEM
+# ============================================================================
+# A single Python process can only use one CPU core, so this file runs the
+# HTTP service (service.py) in several worker processes. The catalog is
+# loaded once in the parent and then the workers are forked, so they all
+# share the parent's copy of the catalog (copy-on-write) instead of each
+# loading their own.
+#
+# Every worker sends its purchases to the parent, which is the only process
+# that writes the purchase log. The parent group-commits purchases from
+# all workers with the same PurchaseWriter the single-process service uses.
+#
+# Run: python service.py --port 8080 --workers 4
+# ============================================================================
+
+import asyncio
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+
+from catalog_journal import open_catalog
+from service import TicketService, PurchaseWriter
+
+
+class RemotePurchaseWriter:
+    """
+    Purchase writer used inside a worker process.
+
+    Has the same interface as PurchaseWriter (start, stop, submit,
+    get_stats) but forwards every call over a socket to the writer in the
+    parent process. Requests are sent as one JSON object per line and
+    matched to their replies by id, so many requests can be in flight at
+    once on the same socket.
+    """
+
+    def __init__(self):
+        """
+        Initialize a writer that is not yet connected.
+        """
+        self.sock = None
+        self._reader = None
+        self._writer = None
+        self._task = None
+        self._pending = {}
+        self._next_id = 0
+
+    def connect(self, sock):
+        """
+        Set the socket connected to the parent's writer.
+
+        Args:
+            sock (socket): This worker's end of the socket pair
+
+        Returns:
+            None
+        """
+        self.sock = sock
+
+    async def start(self):
+        """
+        Open the connection to the parent and start reading replies.
+
+        Returns:
+            None
+        """
+        self._reader, self._writer = await asyncio.open_unix_connection(sock=self.sock)
+        self._task = asyncio.get_running_loop().create_task(self._read_replies())
+
+    async def stop(self):
+        """
+        Close the connection to the parent.
+
+        Returns:
+            None
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._writer is not None:
+            self._writer.close()
+
+    async def submit(self, purchase_lines):
+        """
+        Ask the parent to save purchase lines and wait for the result.
+
+        Args:
+            purchase_lines (list): Strings in Purchase.to_file_format layout
+
+        Returns:
+            bool: True if the lines were saved, False otherwise
+        """
+        return await self._call({'op': 'save', 'lines': purchase_lines})
+
+    async def get_stats(self):
+        """
+        Ask the parent for the current sales statistics.
+
+        Returns:
+            dict: Statistics as returned by SalesStats.to_dict()
+        """
+        return await self._call({'op': 'stats'})
+
+    async def _call(self, message):
+        """
+        Send one request to the parent and wait for its reply.
+
+        Args:
+            message (dict): The request (an 'id' is added)
+
+        Returns:
+            The 'result' field of the reply
+        """
+        self._next_id += 1
+        message['id'] = self._next_id
+        done = asyncio.get_running_loop().create_future()
+        self._pending[self._next_id] = done
+
+        self._writer.write(json.dumps(message).encode('utf-8') + b'\n')
+        await self._writer.drain()
+        return await done
+
+    async def _read_replies(self):
+        """
+        Deliver replies from the parent to the waiting requests.
+
+        Returns:
+            None
+        """
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                # Parent went away - fail everything still waiting
+                for done in self._pending.values():
+                    if not done.done():
+                        done.set_result(False)
+                self._pending.clear()
+                return
+            reply = json.loads(line)
+            done = self._pending.pop(reply['id'], None)
+            if done is not None and not done.done():
+                done.set_result(reply['result'])
+
+
+async def serve_writer(worker_sockets, purchases_file):
+    """
+    Run the single purchase writer for all workers (parent process).
+
+    Each worker's requests are handled as separate tasks, so purchases
+    arriving from different workers at the same moment end up in the same
+    group-committed batch.
+
+    Args:
+        worker_sockets (list): Parent ends of the worker socket pairs
+        purchases_file (str): Path to the purchases file
+
+    Returns:
+        None
+    """
+    writer = PurchaseWriter(purchases_file)
+    await writer.start()
+
+    async def handle_request(message, stream_writer):
+        if message.get('op') == 'stats':
+            result = await writer.get_stats()
+        else:
+            result = await writer.submit(message.get('lines', []))
+        stream_writer.write(json.dumps({'id': message['id'], 'result': result}).encode('utf-8') + b'\n')
+
+    async def serve_worker(sock):
+        reader, stream_writer = await asyncio.open_unix_connection(sock=sock)
+        tasks = set()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break  # Worker exited
+            task = asyncio.get_running_loop().create_task(
+                handle_request(json.loads(line), stream_writer))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        stream_writer.close()
+
+    try:
+        await asyncio.gather(*(serve_worker(sock) for sock in worker_sockets))
+    finally:
+        await writer.stop()
+
+
+def run_worker(service, listen_socket, writer_socket):
+    """
+    Body of one worker process: serve HTTP until told to stop.
+
+    Args:
+        service (TicketService): Service built in the parent before forking
+        listen_socket (socket): The shared listening socket
+        writer_socket (socket): This worker's end of its socket pair
+
+    Returns:
+        None
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The parent handles Ctrl+C
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    service.writer.connect(writer_socket)
+    try:
+        asyncio.run(service.serve(sock=listen_socket))
+    except Exception as e:
+        print(f"Worker {os.getpid()} stopped: {e}")
+
+
+def _stop_on_sigterm(signum, frame):
+    """Treat SIGTERM in the parent like Ctrl+C so the workers are cleaned up"""
+    raise KeyboardInterrupt
+
+
+def run_prefork(csv_file, purchases_file, host='127.0.0.1', port=8080, workers=None):
+    """
+    Load the catalog once, fork worker processes and run the writer.
+
+    Args:
+        csv_file (str): Path to the ticket data file
+        purchases_file (str): Path to the purchases file
+        host (str, optional): Interface to listen on. Defaults to '127.0.0.1'.
+        port (int, optional): Port to listen on. Defaults to 8080.
+        workers (int, optional): Number of worker processes. Defaults to
+                                 the number of CPU cores.
+
+    Returns:
+        None
+    """
+    if not hasattr(os, 'fork'):
+        print("Pre-fork mode needs os.fork() (Linux/macOS). Use --workers 1 instead.")
+        return
+
+    workers = workers or os.cpu_count() or 1
+
+    # STEP 1: Load the catalog and build the service once, in the parent
+    print("Loading ticket data...")
+    categories = open_catalog(csv_file)
+    if not categories:
+        print("Cannot run without ticket data. Exiting.")
+        return
+    categories.build_ticket_index()  # Build it once here, not in every worker
+    service = TicketService(categories, purchases_file, writer=RemotePurchaseWriter())
+
+    # STEP 2: Open the listening socket that all workers will accept on
+    listen_socket = socket.create_server((host, port), backlog=4096)
+    listen_socket.setblocking(False)
+
+    # Move everything loaded so far out of the garbage collector's view.
+    # Otherwise a collection in a worker would touch (and so copy) every
+    # page holding the shared catalog.
+    gc.collect()
+    gc.freeze()
+    sys.stdout.flush()  # Don't let the workers inherit unprinted output
+
+    # STEP 3: Fork the workers, each with a socket pair back to the writer
+    worker_pids = []
+    parent_sockets = []
+    for _ in range(workers):
+        parent_end, child_end = socket.socketpair()
+        pid = os.fork()
+        if pid == 0:
+            parent_end.close()
+            for sock in parent_sockets:
+                sock.close()
+            run_worker(service, listen_socket, child_end)
+            os._exit(0)
+        child_end.close()
+        parent_sockets.append(parent_end)
+        worker_pids.append(pid)
+
+    listen_socket.close()  # Only the workers accept connections
+    print(f"Serving on http://{host}:{port} with {workers} workers (Ctrl+C to stop)")
+
+    # STEP 4: The parent is the single purchase writer
+    signal.signal(signal.SIGTERM, _stop_on_sigterm)
+    try:
+        asyncio.run(serve_writer(parent_sockets, purchases_file))
+    except KeyboardInterrupt:
+        print("\nService stopped. Goodbye!")
+    finally:
+        for pid in worker_pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in worker_pids:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
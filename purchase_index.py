@@ -0,0 +1,278 @@
+# ============================================================================
+# PURCHASE INDEX - BUS TICKET SYSTEM
+# ============================================================================
+# This file answers time-range questions such as "purchases between 08:00
+# and 09:00 yesterday" without reading the whole purchase log. Purchases
+# are appended in time order, so a sparse index of (timestamp, byte offset)
+# pairs lets us binary-search for the start of a range and then stream
+# only the records inside it.
+# ============================================================================
+
+import bisect
+import json
+import os
+from datetime import datetime
+
+from purchase_log import check_record
+from ticket_classes import Purchase
+
+# One index entry is kept for every INDEX_EVERY records in the log
+INDEX_EVERY = 1000
+
+
+class TimestampIndex:
+    """
+    Sparse timestamp index over an append-only purchase log.
+
+    Stores the timestamp and byte offset of every Nth record. The index is
+    saved next to the log and only the newly appended part of the log is
+    scanned when it is brought up to date.
+
+    Attributes:
+        filename (str): Path to the purchase log
+        every (int): Number of records between index entries
+        timestamps (list): Timestamp string of each indexed record
+        offsets (list): Byte offset of each indexed record
+        scanned_offset (int): How far into the log has been indexed
+        records_since_entry (int): Records scanned since the last entry
+    """
+
+    def __init__(self, filename, every=INDEX_EVERY):
+        """
+        Initialize an empty index for a purchase log.
+
+        Args:
+            filename (str): Path to the purchase log
+            every (int, optional): Records between entries. Defaults to INDEX_EVERY.
+        """
+        self.filename = filename
+        self.every = every
+        self.timestamps = []
+        self.offsets = []
+        self.scanned_offset = 0
+        self.records_since_entry = 0
+
+    def index_filename(self):
+        """
+        Return the path of the saved index file.
+
+        Returns:
+            str: The log filename with '.tsidx' appended
+        """
+        return self.filename + '.tsidx'
+
+    def load(self):
+        """
+        Load a previously saved index, if there is one.
+
+        A saved index that doesn't match the current log (different
+        spacing, or a log that has shrunk since) is discarded.
+
+        Returns:
+            None
+        """
+        try:
+            with open(self.index_filename(), 'r') as file:
+                saved = json.load(file)
+        except (OSError, ValueError):
+            return
+
+        try:
+            log_size = os.path.getsize(self.filename)
+        except OSError:
+            log_size = 0
+
+        if saved.get('every') != self.every or saved.get('scanned_offset', 0) > log_size:
+            return  # Stale index - it will be rebuilt
+
+        self.timestamps = saved['timestamps']
+        self.offsets = saved['offsets']
+        self.scanned_offset = saved['scanned_offset']
+        self.records_since_entry = saved['records_since_entry']
+
+    def save(self):
+        """
+        Save the index next to the purchase log.
+
+        Returns:
+            None
+        """
+        temp_name = self.index_filename() + '.tmp'
+        try:
+            with open(temp_name, 'w') as file:
+                json.dump({
+                    'every': self.every,
+                    'timestamps': self.timestamps,
+                    'offsets': self.offsets,
+                    'scanned_offset': self.scanned_offset,
+                    'records_since_entry': self.records_since_entry
+                }, file)
+            os.replace(temp_name, self.index_filename())
+        except OSError as e:
+            print(f"Warning: could not save timestamp index: {e}")
+
+    def update(self):
+        """
+        Index any records appended to the log since the last update.
+
+        Only the part of the log after scanned_offset is read. A torn
+        last line (no newline yet) is left for the next update.
+
+        Returns:
+            bool: True if new records were indexed, False otherwise
+        """
+        try:
+            file = open(self.filename, 'rb')
+        except FileNotFoundError:
+            return False
+
+        changed = False
+        with file:
+            file.seek(self.scanned_offset)
+            offset = self.scanned_offset
+
+            for raw_line in file:
+                if not raw_line.endswith(b'\n'):
+                    break  # Incomplete record - wait until it is finished
+
+                if self.records_since_entry % self.every == 0:
+                    timestamp = _record_timestamp(raw_line)
+                    if timestamp is not None:
+                        self.timestamps.append(timestamp)
+                        self.offsets.append(offset)
+                        self.records_since_entry = 0
+
+                self.records_since_entry += 1
+                offset += len(raw_line)
+                changed = True
+
+            self.scanned_offset = offset
+
+        return changed
+
+    def find_start_offset(self, start):
+        """
+        Find where to start reading for records at or after a timestamp.
+
+        Binary-searches the sparse index for the last entry strictly
+        before the start time. Reading from there cannot miss any record
+        inside the range.
+
+        Args:
+            start (str): Timestamp string in str(datetime) format
+
+        Returns:
+            int: Byte offset to start streaming from
+        """
+        position = bisect.bisect_left(self.timestamps, start) - 1
+        if position < 0:
+            return 0
+        return self.offsets[position]
+
+
+def _record_timestamp(raw_line):
+    """
+    Extract the timestamp field from a raw log line.
+
+    Args:
+        raw_line (bytes): One line of the purchase log
+
+    Returns:
+        str: The timestamp string, or None if the line is unreadable
+    """
+    try:
+        return raw_line.decode('utf-8').split('|', 1)[0].strip() or None
+    except UnicodeDecodeError:
+        return None
+
+
+def _as_timestamp_text(value):
+    """
+    Convert a datetime or string to the format used in the log.
+
+    Args:
+        value (datetime or str): A point in time
+
+    Returns:
+        str: The time in str(datetime) format, e.g. '2026-01-10 08:00:00'
+    """
+    if isinstance(value, datetime):
+        return str(value)
+    return str(value).strip().replace('T', ' ')
+
+
+def get_timestamp_index(filename='data/purchases.txt'):
+    """
+    Load the sparse timestamp index for a log and bring it up to date.
+
+    Args:
+        filename (str, optional): Path to the purchases file. Defaults to 'data/purchases.txt'.
+
+    Returns:
+        TimestampIndex: An index covering every complete record in the log
+    """
+    index = TimestampIndex(filename)
+    index.load()
+    if index.update():
+        index.save()
+    return index
+
+
+def purchases_between(start, end, filename='data/purchases.txt'):
+    """
+    Stream the purchases made in a time range.
+
+    Uses the sparse timestamp index to jump close to the start of the
+    range, then reads forward until the first record at or after the end.
+    Damaged records are skipped, as in every other reader of the log.
+    Records are yielded one at a time so large ranges never need to be
+    held in memory.
+
+    Args:
+        start (datetime or str): Start of the range (inclusive)
+        end (datetime or str): End of the range (exclusive)
+        filename (str, optional): Path to the purchases file. Defaults to 'data/purchases.txt'.
+
+    Yields:
+        dict: Purchase dictionaries as returned by Purchase.from_file_format
+    """
+    start_text = _as_timestamp_text(start)
+    end_text = _as_timestamp_text(end)
+    if start_text >= end_text:
+        return
+
+    index = get_timestamp_index(filename)
+
+    try:
+        file = open(filename, 'rb')
+    except FileNotFoundError:
+        return
+
+    with file:
+        file.seek(index.find_start_offset(start_text))
+
+        for raw_line in file:
+            if not check_record(raw_line):
+                continue  # Skip damaged purchases (before trusting their timestamp)
+            timestamp = _record_timestamp(raw_line)
+            if timestamp is None:
+                continue  # Skip invalid purchases
+            if timestamp >= end_text:
+                break  # The log is in time order - nothing later can match
+            if timestamp < start_text:
+                continue
+
+            try:
+                yield Purchase.from_file_format(raw_line.decode('utf-8'))
+            except (IndexError, UnicodeDecodeError):
+                continue  # Skip invalid purchases
+
+
+# Test code
+if __name__ == "__main__":
+    from datetime import timedelta
+
+    now = datetime.now()
+    one_hour_ago = now - timedelta(hours=1)
+    recent = list(purchases_between(one_hour_ago, now))
+    print(f"Purchases in the last hour: {len(recent)}")
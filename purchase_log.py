@@ -0,0 +1,462 @@
+# ============================================================================
+# PURCHASE LOG FRAMING AND RECOVERY - BUS TICKET SYSTEM
+# ============================================================================
+# Protects the purchase log against torn and damaged records.
+#
+# Every record is written with a frame at the end of the line:
+#
+#   2026-01-10 08:00:00|Day Tickets|Adult Day|1|4.50|a1b2c3d4e5f6|#52:1c291ca3
+#
+# '#52' is the length of the record in bytes (everything before '|#') and
+# '1c291ca3' its CRC-32. Lines written before framing was added have no
+# frame and are still read (they are only checked for the right fields).
+# Readers that split on '|' still find the usual fields first.
+#
+# recover_log() runs when a program that writes the log starts. It only
+# looks at the end of the file: a last record cut off by a crash (no
+# newline, or a frame that doesn't match) is truncated away.
+#
+# Checking every record of a big log on every read would be slow, so the
+# complete part of the log is checked once, in segments (in worker
+# processes for big logs), and the result is saved next to the log
+# ('.verified'): how far the log has been checked and where any damaged
+# records are. Readers then take the checked part as it is and only new
+# records are ever checked.
+#
+# Run: python purchase_log.py data/purchases.txt --workers 4
+# ============================================================================
+
+import argparse
+import json
+import os
+import time
+import zlib
+
+# Marks the start of the frame at the end of a record
+FRAME_MARK = '|#'
+
+# Logs at least this big are checked by worker processes, in segments of SEGMENT_BYTES
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+SEGMENT_BYTES = 4 * 1024 * 1024
+
+# How much of the end of the log recover_log() reads
+RECOVERY_TAIL_BYTES = 64 * 1024
+
+# Files kept next to the log that remember how far into it they have read
+# (timestamp index, best-seller sketches, customer index). recover_log()
+# removes them when it truncates a record they may have read, and they
+# are rebuilt the next time they are used.
+OFFSET_SIDECAR_SUFFIXES = ['.tsidx', '.topn', '.custidx']
+
+
+def frame_record(line):
+    """
+    Add the length and checksum frame to a purchase record.
+
+    Args:
+        line (str): Record in Purchase.to_file_format layout (no newline)
+
+    Returns:
+        str: The record with '|#<length>:<crc32>' appended
+    """
+    payload = str(line).encode('utf-8')
+    return f"{line}{FRAME_MARK}{len(payload)}:{zlib.crc32(payload):08x}"
+
+
+def strip_frame(line):
+    """
+    Remove the frame from a record, if it has one (the frame isn't checked).
+
+    Args:
+        line (str): A line of the log
+
+    Returns:
+        str: The record without its frame or newline
+    """
+    line = line.rstrip('\r\n')
+    cut = line.rfind(FRAME_MARK)
+    return line if cut == -1 else line[:cut]
+
+
+def check_record(raw_line):
+    """
+    Check one line of the log.
+
+    Framed records must have the right length and checksum. Unframed
+    (older) records must have at least the five fields every record has,
+    with a whole-number quantity and a numeric total.
+
+    Args:
+        raw_line (bytes): The line, with or without its newline
+
+    Returns:
+        bool: True if the record is good
+    """
+    body = raw_line.rstrip(b'\r\n')
+    cut = body.rfind(FRAME_MARK.encode())
+    if cut != -1:
+        payload = body[:cut]
+        length, _, checksum = body[cut + len(FRAME_MARK):].partition(b':')
+        try:
+            return int(length) == len(payload) and int(checksum, 16) == zlib.crc32(payload)
+        except ValueError:
+            return False
+
+    try:
+        parts = body.decode('utf-8').split('|')
+        int(parts[3])
+        float(parts[4])
+    except (UnicodeDecodeError, IndexError, ValueError):
+        return False
+    return True
+
+
+def _split_lines(data):
+    """Split bytes into lines the way reading the file does (only at '\\n', kept)"""
+    lines = [piece + b'\n' for piece in data.split(b'\n')]
+    lines[-1] = lines[-1][:-1]
+    if not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def check_segment(filename, start, end):
+    """
+    Check every record in part of the log (run in a worker process for big logs).
+
+    Args:
+        filename (str): Path to the log
+        start (int): Byte offset of the first record
+        end (int): Byte offset just after the last record's newline
+
+    Returns:
+        list: [offset, length] of every damaged record
+    """
+    damaged = []
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+    offset = start
+    for raw_line in _split_lines(data):
+        if not check_record(raw_line):
+            damaged.append([offset, len(raw_line)])
+        offset += len(raw_line)
+    return damaged
+
+
+def plan_segments(filename, start, end, segment_bytes):
+    """Cut [start, end) into segments that end just after a newline"""
+    segments = []
+    with open(filename, 'rb') as file:
+        while start < end:
+            cut = min(start + segment_bytes, end)
+            if cut < end:
+                file.seek(cut)
+                cut += len(file.readline())
+            segments.append((start, min(cut, end)))
+            start = cut
+    return segments
+
+
+def head_checksum(filename, length):
+    """
+    CRC-32 of the start of a log, to tell a replaced log from an appended one.
+
+    Args:
+        filename (str): Path to the log
+        length (int): How much of the log a saved result covers (at most 4 KB is read)
+
+    Returns:
+        int: The checksum (0 if the log can't be read)
+    """
+    try:
+        with open(filename, 'rb') as file:
+            return zlib.crc32(file.read(min(length, 4096)))
+    except OSError:
+        return 0
+
+
+class VerifiedLog:
+    """
+    How much of a purchase log has been checked, and what was damaged.
+
+    Attributes:
+        filename (str): Path to the purchase log
+        verified_offset (int): Every record before this offset has been checked
+        damaged (list): [offset, length] of each damaged record found
+    """
+
+    def __init__(self, filename):
+        """
+        Initialize for a log that hasn't been checked yet.
+
+        Args:
+            filename (str): Path to the purchase log
+        """
+        self.filename = filename
+        self.verified_offset = 0
+        self.damaged = []
+        self.head_checksum = 0
+
+    def cache_filename(self):
+        """
+        Return the path of the saved check results.
+
+        Returns:
+            str: The log filename with '.verified' appended
+        """
+        return self.filename + '.verified'
+
+    def load(self):
+        """
+        Load saved check results, unless the log has shrunk or been replaced since.
+
+        Returns:
+            None
+        """
+        try:
+            with open(self.cache_filename(), 'r') as file:
+                saved = json.load(file)
+        except (OSError, ValueError):
+            return
+
+        try:
+            log_size = os.path.getsize(self.filename)
+        except OSError:
+            log_size = 0
+
+        offset = saved.get('verified_offset', 0)
+        if offset > log_size or saved.get('head_checksum') != head_checksum(self.filename, offset):
+            return  # Stale results - the log will be checked again
+
+        self.verified_offset = offset
+        self.damaged = saved.get('damaged', [])
+        self.head_checksum = saved['head_checksum']
+
+    def save(self):
+        """
+        Save the check results next to the log.
+
+        Returns:
+            None
+        """
+        temp_name = self.cache_filename() + '.tmp'
+        try:
+            with open(temp_name, 'w') as file:
+                json.dump({'verified_offset': self.verified_offset,
+                           'head_checksum': self.head_checksum,
+                           'damaged': self.damaged}, file)
+            os.replace(temp_name, self.cache_filename())
+        except OSError as e:
+            print(f"Warning: could not save purchase log check results: {e}")
+
+    def update(self, workers=None):
+        """
+        Check any complete records appended since the last update.
+
+        Args:
+            workers (int, optional): Worker processes. Defaults to one per
+                                     CPU when there are at least
+                                     PARALLEL_MIN_BYTES to check, otherwise none.
+
+        Returns:
+            bool: True if new records were checked
+        """
+        try:
+            with open(self.filename, 'rb') as file:
+                file.seek(0, os.SEEK_END)
+                size = file.tell()
+                # Only complete records (up to the last newline) are checked
+                end = size
+                while end > self.verified_offset:
+                    step = min(RECOVERY_TAIL_BYTES, end - self.verified_offset)
+                    file.seek(end - step)
+                    newline = file.read(step).rfind(b'\n')
+                    if newline != -1:
+                        end = end - step + newline + 1
+                        break
+                    end -= step
+        except FileNotFoundError:
+            return False
+
+        if end <= self.verified_offset:
+            return False
+
+        segments = plan_segments(self.filename, self.verified_offset, end, SEGMENT_BYTES)
+        if workers is None:
+            workers = (os.cpu_count() or 1) if end - self.verified_offset >= PARALLEL_MIN_BYTES else 0
+        if workers > 1 and len(segments) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=min(workers, len(segments))) as pool:
+                results = pool.map(check_segment, [self.filename] * len(segments),
+                                   *zip(*segments))
+                for damaged in results:
+                    self.damaged.extend(damaged)
+        else:
+            for start, stop in segments:
+                self.damaged.extend(check_segment(self.filename, start, stop))
+
+        if self.verified_offset < 4096:
+            self.head_checksum = head_checksum(self.filename, end)
+        self.verified_offset = end
+        return True
+
+    def truncate_to(self, offset):
+        """
+        Forget everything checked at or after an offset (the log was truncated there).
+
+        Args:
+            offset (int): New end of the log
+
+        Returns:
+            None
+        """
+        self.verified_offset = min(self.verified_offset, offset)
+        self.damaged = [record for record in self.damaged if record[0] < offset]
+        self.head_checksum = head_checksum(self.filename, self.verified_offset)
+
+
+def get_verified_log(filename='data/purchases.txt', workers=None):
+    """
+    Load the check results for a log and bring them up to date.
+
+    Args:
+        filename (str, optional): Path to the purchases file. Defaults to 'data/purchases.txt'.
+        workers (int, optional): Worker processes for checking (see VerifiedLog.update)
+
+    Returns:
+        VerifiedLog: Results covering every complete record in the log
+    """
+    verified = VerifiedLog(filename)
+    verified.load()
+    if verified.update(workers):
+        verified.save()
+    return verified
+
+
+def read_records(filename='data/purchases.txt'):
+    """
+    Yield every good record in the log, without frames.
+
+    The log is checked first (only the part not checked before), so the
+    records themselves are not checked again here: damaged records are
+    skipped by offset and a torn last record is never reached.
+
+    Args:
+        filename (str, optional): Path to the purchases file. Defaults to 'data/purchases.txt'.
+
+    Yields:
+        str: Records in Purchase.to_file_format layout
+
+    Raises:
+        FileNotFoundError: If the log doesn't exist
+    """
+    verified = get_verified_log(filename)
+    damaged = {offset for offset, _ in verified.damaged}
+    with open(filename, 'rb') as file:
+        offset = 0
+        for raw_line in file:
+            if offset >= verified.verified_offset:
+                break
+            if offset not in damaged:
+                record = strip_frame(raw_line.decode('utf-8', 'replace')).strip()
+                if record:
+                    yield record
+            offset += len(raw_line)
+
+
+def recover_log(filename='data/purchases.txt'):
+    """
+    Truncate a torn or damaged record from the end of the log.
+
+    Only the end of the log is read, so this is quick however big the log
+    is. Call it when a program that writes the log starts, before it
+    writes anything.
+
+    A damaged record that was complete (had its newline) may already have
+    been read by the files next to the log, so the '.verified' results
+    are cut back to the new end and the OFFSET_SIDECAR_SUFFIXES files are
+    removed; otherwise they would carry on from an offset past the end
+    and misread the next record appended.
+
+    Args:
+        filename (str, optional): Path to the purchases file. Defaults to 'data/purchases.txt'.
+
+    Returns:
+        int: Number of bytes removed (0 if the log was fine)
+    """
+    try:
+        with open(filename, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            size = file.tell()
+            tail_start = max(0, size - RECOVERY_TAIL_BYTES)
+            file.seek(tail_start)
+            tail = file.read()
+    except FileNotFoundError:
+        return 0
+
+    # Drop anything after the last newline, then damaged records at the end
+    lines = _split_lines(tail)
+    if tail_start > 0 and lines:
+        lines = lines[1:]  # May be the second half of a record
+    end = size
+    dropped_complete = False
+    while lines and (not lines[-1].endswith(b'\n') or not check_record(lines[-1])):
+        dropped_complete = dropped_complete or lines[-1].endswith(b'\n')
+        end -= len(lines.pop())
+
+    if end == size:
+        return 0
+
+    # Load the check results while they still match the log: once it is
+    # truncated they look stale, and would be trusted again as soon as
+    # the log grows back past their offset
+    verified = VerifiedLog(filename)
+    verified.load()
+
+    with open(filename, 'r+b') as file:
+        file.truncate(end)
+        os.fsync(file.fileno())
+
+    if verified.verified_offset > end:
+        verified.truncate_to(end)
+        verified.save()
+    elif not verified.verified_offset and os.path.exists(verified.cache_filename()):
+        os.remove(verified.cache_filename())  # Results that couldn't be used anyway
+    if dropped_complete:
+        for suffix in OFFSET_SIDECAR_SUFFIXES:
+            if os.path.exists(filename + suffix):
+                os.remove(filename + suffix)
+    return size - end
+
+
+def main():
+    """Recover and check a purchase log from the command line"""
+    parser = argparse.ArgumentParser(description="Recover and check a purchase log")
+    parser.add_argument('log', nargs='?', default='data/purchases.txt', help="purchase log")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per CPU for big logs)")
+    parser.add_argument('--recheck', action='store_true', help="ignore saved results and check the whole log")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        print(f"Error: {args.log} not found.")
+        return
+    removed = recover_log(args.log)
+    if removed:
+        print(f"Removed {removed} bytes of an unfinished record from the end of the log")
+    if args.recheck and os.path.exists(args.log + '.verified'):
+        os.remove(args.log + '.verified')
+
+    start = time.perf_counter()
+    verified = get_verified_log(args.log, args.workers)
+    seconds = time.perf_counter() - start
+    print(f"{args.log}: {verified.verified_offset:,} bytes checked in {seconds:.2f}s, "
+          f"{len(verified.damaged)} damaged records")
+    for offset, length in verified.damaged[:20]:
+        print(f"  damaged record at byte {offset:,} ({length} bytes)")
+    if len(verified.damaged) > 20:
+        print(f"  ... and {len(verified.damaged) - 20} more")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,624 @@
+# ============================================================================
+# SESSION REPLAY - BUS TICKET SYSTEM
+# ============================================================================
+# Everything in main.py and admin.py is driven by input(), so this file
+# replays scripted sessions through the real menu code without a terminal.
+# A session is the list of lines a user would type, starting at the main
+# menu. Sessions can be recorded from a real run (--record) or generated
+# from the catalog (--generate), and many of them can be replayed at once,
+# one thread per session, against one shared catalog.
+#
+# The latency of every menu operation (browse, search, purchase, admin
+# edit, ...) is measured and summarised as percentiles.
+#
+# Replays run in a scratch directory holding a copy of the ticket data, so
+# they never touch the real purchase log or the admin journal.
+#
+# Run: python replay.py --generate 50 --concurrency 8
+#      python replay.py --script sessions.json
+#      python replay.py --record sessions.json   (use the program normally)
+# ============================================================================
+
+import argparse
+import builtins
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import admin
+import main as menu
+from catalog_journal import open_catalog
+
+# Menu functions that are timed, by the name used in the results.
+# Each one is looked up on its module when the session calls it, so
+# wrapping the module attribute is enough to time it.
+TIMED_OPERATIONS = {
+    'browse': (menu, 'view_categories'),
+    'search': (menu, 'search_tickets'),
+    'purchase': (menu, 'purchase_ticket'),
+    'history': (menu, 'view_my_purchases'),
+    'stats': (menu, 'view_purchase_stats'),
+    'fare_finder': (menu, 'find_cheapest_fare'),
+    'admin_login': (admin, 'admin_login'),
+    'admin_view': (admin, 'view_all_tickets'),
+    'admin_add': (admin, 'add_new_ticket'),
+    'admin_edit': (admin, 'edit_ticket_price'),
+    'admin_delete': (admin, 'delete_ticket'),
+    'admin_purchases': (admin, 'view_all_purchases'),
+    'admin_stats': (admin, 'view_system_statistics'),
+    'admin_reports': (admin, 'view_purchase_reports'),
+    'admin_time_range': (admin, 'view_purchases_by_time'),
+    'admin_live': (admin, 'view_live_dashboard'),
+    'admin_bulk': (admin, 'bulk_changes_menu'),
+}
+
+# Password typed by generated admin sessions (see admin.admin_login)
+ADMIN_PASSWORD = 'admin123'
+
+# Search words used by generated sessions
+SEARCH_WORDS = ['day', 'week', 'student', 'adult', 'child', 'month', 'single', 'zone']
+
+# State of the session running on the current thread
+_session = threading.local()
+
+# The real input(), saved before the replacement is installed
+_real_input = builtins.input
+
+
+class ScriptFinished(BaseException):
+    """
+    Raised when a session asks for more input than its script holds.
+
+    Derived from BaseException so the menu's own 'except Exception'
+    handlers don't catch it and keep prompting forever.
+    """
+
+
+class SessionOutput:
+    """
+    Stand-in for sys.stdout that sends output to the current session.
+
+    Threads without a session (e.g. the one printing the results) write to
+    the real stdout as usual.
+    """
+
+    def __init__(self, real_stdout):
+        """
+        Initialize the stand-in.
+
+        Args:
+            real_stdout: The stream to use outside a session
+        """
+        self.real_stdout = real_stdout
+
+    def _target(self):
+        """Return the stream for the current thread"""
+        return getattr(_session, 'output', None) or self.real_stdout
+
+    def write(self, text):
+        """
+        Write text to the current session's output.
+
+        Args:
+            text (str): Text to write
+
+        Returns:
+            int: Number of characters written
+        """
+        return self._target().write(text)
+
+    def flush(self):
+        """
+        Flush the current session's output.
+
+        Returns:
+            None
+        """
+        self._target().flush()
+
+
+class DiscardOutput:
+    """Output stream that throws everything away"""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class SessionResult:
+    """
+    What happened during one replayed session.
+
+    Attributes:
+        number (int): Position of the session in the script
+        timings (list): (operation name, seconds) for each timed operation
+        finished (bool): True if the session reached the exit option
+        unused_inputs (int): Lines left over when the session exited
+        elapsed (float): Wall time for the whole session in seconds
+    """
+
+    def __init__(self, number):
+        """
+        Initialize an empty result.
+
+        Args:
+            number (int): Position of the session in the script
+        """
+        self.number = number
+        self.timings = []
+        self.finished = False
+        self.unused_inputs = 0
+        self.elapsed = 0.0
+
+
+def _scripted_input(prompt=''):
+    """
+    Replacement for input() that reads from the current session's script.
+
+    Threads without a session fall through to the real input().
+
+    Args:
+        prompt (str, optional): Prompt to show. Defaults to ''.
+
+    Returns:
+        str: The next line of the script
+    """
+    inputs = getattr(_session, 'inputs', None)
+    if inputs is None:
+        return _real_input(prompt)
+
+    output = _session.output
+    output.write(prompt)
+    try:
+        line = next(inputs)
+    except StopIteration:
+        raise ScriptFinished() from None
+    output.write(line + '\n')  # Echo it like a terminal would
+    return line
+
+
+def _timed(name, function):
+    """
+    Wrap a menu function so each call is timed for the current session.
+
+    Only the outermost timed call is recorded, so an operation that calls
+    another (history -> stats) is counted once.
+
+    Args:
+        name (str): Operation name used in the results
+        function: The menu function
+
+    Returns:
+        function: The wrapped function
+    """
+    def wrapper(*args, **kwargs):
+        result = getattr(_session, 'result', None)
+        if result is None or _session.depth:
+            return function(*args, **kwargs)
+
+        _session.depth += 1
+        start = time.perf_counter()
+        try:
+            value = function(*args, **kwargs)
+        finally:
+            _session.depth -= 1
+        result.timings.append((name, time.perf_counter() - start))
+        return value
+
+    return wrapper
+
+
+@contextmanager
+def replay_hooks():
+    """
+    Install the scripted input, the per-session output and the operation
+    timers for the duration of a with block.
+
+    Yields:
+        None
+    """
+    originals = []
+    for name, (module, attribute) in TIMED_OPERATIONS.items():
+        original = getattr(module, attribute)
+        originals.append((module, attribute, original))
+        setattr(module, attribute, _timed(name, original))
+
+    real_input = builtins.input
+    real_stdout = sys.stdout
+    builtins.input = _scripted_input
+    sys.stdout = SessionOutput(real_stdout)
+    try:
+        yield
+    finally:
+        sys.stdout = real_stdout
+        builtins.input = real_input
+        for module, attribute, original in originals:
+            setattr(module, attribute, original)
+
+
+def run_session(categories, number, lines, transcript_dir=None):
+    """
+    Replay one session through the main menu, as its own customer
+    ('replay-<number>').
+
+    Must be called inside replay_hooks().
+
+    Args:
+        categories (Catalog): The shared catalog
+        number (int): Position of the session in the script
+        lines (list): Lines the user types, starting at the main menu
+        transcript_dir (str, optional): Folder to save what the session
+                                        printed. Defaults to None (discard).
+
+    Returns:
+        SessionResult: Timings and outcome of the session
+    """
+    result = SessionResult(number)
+    inputs = iter(lines)
+    output = DiscardOutput()
+    if transcript_dir:
+        output = open(os.path.join(transcript_dir, f'session-{number}.txt'), 'w')
+
+    _session.inputs = inputs
+    _session.output = output
+    _session.result = result
+    _session.depth = 0
+
+    start = time.perf_counter()
+    try:
+        menu.run_menu(categories, f'replay-{number}')
+        result.finished = True
+    except ScriptFinished:
+        pass
+    finally:
+        result.elapsed = time.perf_counter() - start
+        _session.inputs = None
+        _session.output = None
+        _session.result = None
+        if transcript_dir:
+            output.close()
+
+    result.unused_inputs = sum(1 for _ in inputs)
+    return result
+
+
+def replay_sessions(categories, sessions, concurrency=1, transcript_dir=None):
+    """
+    Replay many sessions, several at a time.
+
+    Args:
+        categories (Catalog): The shared catalog
+        sessions (list): One list of typed lines per session
+        concurrency (int, optional): Sessions running at once. Defaults to 1.
+        transcript_dir (str, optional): Folder for session transcripts. Defaults to None.
+
+    Returns:
+        tuple: (list of SessionResult, wall time in seconds)
+    """
+    start = time.perf_counter()
+    with replay_hooks():
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            futures = [pool.submit(run_session, categories, number, lines, transcript_dir)
+                       for number, lines in enumerate(sessions, 1)]
+            results = [future.result() for future in futures]
+    return results, time.perf_counter() - start
+
+
+# ============================================================================
+# GENERATING AND RECORDING SCRIPTS
+# ============================================================================
+def generate_sessions(categories, count, actions=10, admin_share=0.05, seed=None):
+    """
+    Generate customer sessions that use the real catalog.
+
+    Most actions are browsing, searching and buying. A small share are
+    admin price edits, which exercise the catalog's write path while the
+    other sessions are reading it.
+
+    Args:
+        categories (Catalog): Catalog to pick valid menu numbers from
+        count (int): Number of sessions
+        actions (int, optional): Menu actions per session. Defaults to 10.
+        admin_share (float, optional): Fraction of actions that are admin
+                                       price edits. Defaults to 0.05.
+        seed (int, optional): Random seed for a repeatable script. Defaults to None.
+
+    Returns:
+        list: One list of typed lines per session
+    """
+    rng = random.Random(seed)
+    snapshot = categories.snapshot()
+    names = snapshot.category_names()
+    prices = [[ticket.get_price() for ticket in snapshot.get_tickets(name)] for name in names]
+    if not names:
+        return []
+
+    def pick_ticket():
+        category_number = rng.randrange(len(names))
+        ticket_number = rng.randrange(max(1, len(prices[category_number])))
+        return category_number, ticket_number
+
+    sessions = []
+    for _ in range(count):
+        lines = []
+        for _ in range(actions):
+            roll = rng.random()
+            if roll < admin_share:
+                category_number, ticket_number = pick_ticket()
+                old_price = prices[category_number][ticket_number] if prices[category_number] else 1.0
+                new_price = round(old_price * rng.uniform(0.9, 1.1), 2)
+                lines += ['6', ADMIN_PASSWORD, '3', str(category_number + 1),
+                          str(ticket_number + 1), f'{new_price:.2f}', '11']
+            elif roll < 0.35:
+                lines += ['1', str(rng.randrange(len(names)) + 1)]
+            elif roll < 0.65:
+                lines += ['2', rng.choice(SEARCH_WORDS)]
+            elif roll < 0.95:
+                lines.append('3')
+                for item in range(rng.choice([1, 1, 1, 2, 3])):
+                    if item:
+                        lines.append('yes')  # Add another ticket type
+                    category_number, ticket_number = pick_ticket()
+                    lines += [str(category_number + 1), str(ticket_number + 1),
+                              str(rng.randint(1, 4))]
+                lines += ['no', 'yes']  # No more tickets, confirm
+            elif roll < 0.965:
+                lines.append('5')
+            elif roll < 0.98:
+                lines += ['4', 'no']  # Own purchase history, no statistics
+            else:
+                lines += ['7', rng.choice(['adult', 'student', 'child']), str(rng.randint(1, 60)),
+                          str(rng.randint(1, 90)), rng.choice(['yes', 'no'])]
+        lines.append('8')
+        sessions.append(lines)
+    return sessions
+
+
+def load_script(filename):
+    """
+    Load sessions from a script file.
+
+    Args:
+        filename (str): JSON file with a 'sessions' list (or a bare list)
+
+    Returns:
+        list: One list of typed lines per session
+    """
+    with open(filename, 'r') as file:
+        script = json.load(file)
+    if isinstance(script, dict):
+        script = script.get('sessions', [])
+    return [[str(line) for line in session] for session in script]
+
+
+def save_script(filename, sessions):
+    """
+    Save sessions to a script file.
+
+    Args:
+        filename (str): Path of the JSON file
+        sessions (list): One list of typed lines per session
+
+    Returns:
+        None
+    """
+    with open(filename, 'w') as file:
+        json.dump({'sessions': sessions}, file, indent=1)
+
+
+def record_session(filename, csv_file='data/bus_tickets.csv'):
+    """
+    Run the program normally and add everything typed to a script file.
+
+    Args:
+        filename (str): Script file to add the session to
+        csv_file (str, optional): Ticket data file. Defaults to 'data/bus_tickets.csv'.
+
+    Returns:
+        None
+    """
+    typed = []
+    real_input = builtins.input
+
+    def recording_input(prompt=''):
+        line = real_input(prompt)
+        typed.append(line)
+        return line
+
+    print("Loading ticket data...")
+    categories = open_catalog(csv_file)
+    if not categories:
+        print("Cannot run without ticket data. Exiting.")
+        return
+
+    builtins.input = recording_input
+    try:
+        menu.run_menu(categories)
+    except EOFError:
+        pass
+    finally:
+        builtins.input = real_input
+
+    sessions = load_script(filename) if os.path.exists(filename) else []
+    sessions.append(typed)
+    save_script(filename, sessions)
+    print(f"Recorded {len(typed)} lines to {filename} ({len(sessions)} sessions)")
+
+
+# ============================================================================
+# RESULTS
+# ============================================================================
+def percentile(sorted_values, fraction):
+    """
+    Return a percentile of already sorted values (nearest rank).
+
+    Args:
+        sorted_values (list): Values in ascending order
+        fraction (float): Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        float: The value at that percentile (0.0 if there are none)
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(results, wall_time):
+    """
+    Summarise replay results per operation.
+
+    Args:
+        results (list): SessionResult objects
+        wall_time (float): Wall time of the whole replay in seconds
+
+    Returns:
+        dict: Totals plus count/mean/p50/p95/p99/max (ms) per operation
+    """
+    by_operation = {}
+    for result in results:
+        for name, seconds in result.timings:
+            by_operation.setdefault(name, []).append(seconds * 1000)
+
+    operations = {}
+    for name, values in sorted(by_operation.items()):
+        values.sort()
+        operations[name] = {
+            'count': len(values),
+            'mean_ms': sum(values) / len(values),
+            'p50_ms': percentile(values, 0.50),
+            'p95_ms': percentile(values, 0.95),
+            'p99_ms': percentile(values, 0.99),
+            'max_ms': values[-1],
+        }
+
+    total_operations = sum(op['count'] for op in operations.values())
+    return {
+        'sessions': len(results),
+        'finished': sum(1 for result in results if result.finished),
+        'unused_inputs': sum(result.unused_inputs for result in results),
+        'operations': total_operations,
+        'wall_seconds': wall_time,
+        'operations_per_second': total_operations / wall_time if wall_time else 0.0,
+        'by_operation': operations,
+    }
+
+
+def print_summary(summary):
+    """
+    Print a replay summary as a table.
+
+    Args:
+        summary (dict): As returned by summarize()
+
+    Returns:
+        None
+    """
+    print("\n" + "="*72)
+    print("   REPLAY RESULTS")
+    print("="*72)
+    print(f"Sessions: {summary['sessions']} ({summary['finished']} reached exit)")
+    if summary['unused_inputs']:
+        print(f"Warning: {summary['unused_inputs']} scripted lines were never read")
+    print(f"Operations: {summary['operations']} in {summary['wall_seconds']:.2f}s "
+          f"({summary['operations_per_second']:.0f}/s)")
+    print(f"\n{'operation':<18}{'count':>8}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>10}")
+    for name, op in summary['by_operation'].items():
+        print(f"{name:<18}{op['count']:>8}{op['mean_ms']:>9.2f}{op['p50_ms']:>9.2f}"
+              f"{op['p95_ms']:>9.2f}{op['p99_ms']:>9.2f}{op['max_ms']:>10.2f}")
+    print("(times in milliseconds)")
+    print("="*72)
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+def main():
+    """Parse the command line and run a replay (or record a session)"""
+    parser = argparse.ArgumentParser(description="Replay scripted menu sessions")
+    parser.add_argument('--script', help="JSON file of sessions to replay")
+    parser.add_argument('--generate', type=int, default=0, help="generate this many sessions")
+    parser.add_argument('--actions', type=int, default=10, help="menu actions per generated session")
+    parser.add_argument('--admin-share', type=float, default=0.05, help="share of generated admin edits")
+    parser.add_argument('--seed', type=int, default=None, help="random seed for generated sessions")
+    parser.add_argument('--save-script', help="save the generated sessions to this file")
+    parser.add_argument('--record', help="run interactively and add the session to this file")
+    parser.add_argument('--concurrency', type=int, default=1, help="sessions replayed at once")
+    parser.add_argument('--csv', default='data/bus_tickets.csv', help="ticket data file")
+    parser.add_argument('--workdir', help="scratch folder (default: a new temporary folder)")
+    parser.add_argument('--keep', action='store_true', help="keep the scratch folder afterwards")
+    parser.add_argument('--transcripts', action='store_true', help="save what each session printed")
+    parser.add_argument('--json', help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    if args.record:
+        record_session(args.record, args.csv)
+        return
+
+    if not args.script and not args.generate:
+        parser.error("give --script, --generate or --record")
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    script_path = os.path.abspath(args.script) if args.script else None
+    save_path = os.path.abspath(args.save_script) if args.save_script else None
+    csv_path = os.path.abspath(args.csv)
+    if not os.path.exists(csv_path):
+        print(f"Error: File {args.csv} not found!")
+        return
+
+    # Work on a copy of the ticket data, in a folder of its own
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix='bus-replay-'))
+    os.makedirs(os.path.join(workdir, 'data'), exist_ok=True)
+    shutil.copyfile(csv_path, os.path.join(workdir, 'data', 'bus_tickets.csv'))
+    start_dir = os.getcwd()
+    os.chdir(workdir)
+
+    try:
+        print("Loading ticket data...")
+        categories = open_catalog('data/bus_tickets.csv')
+        if not categories:
+            print("Cannot run without ticket data. Exiting.")
+            return
+
+        if script_path:
+            sessions = load_script(script_path)
+        else:
+            sessions = generate_sessions(categories, args.generate, args.actions,
+                                         args.admin_share, args.seed)
+            if save_path:
+                save_script(save_path, sessions)
+
+        transcript_dir = None
+        if args.transcripts:
+            transcript_dir = os.path.join(workdir, 'transcripts')
+            os.makedirs(transcript_dir, exist_ok=True)
+
+        print(f"Replaying {len(sessions)} sessions, {args.concurrency} at a time...")
+        results, wall_time = replay_sessions(categories, sessions, args.concurrency, transcript_dir)
+        summary = summarize(results, wall_time)
+        print_summary(summary)
+
+        if json_path:
+            with open(json_path, 'w') as file:
+                json.dump(summary, file, indent=2)
+    finally:
+        os.chdir(start_dir)
+        if args.keep or args.transcripts:
+            print(f"Scratch folder kept: {workdir}")
+        elif not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
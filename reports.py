@@ -0,0 +1,383 @@
+# ============================================================================
+# PURCHASE REPORTS - BUS TICKET SYSTEM
+# ============================================================================
+# This file loads the purchase log into NumPy arrays and builds analytics
+# reports (revenue by hour/day/category, quantity percentiles, top tickets)
+# using vectorized group-bys instead of looping over records in Python.
+# ============================================================================
+
+import os
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional - only the reports need it
+    np = None
+
+from file_handler import load_purchases
+from ticket_classes import Purchase
+
+
+def numpy_available():
+    """
+    Check whether NumPy is installed.
+
+    Returns:
+        bool: True if the reports can be built, False otherwise
+    """
+    return np is not None
+
+
+class PurchaseArrays:
+    """
+    Column-oriented copy of the purchase log.
+
+    Each purchase record becomes one position in a set of parallel NumPy
+    arrays. Category and ticket names are dictionary-encoded so that
+    group-bys can be done with np.bincount on small integer codes.
+
+    Attributes:
+        timestamps (ndarray): Purchase times as int64 seconds since the epoch
+        category_codes (ndarray): int32 index into category_names
+        ticket_codes (ndarray): int32 index into ticket_names
+        quantities (ndarray): int64 number of tickets in each purchase
+        totals_pence (ndarray): int64 total paid for each purchase, in pence
+        category_names (list): Category name for each category code
+        ticket_names (list): Ticket (topup) name for each ticket code
+    """
+
+    def __init__(self, timestamps, category_codes, ticket_codes, quantities,
+                 totals_pence, category_names, ticket_names):
+        """
+        Initialize from already-built arrays.
+
+        Args:
+            timestamps (ndarray): int64 seconds since the epoch
+            category_codes (ndarray): int32 category codes
+            ticket_codes (ndarray): int32 ticket codes
+            quantities (ndarray): int64 quantities
+            totals_pence (ndarray): int64 totals in pence
+            category_names (list): Names for the category codes
+            ticket_names (list): Names for the ticket codes
+        """
+        self.timestamps = timestamps
+        self.category_codes = category_codes
+        self.ticket_codes = ticket_codes
+        self.quantities = quantities
+        self.totals_pence = totals_pence
+        self.category_names = list(category_names)
+        self.ticket_names = list(ticket_names)
+
+    def __len__(self):
+        """
+        Return the number of purchases held in the arrays.
+
+        Returns:
+            int: Number of purchase records
+        """
+        return len(self.timestamps)
+
+    def save(self, filename, source_size=-1, source_mtime=-1.0):
+        """
+        Save the arrays to a .npz cache file.
+
+        The size and modification time of the source log are stored
+        alongside the arrays so a stale cache can be detected.
+
+        Args:
+            filename (str): Path of the .npz file to write
+            source_size (int, optional): Size of the purchase log in bytes
+            source_mtime (float, optional): Modification time of the log
+
+        Returns:
+            None
+        """
+        # Write to a temporary name first so a crash never leaves half a cache
+        temp_name = filename + '.tmp.npz'
+        np.savez(temp_name,
+                 timestamps=self.timestamps,
+                 category_codes=self.category_codes,
+                 ticket_codes=self.ticket_codes,
+                 quantities=self.quantities,
+                 totals_pence=self.totals_pence,
+                 category_names=np.array(self.category_names, dtype=str),
+                 ticket_names=np.array(self.ticket_names, dtype=str),
+                 source=np.array([source_size, source_mtime], dtype=np.float64))
+        os.replace(temp_name, filename)
+
+    @staticmethod
+    def load(filename):
+        """
+        Load arrays previously written by save().
+
+        Args:
+            filename (str): Path of the .npz cache file
+
+        Returns:
+            tuple: (PurchaseArrays, source_size, source_mtime)
+        """
+        with np.load(filename) as data:
+            arrays = PurchaseArrays(data['timestamps'],
+                                    data['category_codes'],
+                                    data['ticket_codes'],
+                                    data['quantities'],
+                                    data['totals_pence'],
+                                    data['category_names'].tolist(),
+                                    data['ticket_names'].tolist())
+            source_size, source_mtime = data['source'].tolist()
+        return arrays, int(source_size), source_mtime
+
+
+def build_purchase_arrays(purchase_lines):
+    """
+    Convert purchase log lines into a PurchaseArrays object.
+
+    This is the only per-record Python loop in the reports. Lines that
+    cannot be parsed are skipped, just like in the statistics views.
+
+    Args:
+        purchase_lines (iterable): Lines in Purchase.to_file_format layout
+
+    Returns:
+        PurchaseArrays: Columnar copy of the valid records
+    """
+    timestamp_text = []
+    category_codes = []
+    ticket_codes = []
+    quantities = []
+    totals_pence = []
+    category_lookup = {}
+    ticket_lookup = {}
+
+    for line in purchase_lines:
+        try:
+            purchase_info = Purchase.from_file_format(line)
+            quantity = int(purchase_info['quantity'])
+            total = round(float(purchase_info['total']) * 100)
+        except (IndexError, ValueError):
+            continue  # Skip invalid purchases
+
+        # Dictionary-encode the names (first time seen gets the next code)
+        category_code = category_lookup.setdefault(purchase_info['category'],
+                                                   len(category_lookup))
+        ticket_code = ticket_lookup.setdefault(purchase_info['topup_type'],
+                                               len(ticket_lookup))
+
+        # Timestamps are written by str(datetime) - keep whole seconds only
+        timestamp_text.append(purchase_info['timestamp'][:19])
+        category_codes.append(category_code)
+        ticket_codes.append(ticket_code)
+        quantities.append(quantity)
+        totals_pence.append(total)
+
+    try:
+        timestamps = np.array(timestamp_text, dtype='datetime64[s]').astype(np.int64)
+    except ValueError:
+        # Fall back to parsing one at a time, dropping unparseable times
+        parsed = []
+        for text in timestamp_text:
+            try:
+                parsed.append(np.datetime64(text, 's').astype(np.int64))
+            except ValueError:
+                parsed.append(-1)
+        timestamps = np.array(parsed, dtype=np.int64)
+
+    arrays = PurchaseArrays(timestamps,
+                            np.array(category_codes, dtype=np.int32),
+                            np.array(ticket_codes, dtype=np.int32),
+                            np.array(quantities, dtype=np.int64),
+                            np.array(totals_pence, dtype=np.int64),
+                            sorted(category_lookup, key=category_lookup.get),
+                            sorted(ticket_lookup, key=ticket_lookup.get))
+
+    # Drop any record whose timestamp could not be parsed
+    valid = arrays.timestamps >= 0
+    if not valid.all():
+        arrays = PurchaseArrays(arrays.timestamps[valid],
+                                arrays.category_codes[valid],
+                                arrays.ticket_codes[valid],
+                                arrays.quantities[valid],
+                                arrays.totals_pence[valid],
+                                arrays.category_names,
+                                arrays.ticket_names)
+    return arrays
+
+
+def load_purchase_arrays(filename='data/purchases.txt', use_cache=True):
+    """
+    Load the purchase log as NumPy arrays, using a .npz cache if possible.
+
+    Parsing text is the slow part of a report, so the parsed arrays are
+    cached next to the log. The cache is reused for as long as the log's
+    size and modification time are unchanged.
+
+    Args:
+        filename (str, optional): Path to the purchases file. Defaults to 'data/purchases.txt'.
+        use_cache (bool, optional): Read and write the .npz cache. Defaults to True.
+
+    Returns:
+        PurchaseArrays: Columnar purchase data (empty if there is no log)
+    """
+    cache_name = filename + '.npz'
+
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        stat = None
+
+    if use_cache and stat is not None and os.path.exists(cache_name):
+        try:
+            arrays, source_size, source_mtime = PurchaseArrays.load(cache_name)
+            if source_size == stat.st_size and source_mtime == stat.st_mtime:
+                return arrays
+        except Exception:
+            pass  # A broken cache is simply rebuilt
+
+    arrays = build_purchase_arrays(load_purchases(filename) if stat else [])
+
+    if use_cache and stat is not None:
+        try:
+            arrays.save(cache_name, stat.st_size, stat.st_mtime)
+        except OSError as e:
+            print(f"Warning: could not write report cache: {e}")
+
+    return arrays
+
+
+def revenue_by_hour(arrays):
+    """
+    Total revenue for each hour of the day.
+
+    Args:
+        arrays (PurchaseArrays): Purchase data
+
+    Returns:
+        ndarray: 24 int64 values, revenue in pence for hours 00 to 23
+    """
+    hours = (arrays.timestamps // 3600) % 24
+    return np.bincount(hours, weights=arrays.totals_pence, minlength=24).astype(np.int64)
+
+
+def revenue_by_day(arrays):
+    """
+    Total revenue for each calendar day that has purchases.
+
+    Args:
+        arrays (PurchaseArrays): Purchase data
+
+    Returns:
+        tuple: (days, revenue) where days is a datetime64[D] array in
+               ascending order and revenue holds int64 pence per day
+    """
+    if len(arrays) == 0:
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.int64)
+
+    # Offset the day numbers so a plain bincount can do the group-by
+    days = arrays.timestamps // 86400
+    first_day = days.min()
+    revenue = np.bincount(days - first_day, weights=arrays.totals_pence).astype(np.int64)
+    counts = np.bincount(days - first_day)
+
+    # Keep only the days that actually had purchases
+    has_purchases = np.flatnonzero(counts)
+    unique_days = (has_purchases + first_day).astype('datetime64[D]')
+    return unique_days, revenue[has_purchases]
+
+
+def revenue_by_category(arrays):
+    """
+    Total revenue and purchase count for each category.
+
+    Args:
+        arrays (PurchaseArrays): Purchase data
+
+    Returns:
+        list: (category_name, purchase_count, revenue_pence) tuples,
+              highest revenue first
+    """
+    size = len(arrays.category_names)
+    revenue = np.bincount(arrays.category_codes, weights=arrays.totals_pence,
+                          minlength=size).astype(np.int64)
+    counts = np.bincount(arrays.category_codes, minlength=size)
+    order = np.argsort(-revenue, kind='stable')
+    return [(arrays.category_names[i], int(counts[i]), int(revenue[i])) for i in order]
+
+
+def quantity_percentiles(arrays, percentiles=(50, 90, 95, 99)):
+    """
+    Percentiles of the number of tickets bought per purchase.
+
+    Args:
+        arrays (PurchaseArrays): Purchase data
+        percentiles (tuple, optional): Percentiles to compute. Defaults to (50, 90, 95, 99).
+
+    Returns:
+        dict: Mapping of percentile to quantity, or empty dict if no data
+    """
+    if len(arrays) == 0:
+        return {}
+    if arrays.quantities.min() < 0 or arrays.quantities.max() > 1_000_000:
+        values = np.percentile(arrays.quantities, percentiles)
+        return dict(zip(percentiles, values.tolist()))
+
+    # Quantities are small whole numbers, so a histogram is much cheaper
+    # than sorting. Same linear interpolation as np.percentile.
+    cumulative = np.cumsum(np.bincount(arrays.quantities))
+    ranks = np.asarray(percentiles, dtype=np.float64) / 100 * (len(arrays) - 1)
+    lower = np.searchsorted(cumulative, np.floor(ranks), side='right')
+    upper = np.searchsorted(cumulative, np.ceil(ranks), side='right')
+    values = lower + (upper - lower) * (ranks - np.floor(ranks))
+    return dict(zip(percentiles, values.tolist()))
+
+
+def top_tickets(arrays, count=10):
+    """
+    Best-selling tickets by number of tickets sold.
+
+    Uses np.argpartition so only the top entries are fully sorted.
+
+    Args:
+        arrays (PurchaseArrays): Purchase data
+        count (int, optional): How many tickets to return. Defaults to 10.
+
+    Returns:
+        list: (ticket_name, tickets_sold, revenue_pence) tuples, best first
+    """
+    size = len(arrays.ticket_names)
+    if size == 0:
+        return []
+    sold = np.bincount(arrays.ticket_codes, weights=arrays.quantities,
+                       minlength=size).astype(np.int64)
+    revenue = np.bincount(arrays.ticket_codes, weights=arrays.totals_pence,
+                          minlength=size).astype(np.int64)
+
+    count = min(count, size)
+    top = np.argpartition(-sold, count - 1)[:count]
+    top = top[np.argsort(-sold[top], kind='stable')]
+    return [(arrays.ticket_names[i], int(sold[i]), int(revenue[i])) for i in top]
+
+
+# Test code
+if __name__ == "__main__":
+    import time
+
+    if not numpy_available():
+        print("NumPy is not installed - reports are unavailable.")
+    else:
+        # Build a large synthetic data set to time the vectorized reports
+        size = 10_000_000
+        rng = np.random.default_rng(1)
+        arrays = PurchaseArrays(np.sort(rng.integers(1_760_000_000, 1_790_000_000, size)),
+                                rng.integers(0, 7, size, dtype=np.int32),
+                                rng.integers(0, 80, size, dtype=np.int32),
+                                rng.integers(1, 6, size),
+                                rng.integers(100, 10_000, size),
+                                [f"Category {i}" for i in range(7)],
+                                [f"Ticket {i}" for i in range(80)])
+
+        start = time.perf_counter()
+        revenue_by_hour(arrays)
+        revenue_by_day(arrays)
+        revenue_by_category(arrays)
+        quantity_percentiles(arrays)
+        top_tickets(arrays)
+        print(f"All reports over {size:,} purchases: {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,616 @@
+# ============================================================================
+# HTTP SERVICE MODE - BUS TICKET SYSTEM
+# ============================================================================
+# This file runs the ticket system as a local HTTP/JSON service instead of
+# the console menu. It uses only the standard library (asyncio streams), so
+# one process can serve thousands of concurrent clients and everything
+# works offline.
+#
+# Endpoints:
+#   GET  /categories          - list categories
+#   GET  /categories/<n>      - tickets in category number n (1-based)
+#   GET  /tickets/<topup_id>  - one ticket
+#   GET  /search?q=<term>     - search tickets by name or category
+#   POST /purchase            - {"items": [{"topup_id": ..., "quantity": ...}],
+#                                "customer_id": ... (optional)}
+#   GET  /customers/<id>/purchases - one customer's purchase history
+#   GET  /stats               - purchase statistics (with live sliding-window figures)
+#
+# Run: python service.py --port 8080
+#      python service.py --port 8080 --workers 4   (pre-fork, see prefork.py)
+# ============================================================================
+
+import argparse
+import asyncio
+import json
+from collections import Counter
+from urllib.parse import urlsplit, parse_qs
+
+import live_stats
+from file_handler import load_purchases, save_purchases
+from purchase_log import recover_log
+from customer_index import purchases_for_customer
+from catalog_journal import open_catalog
+from ticket_classes import Purchase, Cart, CUSTOMER_ID_PATTERN
+from catalog import find_tickets, ticket_to_dict
+
+# Largest request body we accept (purchase requests are tiny)
+MAX_BODY_SIZE = 64 * 1024
+
+STATUS_TEXT = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable'
+}
+
+
+class PurchaseWriter:
+    """
+    Single writer that group-commits purchases from many clients.
+
+    Requests hand their purchase lines to the writer and wait for the
+    result. The writer drains everything that is waiting and saves it with
+    one save_purchases() call, so a burst of concurrent purchases costs one
+    file write instead of one per client. Because every purchase passes
+    through the writer, it also keeps the running sales statistics.
+
+    Attributes:
+        filename (str): Path to the purchases file
+        max_batch (int): Most orders written in one batch
+        stats (SalesStats): Statistics for every purchase in the log
+        live (LiveSalesStats): Sliding-window figures for recent purchases
+    """
+
+    def __init__(self, filename='data/purchases.txt', max_batch=1024):
+        """
+        Initialize the writer, recover the log after a crash and load
+        statistics from it.
+
+        Args:
+            filename (str, optional): Path to the purchases file. Defaults to 'data/purchases.txt'.
+            max_batch (int, optional): Most orders per write. Defaults to 1024.
+        """
+        self.filename = filename
+        self.max_batch = max_batch
+        removed = recover_log(filename)
+        if removed:
+            print(f"Recovered the purchase log (removed {removed} bytes of an unfinished record)")
+        self.stats = SalesStats()
+        self.stats.load_from_log(filename)
+        self.live = live_stats.track_purchases()
+        self._queue = None
+        self._task = None
+
+    async def start(self):
+        """
+        Start the background writer task.
+
+        Returns:
+            None
+        """
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """
+        Finish any queued writes and stop the writer task.
+
+        Returns:
+            None
+        """
+        if self._task is not None:
+            await self._queue.join()
+            self._task.cancel()
+            self._task = None
+
+    async def submit(self, purchase_lines):
+        """
+        Queue purchase lines for saving and wait until they are written.
+
+        Args:
+            purchase_lines (list): Strings in Purchase.to_file_format layout
+
+        Returns:
+            bool: True if the lines were saved, False otherwise
+        """
+        done = asyncio.get_running_loop().create_future()
+        await self._queue.put((purchase_lines, done))
+        return await done
+
+    async def get_stats(self):
+        """
+        Return the current sales statistics.
+
+        Returns:
+            dict: Statistics as returned by SalesStats.to_dict(), with the
+                  live figures from LiveSalesStats.to_dict() under 'live'
+        """
+        stats = self.stats.to_dict()
+        stats['live'] = self.live.to_dict()
+        return stats
+
+    async def _run(self):
+        """
+        Writer loop: collect waiting orders and save them in one batch.
+
+        Returns:
+            None
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            lines = [line for purchase_lines, _ in batch for line in purchase_lines]
+            try:
+                # File I/O runs in a thread so the event loop keeps serving
+                saved = await loop.run_in_executor(None, save_purchases, lines, self.filename)
+            except Exception as e:
+                print(f"Error saving purchase batch: {e}")
+                saved = False
+
+            if saved:
+                self.stats.add_lines(lines)
+
+            for _, done in batch:
+                if not done.done():
+                    done.set_result(saved)
+                self._queue.task_done()
+
+
+class SalesStats:
+    """
+    Running purchase statistics kept in memory.
+
+    Built once from the purchase log at startup and then updated as each
+    purchase is saved, so the stats endpoint never rescans the log.
+
+    Attributes:
+        category_counts (Counter): Number of purchases per category
+        purchase_count (int): Number of purchase records
+        tickets_sold (int): Number of tickets across all purchases
+        revenue_pence (int): Total revenue in pence
+    """
+
+    def __init__(self):
+        """
+        Initialize empty statistics.
+        """
+        self.category_counts = Counter()
+        self.purchase_count = 0
+        self.tickets_sold = 0
+        self.revenue_pence = 0
+
+    def add_record(self, category, quantity, total):
+        """
+        Add one purchase record to the statistics.
+
+        Args:
+            category (str): Category name of the purchase
+            quantity (int): Number of tickets bought
+            total (float): Total paid in pounds
+
+        Returns:
+            None
+        """
+        self.category_counts[category] += 1
+        self.purchase_count += 1
+        self.tickets_sold += quantity
+        self.revenue_pence += round(total * 100)
+
+    def load_from_log(self, filename):
+        """
+        Add every valid record in a purchase log to the statistics.
+
+        Args:
+            filename (str): Path to the purchases file
+
+        Returns:
+            None
+        """
+        self.add_lines(load_purchases(filename))
+
+    def add_lines(self, purchase_lines):
+        """
+        Add purchase records in file format to the statistics.
+
+        Args:
+            purchase_lines (iterable): Strings in Purchase.to_file_format layout
+
+        Returns:
+            None
+        """
+        for purchase_data in purchase_lines:
+            try:
+                purchase_info = Purchase.from_file_format(purchase_data)
+                self.add_record(purchase_info['category'],
+                                int(purchase_info['quantity']),
+                                float(purchase_info['total']))
+            except (IndexError, ValueError):
+                continue  # Skip invalid purchases
+
+    def to_dict(self):
+        """
+        Convert the statistics to a JSON-friendly dictionary.
+
+        Returns:
+            dict: Totals and per-category purchase counts
+        """
+        return {
+            'purchases': self.purchase_count,
+            'tickets_sold': self.tickets_sold,
+            'revenue': self.revenue_pence / 100,
+            'by_category': dict(self.category_counts.most_common())
+        }
+
+
+class TicketService:
+    """
+    HTTP/JSON front end over the in-memory category map.
+
+    Attributes:
+        categories (Catalog): The category map
+        purchases_file (str): Path to the purchases file
+        writer: The purchase writer (PurchaseWriter, or a remote writer
+                when running as a pre-fork worker)
+    """
+
+    def __init__(self, categories, purchases_file='data/purchases.txt', writer=None):
+        """
+        Initialize the service.
+
+        Args:
+            categories (Catalog): The category map
+            purchases_file (str, optional): Path to the purchases file. Defaults to 'data/purchases.txt'.
+            writer (optional): Purchase writer to use instead of a new
+                               PurchaseWriter for purchases_file
+        """
+        self.categories = categories
+        self.purchases_file = purchases_file
+        self.writer = writer if writer is not None else PurchaseWriter(purchases_file)
+
+    # ------------------------------------------------------------------
+    # Request routing
+    # ------------------------------------------------------------------
+    async def dispatch(self, method, target, body):
+        """
+        Route one request to its handler.
+
+        Args:
+            method (str): HTTP method, e.g. 'GET'
+            target (str): Request target (path and query string)
+            body (bytes): Request body
+
+        Returns:
+            tuple: (status_code, JSON-serializable payload)
+        """
+        url = urlsplit(target)
+        parts = [part for part in url.path.split('/') if part]
+        query = parse_qs(url.query)
+
+        if parts == ['categories']:
+            return self._require_get(method) or self.list_categories()
+        if len(parts) == 2 and parts[0] == 'categories':
+            return self._require_get(method) or self.category_detail(parts[1])
+        if len(parts) == 2 and parts[0] == 'tickets':
+            return self._require_get(method) or self.ticket_detail(parts[1])
+        if parts == ['search']:
+            return self._require_get(method) or self.search(query.get('q', [''])[0])
+        if parts == ['stats']:
+            return self._require_get(method) or (200, await self.writer.get_stats())
+        if len(parts) == 3 and parts[0] == 'customers' and parts[2] == 'purchases':
+            return self._require_get(method) or await self.customer_purchases(parts[1])
+        if parts == ['purchase']:
+            if method != 'POST':
+                return 405, {'error': 'Use POST for purchases'}
+            return await self.purchase(body)
+
+        return 404, {'error': f"Unknown endpoint '{url.path}'"}
+
+    @staticmethod
+    def _require_get(method):
+        """
+        Reject anything other than GET.
+
+        Args:
+            method (str): HTTP method
+
+        Returns:
+            tuple: (405, error) if the method isn't GET, otherwise None
+        """
+        if method not in ('GET', 'HEAD'):
+            return 405, {'error': 'Use GET for this endpoint'}
+        return None
+
+    # ------------------------------------------------------------------
+    # Handlers
+    # ------------------------------------------------------------------
+    def list_categories(self):
+        """
+        List every category with its number, ticket count and prices.
+
+        Returns:
+            tuple: (200, list of category dictionaries)
+        """
+        with self.categories.read_locked():
+            return 200, [{'number': number, 'name': category.name,
+                          'ticket_count': category.get_ticket_count(),
+                          'min_price': category.get_min_price(),
+                          'max_price': category.get_max_price(),
+                          'mean_price': category.get_mean_price()}
+                         for number, category in enumerate(self.categories.values(), 1)]
+
+    def category_detail(self, number_text):
+        """
+        List the tickets in one category.
+
+        Args:
+            number_text (str): Category number as shown by /categories
+
+        Returns:
+            tuple: (status_code, category dictionary or error)
+        """
+        try:
+            category_number = int(number_text) - 1
+        except ValueError:
+            return 400, {'error': 'Category number must be a number'}
+
+        with self.categories.read_locked():
+            category_list = list(self.categories.values())
+            if category_number < 0 or category_number >= len(category_list):
+                return 404, {'error': 'Invalid category!'}
+
+            category = category_list[category_number]
+            return 200, {'name': category.name,
+                         'tickets': [ticket_to_dict(ticket) for ticket in category.get_all_tickets()]}
+
+    def ticket_detail(self, topup_id):
+        """
+        Return one ticket by its topup_id.
+
+        Args:
+            topup_id (str): The ticket's topup_id
+
+        Returns:
+            tuple: (status_code, ticket dictionary or error)
+        """
+        ticket = self.categories.get_ticket(topup_id)
+        if ticket is None:
+            return 404, {'error': f"No ticket with id '{topup_id}'"}
+        return 200, ticket_to_dict(ticket)
+
+    def search(self, search_word):
+        """
+        Search tickets by name or category.
+
+        Args:
+            search_word (str): The text to look for
+
+        Returns:
+            tuple: (status_code, list of ticket dictionaries or error)
+        """
+        if not search_word.strip():
+            return 400, {'error': 'Search term cannot be empty!'}
+        return 200, [ticket_to_dict(ticket)
+                     for _, ticket in find_tickets(self.categories, search_word)]
+
+    async def purchase(self, body):
+        """
+        Buy one or more tickets as a single order.
+
+        Args:
+            body (bytes): JSON {"items": [{"topup_id": str, "quantity": int}, ...],
+                                "customer_id": str (optional)}
+
+        Returns:
+            tuple: (status_code, order dictionary or error)
+        """
+        try:
+            request = json.loads(body or b'{}')
+            items = request['items']
+            if not isinstance(items, list) or not items:
+                raise ValueError("'items' must be a non-empty list")
+            customer_id = request.get('customer_id') or ''
+            if customer_id and not (isinstance(customer_id, str) and CUSTOMER_ID_PATTERN.match(customer_id)):
+                raise ValueError("customer_id must be letters, digits and _ . @ - (at most 64)")
+
+            cart = Cart()
+            for item in items:
+                ticket = self.categories.get_ticket(item['topup_id'])
+                if ticket is None:
+                    return 404, {'error': f"No ticket with id '{item['topup_id']}'"}
+                quantity = item.get('quantity', 1)
+                # bool is a subclass of int, but JSON true/false is not a quantity
+                if isinstance(quantity, bool) or not isinstance(quantity, int):
+                    raise ValueError("quantity must be a whole number")
+                cart.add_item(ticket, quantity)
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {'error': f"Invalid purchase request: {e}"}
+
+        order = cart.checkout(customer_id)
+        if not await self.writer.submit(order.to_file_format()):
+            return 503, {'error': 'Error saving purchase!'}
+
+        return 200, {
+            'order_id': order.order_id,
+            'customer_id': customer_id,
+            'timestamp': str(order.purchases[0].timestamp),
+            'items': [{'topup_id': purchase.ticket.topup_id,
+                       'topup_type': purchase.ticket.topup_type,
+                       'quantity': purchase.quantity,
+                       'total': round(purchase.total, 2)}
+                      for purchase in order.purchases],
+            'total': round(order.get_total(), 2)
+        }
+
+    async def customer_purchases(self, customer_id):
+        """
+        Return one customer's purchases, read through the customer index.
+
+        Args:
+            customer_id (str): The customer
+
+        Returns:
+            tuple: (status_code, history dictionary or error)
+        """
+        if not CUSTOMER_ID_PATTERN.match(customer_id):
+            return 400, {'error': f"Invalid customer id '{customer_id}'"}
+        loop = asyncio.get_running_loop()
+        purchases = await loop.run_in_executor(None, purchases_for_customer,
+                                               customer_id, self.purchases_file)
+        return 200, {
+            'customer_id': customer_id,
+            'purchases': purchases,
+            'total': round(sum(float(purchase_info['total']) for purchase_info in purchases), 2)
+        }
+
+    # ------------------------------------------------------------------
+    # Connection handling
+    # ------------------------------------------------------------------
+    async def handle_client(self, reader, writer):
+        """
+        Serve HTTP/1.1 requests on one connection until it closes.
+
+        Args:
+            reader (StreamReader): Incoming data
+            writer (StreamWriter): Outgoing data
+
+        Returns:
+            None
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._send(writer, 400, {'error': 'Malformed request line'}, False)
+                    break
+
+                # Read headers up to the blank line
+                headers = {}
+                while True:
+                    header_line = await reader.readline()
+                    if header_line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = header_line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = (version == 'HTTP/1.1'
+                              and headers.get('connection', '').lower() != 'close')
+
+                try:
+                    length = int(headers.get('content-length', '0') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY_SIZE:
+                    await self._send(writer, 413, {'error': 'Request body too large'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                try:
+                    status, payload = await self.dispatch(method.upper(), target, body)
+                except Exception as e:
+                    print(f"Error handling {method} {target}: {e}")
+                    status, payload = 500, {'error': 'Internal error'}
+
+                await self._send(writer, status, payload, keep_alive, method.upper() == 'HEAD')
+                if not keep_alive:
+                    break
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # Client went away - nothing to do
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _send(writer, status, payload, keep_alive, head_only=False):
+        """
+        Write one JSON response.
+
+        Args:
+            writer (StreamWriter): Outgoing data
+            status (int): HTTP status code
+            payload: JSON-serializable response body
+            keep_alive (bool): Whether the connection stays open
+            head_only (bool, optional): Send headers only (HEAD request)
+
+        Returns:
+            None
+        """
+        body = json.dumps(payload).encode('utf-8')
+        header = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'OK')}\r\n"
+                  f"Content-Type: application/json; charset=utf-8\r\n"
+                  f"Content-Length: {len(body)}\r\n"
+                  f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(header.encode('latin-1') + (b'' if head_only else body))
+        await writer.drain()
+
+    async def serve(self, host='127.0.0.1', port=8080, sock=None):
+        """
+        Start the server and serve until cancelled.
+
+        Args:
+            host (str, optional): Interface to listen on. Defaults to '127.0.0.1'.
+            port (int, optional): Port to listen on. Defaults to 8080.
+            sock (socket, optional): Already-bound listening socket to use
+                                     instead of host and port.
+
+        Returns:
+            None
+        """
+        await self.writer.start()
+        if sock is not None:
+            server = await asyncio.start_server(self.handle_client, sock=sock, backlog=4096)
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port, backlog=4096)
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.writer.stop()
+
+
+def main():
+    """Load the catalog and run the HTTP service"""
+
+    parser = argparse.ArgumentParser(description="Bus ticket HTTP/JSON service")
+    parser.add_argument('--host', default='127.0.0.1', help="interface to listen on")
+    parser.add_argument('--port', type=int, default=8080, help="port to listen on")
+    parser.add_argument('--csv', default='data/bus_tickets.csv', help="ticket data file")
+    parser.add_argument('--purchases', default='data/purchases.txt', help="purchase log file")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of pre-forked worker processes (default 1)")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        # Imported here so single-process mode doesn't need it
+        from prefork import run_prefork
+        run_prefork(args.csv, args.purchases, args.host, args.port, args.workers)
+        return
+
+    print("Loading ticket data...")
+    categories = open_catalog(args.csv)
+    if not categories:
+        print("Cannot run without ticket data. Exiting.")
+        return
+
+    service = TicketService(categories, args.purchases)
+    print(f"Serving on http://{args.host}:{args.port} (Ctrl+C to stop)")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nService stopped. Goodbye!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+# ============================================================================
+# SHARDED CATALOG - BUS TICKET SYSTEM
+# ============================================================================
+# Holds fare feeds from several operators side by side. Each feed file is
+# loaded into its own shard (a normal Catalog) named after the operator,
+# so categories with the same title from different operators never
+# collide. Inside a shard, categories are kept apart by category_id: if
+# one feed uses the same title for two category ids, the second one is
+# listed as "Title (1a2b3c4d)".
+#
+# Shards are loaded in parallel, one thread per feed. Browse, search, stats
+# and sorted listings fan out to every shard (or just the one operator a
+# query is scoped to) and merge the results in operator order. Shards
+# share nothing, so adding or reloading an operator never blocks or slows
+# queries on the others.
+#
+# Run: python sharded_catalog.py --feed nct=data/bus_tickets.csv --feed other.csv --stats
+#      python sharded_catalog.py --feed ... --search adult --operator nct
+#      python sharded_catalog.py --feed ... --cheapest 10
+# ============================================================================
+
+import argparse
+import gc
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from catalog import Catalog, find_tickets
+from catalog_ingest import default_reject_file, ingest_catalog
+from ticket_classes import Ticket
+from ticket_views import SORT_KEYS
+
+
+def parse_feed(spec):
+    """
+    Split a feed given on the command line into operator and file.
+
+    Args:
+        spec (str): 'operator=path/to/feed.csv', or just the path (the
+                    operator is then the file name without '.csv')
+
+    Returns:
+        tuple: (operator (str), filename (str))
+    """
+    operator, separator, filename = spec.partition('=')
+    if not separator:
+        filename = spec
+        operator = os.path.splitext(os.path.basename(spec))[0]
+    return operator.strip(), filename.strip()
+
+
+class CatalogShard:
+    """
+    One operator's tickets, loaded from one feed file.
+
+    Attributes:
+        operator (str): Operator name
+        filename (str): Feed file the shard was loaded from
+        catalog (Catalog): The operator's categories and tickets
+        category_names (dict): category_id -> category name in the catalog
+        report (IngestReport): How the feed loaded (None until it has)
+    """
+
+    def __init__(self, operator, filename):
+        """
+        Initialize an empty shard.
+
+        Args:
+            operator (str): Operator name
+            filename (str): Feed file (CSV in the bus_tickets.csv format)
+        """
+        self.operator = operator
+        self.filename = filename
+        self.catalog = Catalog()
+        self.category_names = {}
+        self.report = None
+
+    def _ticket(self, row):
+        """Make a Ticket from a feed row, named after its category_id's category"""
+        ticket = Ticket(row)
+        name = self.category_names.get(ticket.category_id)
+        if name is None:
+            name = ticket.category
+            if name in self.category_names.values():
+                name = f"{ticket.category} ({ticket.category_id[:8]})"
+            self.category_names[ticket.category_id] = name
+        ticket.category = name
+        return ticket
+
+    def load(self):
+        """
+        Read the feed file into the shard.
+
+        Every row is checked like the main feed (see catalog_ingest.py);
+        bad rows are skipped and written to the feed's own reject file.
+
+        Returns:
+            CatalogShard: This shard (empty if the file couldn't be read)
+        """
+        try:
+            self.catalog, self.report = ingest_catalog(
+                self.filename, default_reject_file(self.filename), ticket_factory=self._ticket)
+            if self.report.rejected:
+                print(f"Warning: skipped {self.report.rejected} bad ticket rows for "
+                      f"{self.operator} (see {self.report.reject_file})")
+                metrics.count('bus_ticket_rows_rejected_total', self.report.rejected)
+            metrics.count('bus_tickets_loaded_total', self.report.loaded)
+        except Exception as e:
+            print(f"Error loading feed for {self.operator}: {e}")
+            metrics.count('bus_catalog_load_failures_total')
+        return self
+
+    def category(self, category_id):
+        """
+        Return a category by its category_id.
+
+        Args:
+            category_id (str): The category_id from the feed
+
+        Returns:
+            Category: The category, or None if the shard has no such category
+        """
+        name = self.category_names.get(category_id)
+        return self.catalog.get(name) if name is not None else None
+
+    def ticket_count(self):
+        """
+        Return the number of tickets in the shard.
+
+        Returns:
+            int: Ticket count
+        """
+        with self.catalog.read_locked():
+            return sum(category.get_ticket_count() for category in self.catalog.values())
+
+
+class ShardedCatalog:
+    """
+    Catalogs from several operators, queried together or one at a time.
+
+    The shard table is replaced, never changed in place, when an operator
+    is added or removed, so queries read it without taking any lock.
+    Every query takes an optional operator: scoped queries only touch that
+    operator's shard.
+    """
+
+    def __init__(self):
+        """
+        Initialize a catalog with no operators.
+        """
+        self._shards = {}  # operator -> CatalogShard, in the order they were added
+        self._change_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, feeds, workers=None):
+        """
+        Load several feeds in parallel.
+
+        Args:
+            feeds (list): (operator, filename) pairs
+            workers (int, optional): Threads to load with. Defaults to one per feed.
+
+        Returns:
+            ShardedCatalog: The loaded catalog, operators in the order given
+        """
+        sharded = cls()
+        shards = [CatalogShard(operator, filename) for operator, filename in feeds]
+        with ThreadPoolExecutor(max_workers=workers or max(1, len(shards))) as pool:
+            loaded = list(pool.map(CatalogShard.load, shards))
+        sharded._shards = {shard.operator: shard for shard in loaded}
+        return sharded
+
+    # ------------------------------------------------------------------
+    # Operators
+    # ------------------------------------------------------------------
+    def add_operator(self, operator, filename):
+        """
+        Load a feed and add it as a new shard (or replace the operator's shard).
+
+        The feed is loaded before anything is changed, and then the shard
+        table is swapped in one step, so queries keep running on the other
+        shards the whole time.
+
+        Args:
+            operator (str): Operator name
+            filename (str): Feed file
+
+        Returns:
+            CatalogShard: The new shard
+        """
+        shard = CatalogShard(operator, filename).load()
+        with self._change_lock:
+            shards = dict(self._shards)
+            shards[operator] = shard
+            self._shards = shards
+        return shard
+
+    def remove_operator(self, operator):
+        """
+        Drop an operator's shard.
+
+        Args:
+            operator (str): Operator name
+
+        Returns:
+            bool: True if the operator was removed, False if it wasn't there
+        """
+        with self._change_lock:
+            if operator not in self._shards:
+                return False
+            shards = dict(self._shards)
+            del shards[operator]
+            self._shards = shards
+        return True
+
+    def operators(self):
+        """
+        Return the operator names.
+
+        Returns:
+            list: Operator names (str), in the order they were added
+        """
+        return list(self._shards)
+
+    def shard(self, operator):
+        """
+        Return one operator's shard.
+
+        Args:
+            operator (str): Operator name
+
+        Returns:
+            CatalogShard: The shard, or None if there is no such operator
+        """
+        return self._shards.get(operator)
+
+    def _selected(self, operator=None):
+        """Shards a query covers: just one operator's, or all of them"""
+        if operator is None:
+            return list(self._shards.values())
+        shard = self._shards.get(operator)
+        return [shard] if shard is not None else []
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def get_category(self, operator, category_id):
+        """
+        Return a category by operator and category_id.
+
+        Args:
+            operator (str): Operator name
+            category_id (str): The category_id from the operator's feed
+
+        Returns:
+            Category: The category, or None if there is no such category
+        """
+        shard = self._shards.get(operator)
+        return shard.category(category_id) if shard is not None else None
+
+    def get_ticket(self, topup_id, operator=None):
+        """
+        Look up a ticket by its topup_id.
+
+        Args:
+            topup_id (str): The ticket's topup_id
+            operator (str, optional): Only look in this operator's shard. Defaults to all.
+
+        Returns:
+            tuple: (operator, Ticket) for the first match, or None
+        """
+        for shard in self._selected(operator):
+            ticket = shard.catalog.get_ticket(topup_id)
+            if ticket is not None:
+                return shard.operator, ticket
+        return None
+
+    def category_list(self, operator=None):
+        """
+        List the categories of every operator (or one).
+
+        Args:
+            operator (str, optional): Only list this operator's categories. Defaults to all.
+
+        Returns:
+            list: (operator, Category) pairs
+        """
+        categories = []
+        for shard in self._selected(operator):
+            with shard.catalog.read_locked():
+                categories.extend((shard.operator, category) for category in shard.catalog.values())
+        return categories
+
+    @metrics.timed('sharded_search')
+    def search(self, search_word, operator=None):
+        """
+        Search every operator's tickets (or one's) by name or category.
+
+        Args:
+            search_word (str): The text to look for
+            operator (str, optional): Only search this operator's tickets. Defaults to all.
+
+        Returns:
+            list: (operator, category_name, Ticket) tuples, in operator order
+        """
+        results = []
+        for shard in self._selected(operator):
+            results.extend((shard.operator, category_name, ticket)
+                           for category_name, ticket in find_tickets(shard.catalog, search_word))
+        return results
+
+    def sorted_tickets(self, order, limit=None, operator=None):
+        """
+        Return tickets from every operator (or one) in a sorted order.
+
+        Each shard keeps its own sorted view (see ticket_views.py), so this
+        only merges the shards' first 'limit' tickets.
+
+        Args:
+            order (str): 'price' (cheapest first) or 'end_date' (expiring soonest)
+            limit (int, optional): Only return the first this many. Defaults to all.
+            operator (str, optional): Only list this operator's tickets. Defaults to all.
+
+        Returns:
+            list: (operator, Ticket) pairs in that order
+        """
+        key = SORT_KEYS[order]
+        streams = [[(shard.operator, ticket) for ticket in shard.catalog.sorted_tickets(order, limit)]
+                   for shard in self._selected(operator)]
+        merged = heapq.merge(*streams, key=lambda item: key(item[1]))
+        return list(itertools.islice(merged, limit))
+
+    def statistics(self, operator=None):
+        """
+        Ticket statistics per operator and in total.
+
+        Built from the counts each Category keeps up to date, so no
+        tickets are looped over.
+
+        Args:
+            operator (str, optional): Only this operator. Defaults to all.
+
+        Returns:
+            dict: Operator name (and 'total') -> dict with 'categories',
+                  'tickets', 'min_price', 'max_price', 'mean_price',
+                  'passenger_classes' and 'entitlement_types'
+        """
+        results = {}
+        for shard in self._selected(operator):
+            with shard.catalog.read_locked():
+                results[shard.operator] = _merge_category_stats(shard.catalog.values())
+        results['total'] = _merge_stats(list(results.values()))
+        return results
+
+
+def _merge_category_stats(categories):
+    """Combine the aggregates of some categories into one statistics dict"""
+    stats = []
+    for category in categories:
+        count = category.get_ticket_count()
+        stats.append({
+            'categories': 1,
+            'tickets': count,
+            'min_price': category.get_min_price(),
+            'max_price': category.get_max_price(),
+            'mean_price': category.get_mean_price(),
+            'passenger_classes': category.get_passenger_class_counts(),
+            'entitlement_types': category.get_entitlement_type_counts(),
+        })
+    return _merge_stats(stats)
+
+
+def _merge_stats(stats):
+    """Combine statistics dicts (ticket-weighted mean, overall min and max)"""
+    tickets = sum(item['tickets'] for item in stats)
+    priced = [item for item in stats if item['tickets']]
+    passenger_classes = {}
+    entitlement_types = {}
+    for item in stats:
+        for name, count in item['passenger_classes'].items():
+            passenger_classes[name] = passenger_classes.get(name, 0) + count
+        for name, count in item['entitlement_types'].items():
+            entitlement_types[name] = entitlement_types.get(name, 0) + count
+    return {
+        'categories': sum(item['categories'] for item in stats),
+        'tickets': tickets,
+        'min_price': min((item['min_price'] for item in priced), default=None),
+        'max_price': max((item['max_price'] for item in priced), default=None),
+        'mean_price': (sum(item['mean_price'] * item['tickets'] for item in priced) / tickets
+                       if tickets else None),
+        'passenger_classes': passenger_classes,
+        'entitlement_types': entitlement_types,
+    }
+
+
+def print_statistics(statistics):
+    """Print the result of ShardedCatalog.statistics()"""
+    print("\n" + "="*50)
+    print("   CATALOG STATISTICS BY OPERATOR")
+    print("="*50)
+    for name, stats in statistics.items():
+        print(f"\n{name.upper() if name == 'total' else name}:")
+        print(f"  Categories: {stats['categories']}")
+        print(f"  Tickets: {stats['tickets']}")
+        if stats['tickets']:
+            print(f"  Prices: £{stats['min_price']:.2f} - £{stats['max_price']:.2f} "
+                  f"(average £{stats['mean_price']:.2f})")
+    print("="*50)
+
+
+def main():
+    """Load several feeds and query them from the command line"""
+    parser = argparse.ArgumentParser(description="Query fare feeds from several operators")
+    parser.add_argument('--feed', action='append', required=True,
+                        help="operator=feed.csv (repeat for each operator)")
+    parser.add_argument('--operator', help="only query this operator")
+    parser.add_argument('--search', help="search tickets by name or category")
+    parser.add_argument('--cheapest', type=int, help="list the N cheapest tickets")
+    parser.add_argument('--stats', action='store_true', help="show statistics per operator")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    sharded = ShardedCatalog.load([parse_feed(spec) for spec in args.feed])
+    elapsed = time.perf_counter() - started
+    for operator in sharded.operators():
+        shard = sharded.shard(operator)
+        print(f"{operator}: {len(shard.catalog)} categories, {shard.ticket_count():,} tickets")
+    print(f"Loaded {len(sharded.operators())} feeds in {elapsed:.2f}s")
+
+    # Move the loaded tickets out of the garbage collector's view, so the
+    # collections a big fan-out search triggers don't walk every ticket
+    gc.collect()
+    gc.freeze()
+
+    if args.operator and sharded.shard(args.operator) is None:
+        print(f"Error: no operator called '{args.operator}'")
+        return
+
+    if args.search:
+        results = sharded.search(args.search, args.operator)
+        print(f"\nFound {len(results)} results for '{args.search}':")
+        for operator, category_name, ticket in results[:50]:
+            print(f"  [{operator}] {category_name} - {ticket.topup_type} (£{ticket.get_price():.2f})")
+        if len(results) > 50:
+            print(f"  ... and {len(results) - 50} more")
+
+    if args.cheapest:
+        print(f"\n{args.cheapest} cheapest tickets:")
+        for number, (operator, ticket) in enumerate(sharded.sorted_tickets('price', args.cheapest,
+                                                                          args.operator), 1):
+            print(f"  {number}. [{operator}] {ticket.topup_type} ({ticket.category}) "
+                  f"£{ticket.get_price():.2f}")
+
+    if args.stats:
+        print_statistics(sharded.statistics(args.operator))
+
+
+if __name__ == "__main__":
+    main()
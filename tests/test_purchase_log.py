@@ -0,0 +1,91 @@
+# ============================================================================
+# PURCHASE LOG TESTS - BUS TICKET SYSTEM
+# ============================================================================
+# Run: python -m unittest discover tests
+# ============================================================================
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# Make the project modules importable when run from the tests folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from file_handler import save_purchases
+from purchase_index import purchases_between
+from purchase_log import get_verified_log, read_records, recover_log
+
+
+def purchase_line(number, customer_id='alice'):
+    """One purchase record in Purchase.to_file_format layout"""
+    minute, second = divmod(number % 3600, 60)
+    return f'2026-01-10 08:{minute:02d}:{second:02d}|Day Tickets|Adult Day|1|4.50|o{number:06d}|{customer_id}'
+
+
+class RecoverLogTests(unittest.TestCase):
+    """recover_log() and the saved check results ('.verified')"""
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='bus-log-test-')
+        self.log = os.path.join(self.workdir, 'purchases.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_purchase_appended_after_recovery_is_read(self):
+        # Bigger than the 4 KB the head checksum covers, so a stale cache
+        # can't be told apart from the log by its checksum
+        save_purchases([purchase_line(number) for number in range(200)], self.log)
+        self.assertGreater(os.path.getsize(self.log), 4096)
+
+        # A complete last record with a frame that doesn't match
+        with open(self.log, 'ab') as file:
+            file.write(b'2026-01-10 09:00:00|Day Tickets|Broken|1|4.50|obroken|alice|#99:00000000\n')
+        self.assertEqual(len(get_verified_log(self.log).damaged), 1)
+
+        self.assertGreater(recover_log(self.log), 0)
+        save_purchases([purchase_line(999, 'bob')], self.log)
+
+        records = list(read_records(self.log))
+        self.assertEqual(len(records), 201)
+        self.assertIn('o000999', records[-1])
+        self.assertEqual(get_verified_log(self.log).damaged, [])
+
+    def test_torn_last_record_is_removed(self):
+        save_purchases([purchase_line(number) for number in range(3)], self.log)
+        with open(self.log, 'ab') as file:
+            file.write(b'2026-01-10 09:00:00|Day Tickets|Adult')
+
+        self.assertGreater(recover_log(self.log), 0)
+        self.assertEqual(recover_log(self.log), 0)
+        self.assertEqual(len(list(read_records(self.log))), 3)
+
+
+class DamagedRecordTests(unittest.TestCase):
+    """Every reader of the log skips damaged records"""
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='bus-log-test-')
+        self.log = os.path.join(self.workdir, 'purchases.txt')
+        save_purchases([purchase_line(number) for number in range(3)], self.log)
+        # Change a price without fixing the checksum
+        with open(self.log, 'rb') as file:
+            data = file.read()
+        with open(self.log, 'wb') as file:
+            file.write(data.replace(b'|4.50|o000001', b'|9.50|o000001'))
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_read_records_skips_damaged(self):
+        self.assertEqual(len(list(read_records(self.log))), 2)
+
+    def test_purchases_between_skips_damaged(self):
+        found = list(purchases_between('2026-01-10', '2026-01-11', self.log))
+        self.assertEqual([purchase_info['order_id'] for purchase_info in found], ['o000000', 'o000002'])
+
+
+if __name__ == "__main__":
+    unittest.main()
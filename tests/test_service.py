@@ -0,0 +1,82 @@
+# ============================================================================
+# SERVICE TESTS - BUS TICKET SYSTEM
+# ============================================================================
+# Run: python -m unittest discover tests
+# ============================================================================
+
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# Make the project modules importable when run from the tests folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import generate_data
+from file_handler import load_ticket_objects
+from service import TicketService
+
+
+class RecordingWriter:
+    """Stands in for PurchaseWriter and keeps the lines it is given"""
+
+    def __init__(self):
+        self.lines = []
+
+    async def submit(self, purchase_lines):
+        self.lines.extend(purchase_lines)
+        return True
+
+
+class PurchaseRequestTests(unittest.TestCase):
+    """POST /purchase request checks"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.workdir = tempfile.mkdtemp(prefix='bus-service-test-')
+        feed = os.path.join(cls.workdir, 'tickets.csv')
+        generate_data.write_catalog(feed, 20)
+        cls.categories = load_ticket_objects(feed, quiet=True)
+        first_category = next(iter(cls.categories.values()))
+        cls.topup_id = first_category.tickets[0].topup_id
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.workdir, ignore_errors=True)
+
+    def setUp(self):
+        self.writer = RecordingWriter()
+        self.service = TicketService(self.categories, writer=self.writer)
+
+    def post_purchase(self, request):
+        """Send a purchase request and return (status, payload)"""
+        body = json.dumps(request).encode('utf-8')
+        return asyncio.run(self.service.dispatch('POST', '/purchase', body))
+
+    def test_whole_number_quantity_is_bought(self):
+        status, order = self.post_purchase({'items': [{'topup_id': self.topup_id, 'quantity': 2}]})
+        self.assertEqual(status, 200)
+        self.assertEqual(order['items'][0]['quantity'], 2)
+        self.assertEqual(len(self.writer.lines), 1)
+
+    def test_boolean_quantity_is_rejected(self):
+        for quantity in (True, False):
+            status, payload = self.post_purchase({'items': [{'topup_id': self.topup_id,
+                                                             'quantity': quantity}]})
+            self.assertEqual(status, 400)
+            self.assertIn('quantity', payload['error'])
+        self.assertEqual(self.writer.lines, [])
+
+    def test_non_integer_quantity_is_rejected(self):
+        for quantity in ('2', 1.5, None):
+            status, _ = self.post_purchase({'items': [{'topup_id': self.topup_id,
+                                                       'quantity': quantity}]})
+            self.assertEqual(status, 400)
+        self.assertEqual(self.writer.lines, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
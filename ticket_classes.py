@@ -1,5 +1,27 @@
+import copy
+import re
+import threading
+import uuid
+from collections import Counter
 from datetime import datetime
 
+from ticket_views import SortedTicketView
+from purchase_log import strip_frame
+
+# Column order of the ticket CSV file
+TICKET_CSV_COLUMNS = [
+    'category_id', 'category_title', 'category_description',
+    'topup_id', 'topup_title', 'topup_description', 'topup_price_in_pence',
+    'topup_entitlement_type', 'topup_entitlement_unit', 'topup_entitlement_value',
+    'topup_entitlement_quantity', 'topup_entitlement_start_date',
+    'topup_entitlement_end_date', 'topup_passenger_class_id',
+    'topup_passenger_class_name', 'topup_passenger_class_quantity'
+]
+
+# Customer ids are saved in the pipe-delimited purchase log, so they can't
+# contain '|' (or start a '#' frame, see purchase_log.py)
+CUSTOMER_ID_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.@-]{0,63}$')
+
 class Ticket:
     """
     Represents a single bus ticket/top-up option.
@@ -23,6 +45,8 @@ class Ticket:
         start_date (str): Start date of validity
         end_date (str): End date of validity
         passenger_class (str): Passenger class (e.g., 'Adult', 'Student')
+        passenger_class_id (str): Identifier of the passenger class
+        passenger_class_quantity (str): Number of passengers covered
     """
     
     def __init__(self, ticket_data):
@@ -57,6 +81,8 @@ class Ticket:
         self.start_date = ticket_data.get('topup_entitlement_start_date', 'N/A')
         self.end_date = ticket_data.get('topup_entitlement_end_date', 'N/A')
         self.passenger_class = ticket_data.get('topup_passenger_class_name', 'N/A')
+        self.passenger_class_id = ticket_data.get('topup_passenger_class_id', '')
+        self.passenger_class_quantity = ticket_data.get('topup_passenger_class_quantity', '')
     
     def display_info(self):
         """
@@ -90,6 +116,53 @@ class Ticket:
         """
         return self.price
     
+    def to_row(self):
+        """
+        Convert the ticket back to a CSV row dictionary.
+        
+        This is the reverse of __init__: Ticket(ticket.to_row()) gives an
+        equivalent ticket. Price is converted back to whole pence.
+        
+        Returns:
+            dict: Dictionary with one entry per column in TICKET_CSV_COLUMNS
+        """
+        return {
+            'category_id': self.category_id,
+            'category_title': self.category,
+            'category_description': self.category_description,
+            'topup_id': self.topup_id,
+            'topup_title': self.topup_type,
+            'topup_description': self.topup_description,
+            'topup_price_in_pence': str(round(self.price * 100)),
+            'topup_entitlement_type': self.entitlement_type,
+            'topup_entitlement_unit': self.entitlement_unit,
+            'topup_entitlement_value': self.entitlement_value,
+            'topup_entitlement_quantity': self.entitlement_quantity,
+            'topup_entitlement_start_date': self.start_date,
+            'topup_entitlement_end_date': self.end_date,
+            'topup_passenger_class_id': self.passenger_class_id,
+            'topup_passenger_class_name': self.passenger_class,
+            'topup_passenger_class_quantity': self.passenger_class_quantity
+        }
+    
+    def with_price(self, new_price):
+        """
+        Return a copy of this ticket with a different price.
+        
+        The original ticket is left unchanged, so anyone still holding it
+        (for example a purchase that is half-way through) keeps seeing the
+        price it started with.
+        
+        Args:
+            new_price (float): The new price in pounds
+            
+        Returns:
+            Ticket: A new Ticket object with the new price
+        """
+        new_ticket = copy.copy(self)
+        new_ticket.price = new_price
+        return new_ticket
+    
     def __str__(self):
         """
         Return string representation of the ticket.
@@ -111,6 +184,15 @@ class Category:
     Provides methods to add tickets, retrieve tickets, and display
     category information.
     
+    Price and count aggregates (min, max and mean price, tickets per
+    passenger class and per entitlement type) are kept up to date as
+    tickets are added, removed and replaced, so they can be read without
+    looping over the tickets.
+    
+    Sorted views of the tickets (cheapest first, expiring soonest) are
+    built the first time they are asked for and then kept in order as
+    tickets change (see ticket_views.py).
+    
     Attributes:
         name (str): The name of the category
         tickets (list): List of Ticket objects in this category
@@ -127,6 +209,66 @@ class Category:
         """
         self.name = name
         self.tickets = []  # List to store Ticket objects
+        
+        # Aggregates, updated by _count_ticket()
+        self._price_counts = Counter()  # Price in pence -> number of tickets
+        self._total_pence = 0
+        self._min_pence = None
+        self._max_pence = None
+        self._passenger_class_counts = Counter()
+        self._entitlement_type_counts = Counter()
+        
+        # Sorted views (order -> SortedTicketView), built on first use
+        self._views = {}
+        self._views_lock = threading.Lock()
+    
+    def _count_ticket(self, ticket, change, rescan=True):
+        """
+        Add a ticket to the aggregates (change=1) or take it out (change=-1).
+        
+        Prices are counted in whole pence so adding and removing the same
+        ticket always leaves the totals exactly as they were.
+        
+        Args:
+            ticket (Ticket): The ticket
+            change (int): 1 or -1
+            rescan (bool, optional): Look for a new min/max price when the
+                                     last ticket at the old one goes. Pass
+                                     False in a batch and call
+                                     _rescan_price_range() once at the end.
+                                     Defaults to True.
+            
+        Returns:
+            None
+        """
+        pence = round(ticket.price * 100)
+        self._total_pence += change * pence
+        self._price_counts[pence] += change
+        self._passenger_class_counts[ticket.passenger_class] += change
+        self._entitlement_type_counts[ticket.entitlement_type] += change
+        
+        if change > 0:
+            if self._min_pence is None or pence < self._min_pence:
+                self._min_pence = pence
+            if self._max_pence is None or pence > self._max_pence:
+                self._max_pence = pence
+            return
+        
+        # Forget counts that dropped to zero; only look for a new min/max
+        # when the last ticket at the old one has gone
+        if self._price_counts[pence] <= 0:
+            del self._price_counts[pence]
+            if rescan and pence in (self._min_pence, self._max_pence):
+                self._rescan_price_range()
+        for counts, key in ((self._passenger_class_counts, ticket.passenger_class),
+                            (self._entitlement_type_counts, ticket.entitlement_type)):
+            if counts[key] <= 0:
+                del counts[key]
+    
+    def _rescan_price_range(self):
+        """Work out the min and max price again from the price counts"""
+        self._min_pence = min(self._price_counts, default=None)
+        self._max_pence = max(self._price_counts, default=None)
     
     def add_ticket(self, ticket):
         """
@@ -143,9 +285,95 @@ class Category:
         """
         if isinstance(ticket, Ticket):
             self.tickets.append(ticket)
+            self._count_ticket(ticket, 1)
+            for view in self._views.values():
+                view.add(ticket)
         else:
             print("Error: Can only add Ticket objects")
     
+    def remove_ticket(self, ticket):
+        """
+        Remove a ticket from this category.
+        
+        The ticket list is replaced with a new list rather than changed in
+        place, so code already looping over the old list is not affected.
+        
+        Args:
+            ticket (Ticket): The Ticket object to remove
+            
+        Returns:
+            bool: True if the ticket was found and removed, False otherwise
+        """
+        remaining = [t for t in self.tickets if t is not ticket]
+        if len(remaining) == len(self.tickets):
+            return False
+        self.tickets = remaining
+        self._count_ticket(ticket, -1)
+        for view in self._views.values():
+            view.remove(ticket)
+        return True
+    
+    def replace_ticket(self, old_ticket, new_ticket):
+        """
+        Replace a ticket with another one in the same position.
+        
+        Like remove_ticket(), the ticket list is replaced with a new list
+        rather than changed in place.
+        
+        Args:
+            old_ticket (Ticket): The Ticket object to replace
+            new_ticket (Ticket): The Ticket object to put in its place
+            
+        Returns:
+            bool: True if old_ticket was found and replaced, False otherwise
+        """
+        for position, ticket in enumerate(self.tickets):
+            if ticket is old_ticket:
+                self.tickets = self.tickets[:position] + [new_ticket] + self.tickets[position + 1:]
+                self._count_ticket(old_ticket, -1)
+                self._count_ticket(new_ticket, 1)
+                for view in self._views.values():
+                    view.replace(old_ticket, new_ticket)
+                return True
+        return False
+    
+    def update_tickets(self, changes):
+        """
+        Replace or remove many tickets in one pass over the ticket list.
+        
+        Like replace_ticket() for each change, but the list, the sorted
+        views and the min/max price are each rebuilt only once, so a batch
+        of changes costs one pass over the category rather than one per
+        change.
+        
+        Args:
+            changes (dict): id(old ticket) -> new Ticket, or None to remove it
+            
+        Returns:
+            list: (old_ticket, new_ticket or None) pairs that were applied
+        """
+        applied = []
+        tickets = []
+        for ticket in self.tickets:
+            if id(ticket) not in changes:
+                tickets.append(ticket)
+                continue
+            new_ticket = changes[id(ticket)]
+            applied.append((ticket, new_ticket))
+            if new_ticket is not None:
+                tickets.append(new_ticket)
+        self.tickets = tickets
+        
+        for old_ticket, new_ticket in applied:
+            self._count_ticket(old_ticket, -1, rescan=False)
+        for old_ticket, new_ticket in applied:
+            if new_ticket is not None:
+                self._count_ticket(new_ticket, 1)
+        self._rescan_price_range()
+        for view in self._views.values():
+            view.update_many(applied)
+        return applied
+    
     def get_all_tickets(self):
         """
         Return all tickets in this category.
@@ -155,6 +383,37 @@ class Category:
         """
         return self.tickets
     
+    def get_sorted_tickets(self, order, limit=None):
+        """
+        Return the tickets in a sorted order.
+        
+        The first call for an order sorts the tickets once; after that
+        the order is kept up to date as tickets change.
+        
+        Args:
+            order (str): 'price' (cheapest first) or 'end_date' (expiring soonest)
+            limit (int, optional): Only return the first this many. Defaults to all.
+            
+        Returns:
+            list: Ticket objects in that order
+        """
+        view = self._views.get(order)
+        if view is None:
+            with self._views_lock:
+                view = self._views.get(order)
+                if view is None:
+                    view = self._views[order] = SortedTicketView(order, self.tickets)
+        return view.tickets(limit)
+    
+    def sorted_orders(self):
+        """
+        Return the orders whose sorted views have been built.
+        
+        Returns:
+            list: Order names, e.g. ['price']
+        """
+        return list(self._views)
+    
     def get_ticket_count(self):
         """
         Return the number of tickets in this category.
@@ -164,33 +423,95 @@ class Category:
         """
         return len(self.tickets)
     
-    def display_info(self):
+    def get_min_price(self):
+        """
+        Return the lowest ticket price in this category.
+        
+        Returns:
+            float: Lowest price in pounds, or None if the category is empty
+        """
+        return None if self._min_pence is None else self._min_pence / 100
+    
+    def get_max_price(self):
+        """
+        Return the highest ticket price in this category.
+        
+        Returns:
+            float: Highest price in pounds, or None if the category is empty
+        """
+        return None if self._max_pence is None else self._max_pence / 100
+    
+    def get_mean_price(self):
+        """
+        Return the mean ticket price in this category.
+        
+        Returns:
+            float: Mean price in pounds, or None if the category is empty
+        """
+        if not self.tickets:
+            return None
+        return self._total_pence / len(self.tickets) / 100
+    
+    def get_passenger_class_counts(self):
+        """
+        Return how many tickets there are for each passenger class.
+        
+        Returns:
+            dict: Passenger class name -> number of tickets
+        """
+        return dict(self._passenger_class_counts)
+    
+    def get_entitlement_type_counts(self):
+        """
+        Return how many tickets there are of each entitlement type.
+        
+        Returns:
+            dict: Entitlement type -> number of tickets
+        """
+        return dict(self._entitlement_type_counts)
+    
+    def display_info(self, order=None):
         """
         Display category information and all tickets.
         
-        Shows the category name, ticket count, and a numbered list
-        of all tickets in the category using their string representation.
+        Shows the category name, ticket count, price range, and a numbered
+        list of all tickets in the category using their string representation.
+        
+        Args:
+            order (str, optional): 'price' or 'end_date' to list the tickets
+                                   in that order. Defaults to catalog order.
         
         Returns:
             None
         """
         print(f"\nCategory: {self.name}")
         print(f"Available tickets: {self.get_ticket_count()}")
+        if self.tickets:
+            print(f"Prices: £{self.get_min_price():.2f} - £{self.get_max_price():.2f} "
+                  f"(average £{self.get_mean_price():.2f})")
         print("=" * 40)
         
-        for i, ticket in enumerate(self.tickets, 1):
-            print(f"{i}. {ticket}")
+        tickets = self.get_sorted_tickets(order) if order else self.tickets
+        for i, ticket in enumerate(tickets, 1):
+            if order == 'end_date' and ticket.end_date not in ('', 'N/A'):
+                print(f"{i}. {ticket} - valid until {ticket.end_date[:10]}")
+            else:
+                print(f"{i}. {ticket}")
     
     def __str__(self):
         """
         Return string representation of the category.
         
-        Provides a concise string showing the category name and ticket count.
+        Provides a concise string showing the category name, ticket count
+        and price range.
         
         Returns:
-            str: String in format "CategoryName (X tickets)"
+            str: String in format "CategoryName (X tickets, £min - £max)"
         """
-        return f"{self.name} ({self.get_ticket_count()} tickets)"
+        if not self.tickets:
+            return f"{self.name} (0 tickets)"
+        return (f"{self.name} ({self.get_ticket_count()} tickets, "
+                f"£{self.get_min_price():.2f} - £{self.get_max_price():.2f})")
 
 
 class Purchase:
@@ -206,9 +527,11 @@ class Purchase:
         quantity (int): The number of tickets purchased
         timestamp (datetime): The date and time of the purchase
         total (float): The total cost (price * quantity)
+        order_id (str): Identifier shared by all purchases in one order
+        customer_id (str): Customer who made the purchase ('' if unknown)
     """
     
-    def __init__(self, ticket, quantity=1):
+    def __init__(self, ticket, quantity=1, order_id=None, timestamp=None, customer_id=''):
         """
         Initialize a purchase with a ticket and quantity.
         
@@ -218,11 +541,22 @@ class Purchase:
         Args:
             ticket (Ticket): The Ticket object being purchased
             quantity (int, optional): Number of tickets to purchase. Defaults to 1.
+            order_id (str, optional): Order this purchase belongs to. A new
+                                      order id is generated if not given.
+            timestamp (datetime, optional): Time of purchase. Defaults to now.
+            customer_id (str, optional): Customer making the purchase. Defaults to '' (unknown).
+            
+        Raises:
+            ValueError: If customer_id isn't a valid customer id
         """
+        if customer_id and not CUSTOMER_ID_PATTERN.match(customer_id):
+            raise ValueError(f"Invalid customer id: {customer_id!r}")
         self.ticket = ticket
         self.quantity = quantity
-        self.timestamp = datetime.now()
+        self.timestamp = timestamp or datetime.now()
         self.total = ticket.get_price() * quantity
+        self.order_id = order_id or new_order_id()
+        self.customer_id = customer_id
     
     def get_total(self):
         """
@@ -247,12 +581,24 @@ class Purchase:
         print("   PURCHASE RECEIPT")
         print("="*40)
         print(f"Date: {self.timestamp.strftime('%Y-%m-%d %H:%M')}")
+        self.display_receipt_lines()
+        print("="*40)
+    
+    def display_receipt_lines(self):
+        """
+        Display the ticket lines of the receipt without header or footer.
+        
+        Used by display_receipt() and by Order.display_receipt() so single
+        purchases and multi-item orders share the same layout.
+        
+        Returns:
+            None
+        """
         print(f"Ticket: {self.ticket.topup_type}")
         print(f"Category: {self.ticket.category}")
         print(f"Unit Price: £{self.ticket.get_price():.2f}")
         print(f"Quantity: {self.quantity}")
         print(f"Total: £{self.total:.2f}")
-        print("="*40)
     
     def to_file_format(self):
         """
@@ -262,9 +608,11 @@ class Purchase:
         that can be saved to a text file and later parsed back.
         
         Returns:
-            str: Pipe-delimited string with timestamp, category, type, quantity, total
+            str: Pipe-delimited string with timestamp, category, type, quantity,
+                 total, order_id, customer_id
         """
-        return f"{self.timestamp}|{self.ticket.category}|{self.ticket.topup_type}|{self.quantity}|{self.total}"
+        return (f"{self.timestamp}|{self.ticket.category}|{self.ticket.topup_type}"
+                f"|{self.quantity}|{self.total}|{self.order_id}|{self.customer_id}")
     
     @staticmethod
     def from_file_format(line):
@@ -280,20 +628,207 @@ class Purchase:
             
         Returns:
             dict: Dictionary with keys: 'timestamp', 'category', 'topup_type',
-                  'quantity', 'total'
+                  'quantity', 'total', 'order_id' ('' for records saved
+                  before orders were added), 'customer_id' ('' for records
+                  saved before customers were added)
         """
-        # This is for loading purchases later
-        parts = line.strip().split('|')
+        # This is for loading purchases later (any length/checksum frame
+        # at the end of the line is not part of the record)
+        parts = strip_frame(line).strip().split('|')
         # Return dictionary with purchase info
         return {
             'timestamp': parts[0],
             'category': parts[1],
             'topup_type': parts[2],
             'quantity': parts[3],
-            'total': parts[4]
+            'total': parts[4],
+            'order_id': parts[5] if len(parts) > 5 else '',
+            'customer_id': parts[6] if len(parts) > 6 else ''
         }
 
 
+def new_order_id():
+    """
+    Generate a new, unique order id.
+    
+    Returns:
+        str: 12 hexadecimal characters
+    """
+    return uuid.uuid4().hex[:12]
+
+
+class Cart:
+    """
+    Collects several tickets before they are bought together.
+    
+    Each line of the cart is a ticket and a quantity. Adding the same
+    ticket twice increases the quantity of the existing line. Checking out
+    turns every line into a Purchase sharing one order id and timestamp.
+    
+    Attributes:
+        lines (list): List of [Ticket, quantity] pairs in the order added
+    """
+    
+    def __init__(self):
+        """
+        Initialize an empty cart.
+        """
+        self.lines = []
+    
+    def add_item(self, ticket, quantity=1):
+        """
+        Add a ticket to the cart.
+        
+        Args:
+            ticket (Ticket): The Ticket object to add
+            quantity (int, optional): Number of tickets. Defaults to 1.
+            
+        Returns:
+            None
+            
+        Raises:
+            ValueError: If quantity is not positive
+        """
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive!")
+        
+        for line in self.lines:
+            if line[0] is ticket:
+                line[1] += quantity
+                return
+        self.lines.append([ticket, quantity])
+    
+    def remove_item(self, line_number):
+        """
+        Remove a line from the cart.
+        
+        Args:
+            line_number (int): Index of the line to remove (starting at 0)
+            
+        Returns:
+            None
+        """
+        del self.lines[line_number]
+    
+    def is_empty(self):
+        """
+        Check whether the cart has no lines.
+        
+        Returns:
+            bool: True if the cart is empty
+        """
+        return not self.lines
+    
+    def get_total(self):
+        """
+        Return the total cost of everything in the cart.
+        
+        Returns:
+            float: Sum of price * quantity over all lines, in pounds
+        """
+        return sum(ticket.get_price() * quantity for ticket, quantity in self.lines)
+    
+    def display_info(self):
+        """
+        Display the cart contents and total.
+        
+        Returns:
+            None
+        """
+        for number, (ticket, quantity) in enumerate(self.lines, 1):
+            line_total = ticket.get_price() * quantity
+            print(f"{number}. {quantity}x {ticket.topup_type} - £{line_total:.2f}")
+        print(f"Total: £{self.get_total():.2f}")
+    
+    def checkout(self, customer_id=''):
+        """
+        Turn the cart into an Order.
+        
+        Every line becomes a Purchase with the same order id, timestamp
+        and customer. The cart is left unchanged so a failed save can be
+        retried.
+        
+        Args:
+            customer_id (str, optional): Customer buying the order. Defaults to '' (unknown).
+            
+        Returns:
+            Order: The order containing one Purchase per cart line
+            
+        Raises:
+            ValueError: If customer_id isn't a valid customer id
+        """
+        order_id = new_order_id()
+        timestamp = datetime.now()
+        purchases = [Purchase(ticket, quantity, order_id, timestamp, customer_id)
+                     for ticket, quantity in self.lines]
+        return Order(order_id, purchases)
+
+
+class Order:
+    """
+    A group of purchases made together in one checkout.
+    
+    Attributes:
+        order_id (str): Identifier shared by every purchase in the order
+        purchases (list): List of Purchase objects
+    """
+    
+    def __init__(self, order_id, purchases):
+        """
+        Initialize an order.
+        
+        Args:
+            order_id (str): The shared order id
+            purchases (list): List of Purchase objects in the order
+        """
+        self.order_id = order_id
+        self.purchases = purchases
+    
+    def get_total(self):
+        """
+        Return the total cost of the order.
+        
+        Returns:
+            float: Sum of the purchase totals in pounds
+        """
+        return sum(purchase.get_total() for purchase in self.purchases)
+    
+    def to_file_format(self):
+        """
+        Convert every purchase in the order to file format.
+        
+        Returns:
+            list: One pipe-delimited string per purchase
+        """
+        return [purchase.to_file_format() for purchase in self.purchases]
+    
+    def display_receipt(self):
+        """
+        Display one combined receipt for the whole order.
+        
+        Uses Purchase.display_receipt_lines() for each item so the layout
+        matches a single-ticket receipt.
+        
+        Returns:
+            None
+        """
+        if len(self.purchases) == 1:
+            self.purchases[0].display_receipt()
+            return
+        
+        print("\n" + "="*40)
+        print("   PURCHASE RECEIPT")
+        print("="*40)
+        print(f"Order: {self.order_id}")
+        print(f"Date: {self.purchases[0].timestamp.strftime('%Y-%m-%d %H:%M')}")
+        for purchase in self.purchases:
+            print("-"*40)
+            purchase.display_receipt_lines()
+        print("="*40)
+        print(f"Order Total: £{self.get_total():.2f}")
+        print("="*40)
+
+
 # Test code
 if __name__ == "__main__":
     # Test Ticket class
@@ -324,4 +859,11 @@ if __name__ == "__main__":
     purchase = Purchase(ticket, quantity=2)
     purchase.display_receipt()
     print(f"\nFile format: {purchase.to_file_format()}")
+    
+    # Test Cart and Order classes
+    cart = Cart()
+    cart.add_item(ticket, 2)
+    cart.add_item(ticket, 1)
+    order = cart.checkout()
+    order.display_receipt()
 
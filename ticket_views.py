@@ -0,0 +1,223 @@
+# ============================================================================
+# SORTED TICKET VIEWS - BUS TICKET SYSTEM
+# ============================================================================
+# Ordered listings of tickets ("cheapest first", "expiring soonest") kept
+# next to the catalog order instead of being sorted every time a menu is
+# opened.
+#
+# A view is sorted once, the first time it is asked for. After that every
+# add, price edit and delete moves just the one ticket, found with bisect,
+# so listing tickets in order or taking the first N never sorts again.
+# Tickets with the same sort key stay in catalog order.
+#
+# Categories keep one view per order for their own tickets, and the
+# catalog keeps one per order across every category (see catalog.py).
+# ============================================================================
+
+import bisect
+from datetime import datetime
+from operator import itemgetter
+
+# Orders a view can be kept in, as shown in the menus
+PRICE = 'price'
+END_DATE = 'end_date'
+ORDER_NAMES = {PRICE: 'cheapest first', END_DATE: 'expiring soonest'}
+
+# What the menus accept after a number, e.g. '3p' for category 3 cheapest first
+ORDER_LETTERS = {'p': PRICE, 'e': END_DATE}
+
+
+def price_key(ticket):
+    """Sort key for cheapest first (whole pence, so float noise can't reorder tickets)"""
+    return round(ticket.price * 100)
+
+
+def end_date_key(ticket):
+    """Sort key for expiring soonest; tickets without an end date go last"""
+    try:
+        return (0, datetime.fromisoformat(str(ticket.end_date).strip()).timestamp())
+    except ValueError:
+        return (1, 0.0)
+
+
+SORT_KEYS = {PRICE: price_key, END_DATE: end_date_key}
+
+# Batches of at least this many changes rebuild a view in one merge
+# (see SortedTicketView.update_many) instead of moving tickets one by one
+BATCH_MERGE_MIN = 64
+
+
+def parse_choice(text):
+    """
+    Split a menu answer like '3p' into a number and an order.
+
+    Args:
+        text (str): What the user typed, e.g. '3', '3p' or '3 e'
+
+    Returns:
+        tuple: (number (int), order (str or None))
+
+    Raises:
+        ValueError: If the text doesn't start with a number
+    """
+    text = text.strip().lower()
+    order = None
+    if text and text[-1] in ORDER_LETTERS:
+        order = ORDER_LETTERS[text[-1]]
+        text = text[:-1]
+    return int(text), order
+
+
+class SortedTicketView:
+    """
+    Tickets kept sorted by one key, updated in place.
+
+    Attributes:
+        order (str): PRICE or END_DATE
+    """
+
+    def __init__(self, order, tickets):
+        """
+        Initialize the view by sorting the tickets once.
+
+        Args:
+            order (str): PRICE or END_DATE
+            tickets (iterable): Ticket objects in catalog order
+        """
+        self.order = order
+        self._key = SORT_KEYS[order]
+        self._serials = {}  # id(ticket) -> serial number, breaks ties
+        self._next_serial = 0
+
+        decorated = []
+        for ticket in tickets:
+            decorated.append(((self._key(ticket), self._new_serial(ticket)), ticket))
+        decorated.sort(key=lambda item: item[0])
+        self._keys = [key for key, _ in decorated]
+        self._tickets = [ticket for _, ticket in decorated]
+
+    def _new_serial(self, ticket, serial=None):
+        """Give a ticket a tie-breaking serial number (a new one unless given)"""
+        if serial is None:
+            serial = self._next_serial
+            self._next_serial += 1
+        self._serials[id(ticket)] = serial
+        return serial
+
+    def _position(self, ticket):
+        """Return the position of a ticket in the view, or None if it isn't there"""
+        serial = self._serials.get(id(ticket))
+        if serial is None:
+            return None
+        position = bisect.bisect_left(self._keys, (self._key(ticket), serial))
+        if position < len(self._tickets) and self._tickets[position] is ticket:
+            return position
+        return None
+
+    def add(self, ticket, serial=None):
+        """
+        Insert a ticket in its sorted place.
+
+        Args:
+            ticket (Ticket): The ticket
+            serial (int, optional): Tie-breaking serial to reuse. Defaults to a new one.
+
+        Returns:
+            None
+        """
+        key = (self._key(ticket), self._new_serial(ticket, serial))
+        position = bisect.bisect_right(self._keys, key)
+        self._keys.insert(position, key)
+        self._tickets.insert(position, ticket)
+
+    def remove(self, ticket):
+        """
+        Take a ticket out of the view.
+
+        Args:
+            ticket (Ticket): The ticket
+
+        Returns:
+            int: The ticket's serial number, or None if it wasn't in the view
+        """
+        position = self._position(ticket)
+        if position is None:
+            return None
+        del self._keys[position]
+        del self._tickets[position]
+        return self._serials.pop(id(ticket))
+
+    def replace(self, old_ticket, new_ticket):
+        """
+        Swap a ticket for its replacement (e.g. after a price edit).
+
+        The replacement keeps the old ticket's place among tickets with
+        the same sort key.
+
+        Args:
+            old_ticket (Ticket): The ticket in the view
+            new_ticket (Ticket): The ticket to put in its place
+
+        Returns:
+            None
+        """
+        self.add(new_ticket, self.remove(old_ticket))
+
+    def update_many(self, changes):
+        """
+        Apply a batch of replacements and removals.
+
+        Small batches are applied one ticket at a time. Bigger ones (where
+        moving list items for every ticket would cost more) take the
+        changed tickets out in one pass, sort their replacements and merge
+        them back in, so the view is rebuilt once per batch.
+
+        Args:
+            changes (list): (old_ticket, new_ticket or None) pairs
+
+        Returns:
+            None
+        """
+        if len(changes) < BATCH_MERGE_MIN:
+            for old_ticket, new_ticket in changes:
+                if new_ticket is None:
+                    self.remove(old_ticket)
+                else:
+                    self.replace(old_ticket, new_ticket)
+            return
+
+        removed = set()
+        added = []
+        for old_ticket, new_ticket in changes:
+            serial = self._serials.pop(id(old_ticket), None)
+            if serial is None:
+                continue  # Not in the view
+            removed.add(id(old_ticket))
+            if new_ticket is not None:
+                self._serials[id(new_ticket)] = serial
+                added.append(((self._key(new_ticket), serial), new_ticket))
+        added.sort(key=itemgetter(0))
+
+        # kept and added are both sorted, so sorting them together is a
+        # single merge of the two runs
+        merged = [(key, ticket) for key, ticket in zip(self._keys, self._tickets)
+                  if id(ticket) not in removed]
+        merged += added
+        merged.sort(key=itemgetter(0))
+        self._keys = [key for key, _ in merged]
+        self._tickets = [ticket for _, ticket in merged]
+
+    def tickets(self, limit=None):
+        """
+        Return the tickets in order.
+
+        Args:
+            limit (int, optional): Only return the first this many. Defaults to all.
+
+        Returns:
+            list: Ticket objects (a copy, safe to keep)
+        """
+        return self._tickets[:limit]
+
+    def __len__(self):
+        return len(self._tickets)